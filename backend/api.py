@@ -2,18 +2,39 @@
 """
 WebReg Monitor - Flask API Backend
 """
-from flask import Flask, jsonify, request
+import time
+
+STARTED = time.perf_counter()
+
+from flask import Flask, jsonify, request, Response, send_from_directory
 from flask_cors import CORS
 import sqlite3
 from datetime import datetime
+import csv
+import io
 import json
+import logging
 import os
-import time
+import threading
+
+import catalog
+import course_health
+import frontend_assets
+import heatmap
+import latency
+import profiler
+from seat_parser import parse_targets
+
+logger = logging.getLogger('webreg.api')
 
 app = Flask(__name__)
 CORS(app)  # Allow frontend to connect
 
 DB_PATH = 'webreg.db'
+CHECK_NOW_MAX_WAIT = 60  # seconds a "check now" call will hold the request open
+
+# Serve the dashboard from this process too (WEBREG_SERVE_FRONTEND=0 turns it off)
+SERVE_FRONTEND = os.environ.get('WEBREG_SERVE_FRONTEND', '1') != '0'
 
 # Database setup
 def init_db():
@@ -56,27 +77,310 @@ def init_db():
         )
     ''')
     
+    # "Check now" requests, picked up by the running monitor
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS check_requests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course_id INTEGER,
+            status TEXT DEFAULT 'pending',
+            result TEXT,
+            requested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            completed_at TIMESTAMP,
+            FOREIGN KEY (course_id) REFERENCES courses(id)
+        )
+    ''')
+    
+    # Columns added after the first release
+    c.execute('PRAGMA table_info(courses)')
+    course_columns = {row[1] for row in c.fetchall()}
+    if 'webhook_url' not in course_columns:
+        c.execute('ALTER TABLE courses ADD COLUMN webhook_url TEXT')
+    if 'sections' not in course_columns:
+        c.execute('ALTER TABLE courses ADD COLUMN sections TEXT')
+    if 'version' not in course_columns:
+        c.execute('ALTER TABLE courses ADD COLUMN version INTEGER DEFAULT 0')
+    
+    # One watch per (course, email) - older databases may hold duplicates from
+    # before the index existed, so fold them into one row first
+    merge_duplicate_courses(c)
+    c.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_courses_unique
+        ON courses (subject, course_num, email)
+    ''')
+    
+    catalog.init_catalog_table(c)
+    course_health.init_health_table(c)
+    heatmap.init_heatmap_tables(conn)
+    latency.init_latency_tables(conn)
+    init_sync(c)
+    
     conn.commit()
     conn.close()
 
-init_db()
+# History that moves to the kept row when duplicate watches are merged
+COURSE_HISTORY_TABLES = ('checks', 'notifications', 'check_requests', 'alert_latency', 'webhook_queue')
+# Per-course state keyed by course id, where the kept row's copy wins
+COURSE_STATE_TABLES = ('cooldowns', 'course_health', 'heatmap_cells', 'heatmap_open', 'latency_histogram')
 
-@app.route('/api/courses', methods=['GET'])
-def get_courses():
-    """Get all courses"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+def merge_duplicate_courses(c):
+    """Fold every (subject, course_num, email) group into its oldest row, moving the
+    others' checks and notifications over. Runs in init_db's transaction."""
+    c.execute('''
+        SELECT subject, course_num, email FROM courses
+        GROUP BY subject, course_num, email HAVING COUNT(*) > 1
+    ''')
+    groups = c.fetchall()
+    if not groups:
+        return
+    
+    c.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    tables = {row[0] for row in c.fetchall()}
+    
+    for subject, course_num, email in groups:
+        c.execute(
+            'SELECT id, active, webhook_url, sections FROM courses '
+            'WHERE subject=? AND course_num=? AND email=? ORDER BY id',
+            (subject, course_num, email)
+        )
+        rows = c.fetchall()
+        keep_id = rows[0][0]
+        dup_ids = [row[0] for row in rows[1:]]
+        placeholders = ','.join('?' * len(dup_ids))
+        
+        # The merged watch covers everything any of them watched (no sections means all of them)
+        sections = None
+        if all(row[3] for row in rows):
+            sections = ','.join(parse_targets(','.join(row[3] for row in rows)))
+        c.execute(
+            'UPDATE courses SET active=?, webhook_url=?, sections=? WHERE id=?',
+            (
+                max(row[1] or 0 for row in rows),
+                next((row[2] for row in rows if row[2]), None),
+                sections,
+                keep_id
+            )
+        )
+        
+        for table in COURSE_HISTORY_TABLES:
+            if table in tables:
+                c.execute(f'UPDATE {table} SET course_id=? WHERE course_id IN ({placeholders})', [keep_id] + dup_ids)
+        for table in COURSE_STATE_TABLES:
+            if table in tables:
+                c.execute(f'DELETE FROM {table} WHERE course_id IN ({placeholders})', dup_ids)
+        c.execute(f'DELETE FROM courses WHERE id IN ({placeholders})', dup_ids)
+        
+        logger.warning(
+            "Merged duplicate course watches",
+            extra={'course': f'{subject} {course_num}', 'email': email, 'kept': keep_id,
+                   'merged': ','.join(map(str, dup_ids))}
+        )
+
+def sync_triggers():
+    """{name: (event, body)} for the triggers that keep the sync version current"""
+    bump = '''
+        UPDATE sync_state SET version = version + 1 WHERE id = 1;
+        UPDATE courses SET version = (SELECT version FROM sync_state WHERE id = 1) WHERE id = {course_id};
+    '''
+    return {
+        'courses_sync_insert': ('AFTER INSERT ON courses', bump.format(course_id='NEW.id')),
+        'courses_sync_update': (
+            'AFTER UPDATE OF subject, course_num, email, active, webhook_url, sections ON courses',
+            bump.format(course_id='NEW.id')
+        ),
+        'courses_sync_delete': ('AFTER DELETE ON courses', '''
+            UPDATE sync_state SET version = version + 1 WHERE id = 1;
+            INSERT OR REPLACE INTO course_tombstones (course_id, version)
+            VALUES (OLD.id, (SELECT version FROM sync_state WHERE id = 1));
+        '''),
+        # last_check, last_available and notification_count come from these
+        'checks_sync_insert': ('AFTER INSERT ON checks', bump.format(course_id='NEW.course_id')),
+        'notifications_sync_insert': ('AFTER INSERT ON notifications', bump.format(course_id='NEW.course_id')),
+        # Breaker state shows on the course row
+        'health_sync_insert': ('AFTER INSERT ON course_health', bump.format(course_id='NEW.course_id')),
+        'health_sync_update': ('AFTER UPDATE ON course_health', bump.format(course_id='NEW.course_id')),
+        'health_sync_delete': ('AFTER DELETE ON course_health', bump.format(course_id='OLD.course_id'))
+    }
+
+def init_sync(c):
+    """Version counter and triggers behind GET /api/courses?since="""
+    # One global counter, every change to what the course list shows bumps it
     c.execute('''
+        CREATE TABLE IF NOT EXISTS sync_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    c.execute('INSERT OR IGNORE INTO sync_state (id, version) VALUES (1, 1)')
+    
+    # Deleted courses, so clients can drop their rows
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS course_tombstones (
+            course_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    ''')
+    
+    c.execute('CREATE INDEX IF NOT EXISTS idx_courses_version ON courses (version)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_tombstones_version ON course_tombstones (version)')
+    
+    # Changed rows are re-aggregated one course at a time
+    c.execute('CREATE INDEX IF NOT EXISTS idx_checks_course ON checks (course_id, checked_at)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_notifications_course ON notifications (course_id)')
+    
+    # Recreated every time so a changed definition reaches older databases
+    for name, (event, body) in sync_triggers().items():
+        c.execute(f'DROP TRIGGER IF EXISTS {name}')
+        c.execute(f'CREATE TRIGGER {name} {event} BEGIN {body} END')
+
+_db_ready = False
+_db_lock = threading.Lock()
+
+@app.before_request
+def ensure_db():
+    """Create the schema and start the heatmap job on the first request instead of at import time"""
+    global _db_ready
+    if _db_ready:
+        return
+    # The threaded dev server can get several first requests at once
+    with _db_lock:
+        if not _db_ready:
+            init_db()
+            # Started here rather than under __main__ so every way of serving the app gets it
+            heatmap.start_heatmap_job(DB_PATH)
+            _db_ready = True
+
+@app.after_request
+def compress(response):
+    """gzip/brotli JSON and text responses for clients that accept it"""
+    return frontend_assets.compress_response(response, request.headers.get('Accept-Encoding'))
+
+_frontend = None
+
+def get_frontend():
+    """The dashboard's files, loaded on first use (and reloaded after edits in debug mode)"""
+    global _frontend
+    if _frontend is None or (app.debug and _frontend.stale()):
+        _frontend = frontend_assets.FrontendAssets().load()
+    return _frontend
+
+@app.route('/', methods=['GET'])
+@app.route('/<name>', methods=['GET'])
+def serve_frontend(name='index.html'):
+    """Dashboard files: hashed names are cached for a year, the rest revalidate by ETag"""
+    asset = get_frontend().get(name) if SERVE_FRONTEND else None
+    if asset is None:
+        return jsonify({'error': 'Not found'}), 404
+    
+    encoding = frontend_assets.pick_encoding(request.headers.get('Accept-Encoding'))
+    if encoding not in asset.bodies:
+        encoding = None
+    etag = f'{asset.etag}-{encoding}' if encoding else asset.etag
+    
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(asset.bodies[encoding], mimetype=asset.mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = asset.cache_control
+    response.vary.add('Accept-Encoding')
+    return response
+
+COURSE_FIELDS = ('subject', 'course_num', 'email', 'webhook_url', 'sections')
+
+def normalize_webhook_url(value):
+    """Clean up an optional webhook URL, returns (url, error)"""
+    url = str(value or '').strip()
+    if not url:
+        return None, None
+    if not url.startswith(('http://', 'https://')):
+        return None, 'Webhook URL must start with http:// or https://'
+    if any(ch in url for ch in '\'"<> '):
+        return None, 'Webhook URL must not contain quotes, spaces or angle brackets'
+    return url, None
+
+def normalize_sections(value):
+    """Clean up an optional list of section ids/types, returns ('A01,LE', error)"""
+    targets = parse_targets(value)
+    if not targets:
+        return None, None
+    for target in targets:
+        if not target.isalnum() or len(target) > 4:
+            return None, f'Invalid section "{target}" - use section ids like A01 or types like LE'
+    return ','.join(targets), None
+
+def normalize_course(data):
+    """Clean up one course from a request, returns (course, error)"""
+    if not isinstance(data, dict):
+        return None, 'Expected an object with subject, course_num and email'
+    
+    subject = str(data.get('subject') or '').upper().strip()
+    course_num = str(data.get('course_num') or '').strip()
+    email = str(data.get('email') or '').strip()
+    
+    if not subject or not course_num or not email:
+        return None, 'Missing required fields'
+    
+    # Validate email
+    if '@' not in email:
+        return None, 'Invalid email'
+    
+    webhook_url, error = normalize_webhook_url(data.get('webhook_url'))
+    if error:
+        return None, error
+    
+    sections, error = normalize_sections(data.get('sections'))
+    if error:
+        return None, error
+    
+    return {
+        'subject': subject,
+        'course_num': course_num,
+        'email': email,
+        'webhook_url': webhook_url,
+        'sections': sections
+    }, None
+
+def check_catalog(c, course, force=False):
+    """Turn away courses the catalog knows don't exist, returns (catalog status, error)"""
+    status, suggestions = catalog.validate(c, course['subject'], course['course_num'])
+    if status != 'unknown' or force:
+        return status, None
+    error = f"{course['subject']} {course['course_num']} isn't in the course catalog"
+    if suggestions:
+        error += ' - did you mean ' + ', '.join(
+            ' '.join(filter(None, (s['subject'], s['course_num']))) for s in suggestions
+        ) + '?'
+    return status, error
+
+def courses_query(since=None):
+    """(sql, params) behind the dashboard's course list, only rows changed after `since` if given"""
+    where = ''
+    params = ()
+    if since is not None:
+        where = 'WHERE c.version > ?'
+        params = (since,)
+    
+    return f'''
         SELECT c.id, c.subject, c.course_num, c.email, c.active, c.created_at,
+               c.webhook_url, c.sections,
                COUNT(DISTINCT n.id) as notification_count,
                MAX(ch.checked_at) as last_check,
-               MAX(ch.available_seats) as last_available
+               MAX(ch.available_seats) as last_available,
+               h.course_id, h.state, h.failures, h.last_error, h.last_failure_at, h.next_probe_at
         FROM courses c
         LEFT JOIN notifications n ON c.id = n.course_id
         LEFT JOIN checks ch ON c.id = ch.course_id
+        LEFT JOIN course_health h ON c.id = h.course_id
+        {where}
         GROUP BY c.id
         ORDER BY c.created_at DESC
-    ''')
+    ''', params
+
+def fetch_courses(c, since=None):
+    """Course rows as the dashboard shows them, only those changed after `since` if given"""
+    c.execute(*courses_query(since))
     
     courses = []
     for row in c.fetchall():
@@ -87,72 +391,349 @@ def get_courses():
             'email': row[3],
             'active': row[4] == 1,
             'created_at': row[5],
-            'notification_count': row[6],
-            'last_check': row[7],
-            'last_available': row[8]
+            'webhook_url': row[6],
+            'sections': row[7],
+            'notification_count': row[8],
+            'last_check': row[9],
+            'last_available': row[10],
+            'health': course_health.describe(row[11:]) if row[11] is not None else None
         })
+    return courses
+
+@app.route('/api/courses', methods=['GET'])
+def get_courses():
+    """Get all courses, or with ?since=<version> only what changed since then"""
+    since = request.args.get('since', type=int)
+    
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    if since is None:
+        courses = fetch_courses(c)
+        conn.close()
+        return jsonify(courses)
+    
+    # Version and rows from one snapshot, so nothing slips between them
+    c.execute('BEGIN')
+    c.execute('SELECT version FROM sync_state WHERE id = 1')
+    version = c.fetchone()[0]
     
+    # A version from the future means the database was reset
+    full = since <= 0 or since > version
+    changed = fetch_courses(c, None if full else since)
+    removed = []
+    if not full:
+        c.execute('SELECT course_id FROM course_tombstones WHERE version > ?', (since,))
+        removed = [row[0] for row in c.fetchall()]
+    conn.rollback()
     conn.close()
-    return jsonify(courses)
+    
+    return jsonify({
+        'version': version,
+        'full': full,
+        'changed': changed,
+        'removed': removed
+    })
 
 @app.route('/api/courses', methods=['POST'])
 def add_course():
     """Add a new course"""
-    data = request.json
-    
-    subject = data.get('subject', '').upper().strip()
-    course_num = data.get('course_num', '').strip()
-    email = data.get('email', '').strip()
-    
-    if not subject or not course_num or not email:
-        return jsonify({'error': 'Missing required fields'}), 400
-    
-    # Validate email
-    if '@' not in email:
-        return jsonify({'error': 'Invalid email'}), 400
+    course, error = normalize_course(request.json)
+    if error:
+        return jsonify({'error': error}), 400
     
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     
-    # Check if already exists
-    c.execute(
-        'SELECT id FROM courses WHERE subject=? AND course_num=? AND email=?',
-        (subject, course_num, email)
-    )
-    existing = c.fetchone()
+    # A typo would cost a full search every cycle, catch it here
+    catalog_status, error = check_catalog(c, course, bool(request.json.get('force')))
+    if error:
+        conn.close()
+        return jsonify({'error': error}), 400
     
-    if existing:
+    # The unique index rejects duplicates, no need to look first
+    try:
+        c.execute(
+            'INSERT INTO courses (subject, course_num, email, webhook_url, sections) VALUES (?, ?, ?, ?, ?)',
+            (course['subject'], course['course_num'], course['email'], course['webhook_url'], course['sections'])
+        )
+    except sqlite3.IntegrityError:
         conn.close()
         return jsonify({'error': 'Course already being monitored'}), 400
     
-    # Add course
-    c.execute(
-        'INSERT INTO courses (subject, course_num, email) VALUES (?, ?, ?)',
-        (subject, course_num, email)
-    )
     course_id = c.lastrowid
     conn.commit()
     conn.close()
     
     return jsonify({
         'id': course_id,
-        'subject': subject,
-        'course_num': course_num,
-        'email': email,
-        'active': True
+        'subject': course['subject'],
+        'course_num': course['course_num'],
+        'email': course['email'],
+        'webhook_url': course['webhook_url'],
+        'sections': course['sections'],
+        'active': True,
+        'catalog': catalog_status
     }), 201
 
+@app.route('/api/courses/<int:course_id>', methods=['PUT'])
+def update_course(course_id):
+    """Edit a course in place, validated like a new one before anything changes"""
+    data = request.get_json(silent=True)
+    course, error = normalize_course(data)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    c.execute('SELECT subject, course_num FROM courses WHERE id=?', (course_id,))
+    row = c.fetchone()
+    if not row:
+        conn.close()
+        return jsonify({'error': 'Course not found'}), 404
+    
+    catalog_status, error = check_catalog(c, course, bool(data.get('force')))
+    if error:
+        conn.close()
+        return jsonify({'error': error}), 400
+    
+    try:
+        c.execute(
+            'UPDATE courses SET subject=?, course_num=?, email=?, webhook_url=?, sections=? WHERE id=?',
+            (course['subject'], course['course_num'], course['email'], course['webhook_url'], course['sections'], course_id)
+        )
+    except sqlite3.IntegrityError:
+        conn.close()
+        return jsonify({'error': 'Course already being monitored'}), 400
+    
+    # A breaker tripped by the old course says nothing about the new one
+    if row != (course['subject'], course['course_num']):
+        c.execute('DELETE FROM course_health WHERE course_id=?', (course_id,))
+    conn.commit()
+    conn.close()
+    
+    return jsonify({'id': course_id, **course, 'catalog': catalog_status})
+
+def read_bulk_rows():
+    """Get the list of course rows from a JSON or CSV bulk request"""
+    upload = request.files.get('file')
+    if upload is not None:
+        text = upload.read().decode('utf-8-sig')
+    elif request.is_json:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            data = data.get('courses')
+        if not isinstance(data, list):
+            return None
+        return data
+    else:
+        text = request.get_data(as_text=True)
+    
+    # Anything that isn't JSON is treated as CSV with a header row
+    reader = csv.DictReader(io.StringIO(text))
+    return [dict(row) for row in reader]
+
+@app.route('/api/courses/bulk', methods=['POST'])
+def bulk_add_courses():
+    """Add many courses at once (JSON list or CSV)"""
+    rows = read_bulk_rows()
+    if rows is None:
+        return jsonify({'error': 'Expected a JSON list of courses or a CSV file'}), 400
+    
+    results = []
+    seen = set()
+    force = request.args.get('force') == '1'
+    
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    # Everything goes in as one transaction
+    with conn:
+        for index, row in enumerate(rows):
+            course, error = normalize_course(row)
+            if error:
+                results.append({'row': index, 'status': 'invalid', 'error': error})
+                continue
+            
+            _, error = check_catalog(c, course, force or str(row.get('force', '')).lower() in ('1', 'true', 'yes'))
+            if error:
+                results.append({'row': index, 'status': 'invalid', 'error': error})
+                continue
+            
+            key = (course['subject'], course['course_num'], course['email'])
+            if key in seen:
+                results.append({'row': index, 'status': 'duplicate', **course})
+                continue
+            seen.add(key)
+            
+            c.execute(
+                'INSERT OR IGNORE INTO courses (subject, course_num, email, webhook_url, sections) VALUES (?, ?, ?, ?, ?)',
+                key + (course['webhook_url'], course['sections'])
+            )
+            if c.rowcount:
+                results.append({'row': index, 'status': 'created', 'id': c.lastrowid, **course})
+            else:
+                results.append({'row': index, 'status': 'duplicate', **course})
+    
+    conn.close()
+    
+    summary = {'created': 0, 'duplicate': 0, 'invalid': 0}
+    for result in results:
+        summary[result['status']] += 1
+    
+    return jsonify({'summary': summary, 'results': results})
+
+@app.route('/api/catalog', methods=['GET'])
+def search_catalog():
+    """Prefix search over known courses: ?q=cse 1"""
+    limit = max(1, min(request.args.get('limit', catalog.SEARCH_LIMIT, type=int), 100))
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        results = catalog.search(conn, request.args.get('q', ''), limit)
+    finally:
+        conn.close()
+    return jsonify(results)
+
+@app.route('/api/catalog', methods=['POST'])
+def load_catalog():
+    """Bulk-load a catalog file (CSV with subject,course_num,title or 'CSE 100 Title' lines)"""
+    upload = request.files.get('file')
+    text = upload.read().decode('utf-8-sig') if upload is not None else request.get_data(as_text=True)
+    courses = catalog.read_file(text)
+    if not courses:
+        return jsonify({'error': 'No courses found in the file'}), 400
+    return jsonify({'success': True, 'loaded': catalog.load(courses, DB_PATH)})
+
+@app.route('/api/courses/export', methods=['GET'])
+def export_courses():
+    """Stream the watch list as CSV or JSON"""
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in ('csv', 'json'):
+        return jsonify({'error': 'Format must be csv or json'}), 400
+    
+    def generate_rows():
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            c = conn.cursor()
+            c.execute('SELECT id, subject, course_num, email, webhook_url, sections, active FROM courses ORDER BY id')
+            for row in c:
+                yield row
+        finally:
+            conn.close()
+    
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(('id',) + COURSE_FIELDS + ('active',))
+        for row in generate_rows():
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        yield buffer.getvalue()
+    
+    def generate_json():
+        yield '['
+        first = True
+        for row in generate_rows():
+            course = {
+                'id': row[0],
+                'subject': row[1],
+                'course_num': row[2],
+                'email': row[3],
+                'webhook_url': row[4],
+                'sections': row[5],
+                'active': row[6] == 1
+            }
+            yield ('' if first else ',') + json.dumps(course)
+            first = False
+        yield ']'
+    
+    if export_format == 'json':
+        return Response(generate_json(), mimetype='application/json')
+    
+    return Response(
+        generate_csv(),
+        mimetype='text/csv',
+        headers={'Content-Disposition': 'attachment; filename=courses.csv'}
+    )
+
 @app.route('/api/courses/<int:course_id>', methods=['DELETE'])
 def delete_course(course_id):
     """Delete a course"""
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     c.execute('DELETE FROM courses WHERE id=?', (course_id,))
+    c.execute('DELETE FROM course_health WHERE course_id=?', (course_id,))
+    conn.commit()
+    conn.close()
+    
+    return jsonify({'success': True})
+
+@app.route('/api/courses/<int:course_id>/health', methods=['GET'])
+def get_course_health(course_id):
+    """Circuit breaker state for one course (state 'ok' when it isn't failing)"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute(
+        'SELECT course_id, state, failures, last_error, last_failure_at, next_probe_at FROM course_health WHERE course_id=?',
+        (course_id,)
+    )
+    row = c.fetchone()
+    conn.close()
+    
+    return jsonify(course_health.describe(row) if row else {'state': 'ok', 'failures': 0})
+
+@app.route('/api/courses/<int:course_id>/health/reset', methods=['POST'])
+def reset_course_health(course_id):
+    """Close a course's breaker so the next cycle checks it again"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('DELETE FROM course_health WHERE course_id=?', (course_id,))
     conn.commit()
     conn.close()
     
     return jsonify({'success': True})
 
+@app.route('/api/courses/<int:course_id>/webhook', methods=['POST'])
+def set_course_webhook(course_id):
+    """Set or clear the webhook for a course"""
+    data = request.get_json(silent=True) or {}
+    webhook_url, error = normalize_webhook_url(data.get('webhook_url'))
+    if error:
+        return jsonify({'error': error}), 400
+    
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('UPDATE courses SET webhook_url=? WHERE id=?', (webhook_url, course_id))
+    updated = c.rowcount
+    conn.commit()
+    conn.close()
+    
+    if not updated:
+        return jsonify({'error': 'Course not found'}), 404
+    return jsonify({'success': True, 'webhook_url': webhook_url})
+
+@app.route('/api/courses/<int:course_id>/sections', methods=['POST'])
+def set_course_sections(course_id):
+    """Watch only some sections of a course (empty means all of them)"""
+    data = request.get_json(silent=True) or {}
+    sections, error = normalize_sections(data.get('sections'))
+    if error:
+        return jsonify({'error': error}), 400
+    
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('UPDATE courses SET sections=? WHERE id=?', (sections, course_id))
+    updated = c.rowcount
+    conn.commit()
+    conn.close()
+    
+    if not updated:
+        return jsonify({'error': 'Course not found'}), 404
+    return jsonify({'success': True, 'sections': sections})
+
 @app.route('/api/courses/<int:course_id>/toggle', methods=['POST'])
 def toggle_course(course_id):
     """Toggle course active status"""
@@ -230,6 +811,21 @@ def get_course_history(course_id):
     conn.close()
     return jsonify(history)
 
+@app.route('/api/courses/<int:course_id>/heatmap', methods=['GET'])
+def get_course_heatmap(course_id):
+    """Get hour-of-week seat availability for a course"""
+    return jsonify(heatmap.get_heatmap(DB_PATH, course_id))
+
+@app.route('/api/latency', methods=['GET'])
+def get_latency():
+    """Open-to-alert latency histograms across all courses"""
+    return jsonify(latency.get_latency_report(DB_PATH))
+
+@app.route('/api/courses/<int:course_id>/latency', methods=['GET'])
+def get_course_latency(course_id):
+    """Open-to-alert latency histograms for one course"""
+    return jsonify(latency.get_latency_report(DB_PATH, course_id))
+
 @app.route('/api/monitor/status', methods=['GET'])
 def get_monitor_status():
     """Get monitor status"""
@@ -264,10 +860,11 @@ def start_monitor():
     with open('monitor_config.json', 'w') as f:
         json.dump({'interval': interval}, f)
     
-    # Start monitor in background using the WORKING hybrid version
+    # Start monitor in background using the WORKING hybrid version.
+    # It writes its own rotating monitor.log, stdout only gets prompts and crashes
     subprocess.Popen([
         'python3', 'hybrid_monitor.py'
-    ], stdout=open('monitor.log', 'w'), stderr=subprocess.STDOUT)
+    ], stdout=open('monitor_console.log', 'a'), stderr=subprocess.STDOUT)
     
     time.sleep(2)
     
@@ -303,43 +900,145 @@ def update_monitor_config():
         'message': f'Config updated (checking every {interval//60} minutes)'
     })
 
+@app.route('/api/monitor/profile', methods=['POST'])
+def profile_monitor():
+    """Sample the running monitor for its next few cycles"""
+    if not is_monitor_running():
+        return jsonify({'error': 'Monitor is not running'}), 409
+    
+    data = request.json or {}
+    try:
+        cycles = int(data.get('cycles', 1))
+        interval_ms = float(data.get('interval_ms', profiler.DEFAULT_INTERVAL * 1000))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'cycles and interval_ms must be numbers'}), 400
+    if not 1 <= cycles <= profiler.MAX_CYCLES:
+        return jsonify({'error': f'cycles must be between 1 and {profiler.MAX_CYCLES}'}), 400
+    if not 1 <= interval_ms <= 1000:
+        return jsonify({'error': 'interval_ms must be between 1 and 1000'}), 400
+    
+    profiler.request_profile(cycles, interval_ms / 1000)
+    return jsonify({
+        'success': True,
+        'message': f'Profiling the next {cycles} cycle(s), results appear under /api/profiles'
+    }), 202
+
+@app.route('/api/profiles', methods=['GET'])
+def get_profiles():
+    """List written profiles, newest first"""
+    return jsonify(profiler.list_profiles())
+
+@app.route('/api/profiles/<path:name>', methods=['GET'])
+def download_profile(name):
+    """Download a collapsed-stack or summary file"""
+    return send_from_directory(os.path.abspath(profiler.PROFILE_DIR), name, as_attachment=True)
+
+def is_monitor_running():
+    """Check the status file the monitor keeps up to date"""
+    try:
+        with open('monitor_status.json', 'r') as f:
+            return json.load(f).get('running', False)
+    except (OSError, ValueError):
+        return False
+
+def get_check_request(request_id):
+    """Load a "check now" request and its result if it's done"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute(
+        'SELECT id, course_id, status, result, requested_at, completed_at FROM check_requests WHERE id=?',
+        (request_id,)
+    )
+    row = c.fetchone()
+    conn.close()
+    
+    if not row:
+        return None
+    
+    return {
+        'request_id': row[0],
+        'course_id': row[1],
+        'status': row[2],
+        'result': json.loads(row[3]) if row[3] else None,
+        'requested_at': row[4],
+        'completed_at': row[5]
+    }
+
 @app.route('/api/courses/<int:course_id>/check-now', methods=['POST'])
 def check_course_now(course_id):
-    """Immediately check a single course"""
-    import subprocess
-    import sys
+    """Ask the running monitor to check a course right away"""
+    data = request.get_json(silent=True) or {}
+    try:
+        wait = float(data.get('wait', request.args.get('wait', 30)))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'wait must be a number of seconds'}), 400
+    if wait != wait:  # NaN
+        return jsonify({'error': 'wait must be a number of seconds'}), 400
+    wait = min(max(wait, 0), CHECK_NOW_MAX_WAIT)
     
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
-    c.execute('SELECT subject, course_num, email FROM courses WHERE id=?', (course_id,))
+    c.execute('SELECT subject, course_num FROM courses WHERE id=?', (course_id,))
     course = c.fetchone()
-    conn.close()
     
     if not course:
+        conn.close()
         return jsonify({'error': 'Course not found'}), 404
     
-    subject, course_num, email = course
+    # The check runs on the monitor's logged-in browser
+    if not is_monitor_running():
+        conn.close()
+        return jsonify({'error': 'Monitor is not running - start it first'}), 409
     
-    # Run check in background
-    subprocess.Popen([
-        sys.executable, 
-        'check_single_course.py',
-        str(course_id),
-        subject,
-        course_num,
-        email
-    ])
+    subject, course_num = course
+    c.execute('INSERT INTO check_requests (course_id) VALUES (?)', (course_id,))
+    request_id = c.lastrowid
+    conn.commit()
+    conn.close()
     
-    return jsonify({
-        'success': True,
-        'message': f'Checking {subject} {course_num}...'
-    })
+    # Wait for the monitor to answer, up to `wait` seconds
+    deadline = time.time() + wait
+    check = get_check_request(request_id)
+    while check['status'] in ('pending', 'running') and time.time() < deadline:
+        time.sleep(0.25)
+        check = get_check_request(request_id)
+    
+    if check['status'] == 'done':
+        seats = check['result']['total_available']
+        check['message'] = f'{subject} {course_num}: {seats} seats available'
+        return jsonify(check)
+    
+    if check['status'] == 'timeout':
+        check['error'] = f'Checking {subject} {course_num} took too long - WebReg may be slow'
+        return jsonify(check), 504
+    
+    if check['status'] in ('failed', 'expired'):
+        check['error'] = f'Could not check {subject} {course_num}'
+        return jsonify(check), 502
+    
+    check['message'] = f'Checking {subject} {course_num}...'
+    return jsonify(check), 202
+
+@app.route('/api/check-requests/<int:request_id>', methods=['GET'])
+def get_check_request_status(request_id):
+    """Poll a "check now" request"""
+    check = get_check_request(request_id)
+    if not check:
+        return jsonify({'error': 'Request not found'}), 404
+    return jsonify(check)
 
 if __name__ == '__main__':
     print("\n" + "="*60)
     print("WEBREG MONITOR - API SERVER")
     print("="*60)
-    print("API running at: http://localhost:5001")
-    print("Frontend should connect to this")
+    print("API running at: http://localhost:5001/api")
+    if SERVE_FRONTEND:
+        print("Dashboard at: http://localhost:5001/")
     print("="*60 + "\n")
+    
+    # The debug reloader runs this file twice, only the child serves requests
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        ensure_db()
+        print(f"API ready in {time.perf_counter() - STARTED:.2f}s")
+    
     app.run(debug=True, port=5001)
\ No newline at end of file
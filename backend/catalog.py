@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WebReg Monitor - Local course catalog
+
+Known subject/course pairs, learned from every search that came back with
+results and optionally bulk-loaded from a file. The API uses it to turn
+away typos before they reach the scraper (a course that doesn't exist
+costs a full search every cycle) and to serve prefix search for the
+dashboard's autocomplete.
+
+A subject only counts as fully known once it has been loaded from a file.
+Until then a missing course may simply not have been searched yet, so
+it is let through.
+
+Usage:
+    python3 catalog.py load catalog.csv      # CSV with subject,course_num[,title] columns
+    python3 catalog.py load catalog.txt      # or one "CSE 100 Advanced Data Structures" per line
+    python3 catalog.py search "cse 1"
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import re
+import sqlite3
+
+logger = logging.getLogger('webreg.catalog')
+
+DB_PATH = 'webreg.db'
+SEARCH_LIMIT = 20
+SUGGESTIONS = 5
+
+# "CSE 100", "CSE100", "MATH 20C Calculus for Science and Engineering"
+COURSE_PATTERN = re.compile(r'^([A-Za-z]{2,5})\s*(\d+[A-Za-z]{0,3})\b\s*(.*)$')
+
+def init_catalog_table(conn):
+    """Create the catalog table if it doesn't exist"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS catalog (
+            subject TEXT NOT NULL,
+            course_num TEXT NOT NULL,
+            title TEXT,
+            source TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (subject, course_num)
+        )
+    ''')
+
+def normalize(subject, course_num):
+    return str(subject or '').strip().upper(), str(course_num or '').strip().upper()
+
+def parse_course(text):
+    """Split 'CSE 100 Advanced Data Structures' into ('CSE', '100', 'Advanced Data Structures')"""
+    match = COURSE_PATTERN.match(' '.join(str(text).split()))
+    if not match:
+        return None
+    subject, course_num = normalize(match.group(1), match.group(2))
+    return subject, course_num, match.group(3) or None
+
+def add_courses(conn, courses, source):
+    """Upsert (subject, course_num, title) rows. A file listing outranks what searches saw."""
+    conn.executemany('''
+        INSERT INTO catalog (subject, course_num, title, source) VALUES (?, ?, ?, ?)
+        ON CONFLICT (subject, course_num) DO UPDATE SET
+            title = COALESCE(excluded.title, catalog.title),
+            source = CASE WHEN catalog.source = 'file' THEN 'file' ELSE excluded.source END,
+            updated_at = CURRENT_TIMESTAMP
+    ''', [(subject, course_num, title, source) for subject, course_num, title in courses])
+
+def courses_from_result(subject, course_num, result):
+    """Catalog rows a successful search tells us about (one per result group)"""
+    courses = {}
+    for label in (result or {}).get('groups', {}):
+        parsed = parse_course(label)
+        if parsed:
+            courses[parsed[:2]] = parsed
+    # The course we searched for exists even if the page had no group headers
+    key = normalize(subject, course_num)
+    courses.setdefault(key, key + (None,))
+    return list(courses.values())
+
+def record_search(subject, course_num, result, db_path=DB_PATH):
+    """Remember the courses a successful search returned"""
+    conn = sqlite3.connect(db_path)
+    try:
+        init_catalog_table(conn)
+        with conn:
+            add_courses(conn, courses_from_result(subject, course_num, result), 'search')
+    finally:
+        conn.close()
+
+def read_file(text):
+    """Catalog rows from CSV (subject,course_num[,title] header) or 'CSE 100 Title' lines"""
+    text = text.lstrip('\ufeff')
+    first_line = text.split('\n', 1)[0].lower()
+    courses = []
+    if 'subject' in first_line and 'course_num' in first_line:
+        for row in csv.DictReader(io.StringIO(text)):
+            subject, course_num = normalize(row.get('subject'), row.get('course_num'))
+            if subject and course_num:
+                courses.append((subject, course_num, (row.get('title') or '').strip() or None))
+    else:
+        for line in text.splitlines():
+            parsed = parse_course(line)
+            if parsed:
+                courses.append(parsed)
+    return courses
+
+def load(courses, db_path=DB_PATH):
+    """Bulk-load catalog rows, returns how many were given"""
+    conn = sqlite3.connect(db_path)
+    try:
+        init_catalog_table(conn)
+        with conn:
+            add_courses(conn, courses, 'file')
+    finally:
+        conn.close()
+    logger.info("Catalog loaded", extra={'courses': len(courses)})
+    return len(courses)
+
+def prefix_end(prefix):
+    """Smallest string greater than every string starting with `prefix`"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def search(conn, query, limit=SEARCH_LIMIT):
+    """Courses whose code starts with `query` ('cse', 'cse 1', 'CSE10'), as dicts"""
+    query = ' '.join(str(query or '').split()).upper()
+    match = re.match(r'^([A-Z]+)\s*(\w*)$', query)
+    if not match:
+        return []
+    subject, course_num = match.groups()
+
+    # Range scans on the primary key rather than LIKE, which can't use it
+    if course_num:
+        rows = conn.execute('''
+            SELECT subject, course_num, title FROM catalog
+            WHERE subject = ? AND course_num >= ? AND course_num < ?
+            ORDER BY LENGTH(course_num), course_num LIMIT ?
+        ''', (subject, course_num, prefix_end(course_num), limit)).fetchall()
+    else:
+        rows = conn.execute('''
+            SELECT subject, course_num, title FROM catalog
+            WHERE subject >= ? AND subject < ?
+            ORDER BY subject, LENGTH(course_num), course_num LIMIT ?
+        ''', (subject, prefix_end(subject), limit)).fetchall()
+    return [{'subject': s, 'course_num': n, 'title': t} for s, n, t in rows]
+
+def validate(conn, subject, course_num):
+    """Check a course against the catalog, returns (status, suggestions).
+    status is 'known', 'unverified' (can't tell yet) or 'unknown'."""
+    subject, course_num = normalize(subject, course_num)
+    row = conn.execute(
+        'SELECT 1 FROM catalog WHERE subject = ? AND course_num = ?', (subject, course_num)
+    ).fetchone()
+    if row:
+        return 'known', []
+
+    listed = conn.execute(
+        "SELECT 1 FROM catalog WHERE source = 'file' LIMIT 1"
+    ).fetchone()
+    subject_listed = conn.execute(
+        "SELECT 1 FROM catalog WHERE subject = ? AND source = 'file' LIMIT 1", (subject,)
+    ).fetchone()
+    if subject_listed:
+        # Same subject, same leading digits: CSE 1000 -> CSE 100, CSE 100A
+        digits = re.match(r'\d*', course_num).group()
+        return 'unknown', search(conn, f'{subject} {digits[:-1] or digits}', SUGGESTIONS)
+    if listed and not conn.execute('SELECT 1 FROM catalog WHERE subject = ? LIMIT 1', (subject,)).fetchone():
+        # A loaded catalog has never heard of this subject - suggest ones that start the same way
+        subjects = conn.execute('''
+            SELECT DISTINCT subject FROM catalog WHERE subject >= ? AND subject < ? LIMIT ?
+        ''', (subject[:1], prefix_end(subject[:1]), SUGGESTIONS)).fetchall()
+        return 'unknown', [{'subject': s, 'course_num': None, 'title': None} for (s,) in subjects]
+    return 'unverified', []
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Manage the local course catalog')
+    parser.add_argument('--db', default=DB_PATH)
+    commands = parser.add_subparsers(dest='command', required=True)
+    load_cmd = commands.add_parser('load', help='bulk-load a catalog file')
+    load_cmd.add_argument('file')
+    search_cmd = commands.add_parser('search', help='prefix search the catalog')
+    search_cmd.add_argument('query')
+
+    args = parser.parse_args()
+
+    if args.command == 'load':
+        with open(args.file, 'r', encoding='utf-8') as f:
+            print(f"{load(read_file(f.read()), args.db)} courses loaded")
+    else:
+        conn = sqlite3.connect(args.db)
+        init_catalog_table(conn)
+        print(json.dumps(search(conn, args.query), indent=2))
+        conn.close()
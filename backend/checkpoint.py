@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+WebReg Monitor - Crash-safe state checkpoints
+
+The monitor writes its in-memory state (iteration, seat state, progress
+through the current cycle, the next cycle's start time, alerts still
+waiting in the email digest) to one JSON file. The file is written to a
+temp file first, synced and renamed over the old one, so a crash leaves
+either the previous checkpoint or the new one, never half of each. A
+save whose state hasn't changed since the last one is skipped, so
+checkpointing after every course costs a json.dumps.
+"""
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger('webreg.checkpoint')
+
+CHECKPOINT_FILE = 'monitor_checkpoint.json'
+FORMAT = 1
+MAX_AGE = 6 * 3600  # older checkpoints describe a world that has moved on
+
+class Checkpoint:
+    """One JSON checkpoint file, replaced atomically on every save"""
+
+    def __init__(self, path=CHECKPOINT_FILE):
+        self.path = path
+        self._last = None
+
+    def save(self, state):
+        """Write `state` unless it's unchanged, returns True if the file was written"""
+        body = json.dumps(state, sort_keys=True)
+        if body == self._last:
+            return False
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(f'{{"format": {FORMAT}, "saved_at": {time.time()}, "state": {body}}}')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._last = body
+        return True
+
+    def load(self, max_age=MAX_AGE):
+        """The saved state, or None if there's no usable checkpoint"""
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable checkpoint: %s", e)
+            return None
+
+        if data.get('format') != FORMAT:
+            logger.warning("Ignoring checkpoint in an old format", extra={'format': data.get('format')})
+            return None
+        age = time.time() - data.get('saved_at', 0)
+        if age > max_age:
+            logger.info("Ignoring stale checkpoint", extra={'age': round(age)})
+            return None
+
+        logger.info("Checkpoint loaded", extra={'age': round(age)})
+        return data['state']
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+WebReg Monitor - Alert cooldowns
+
+Remembers when each (course, channel) last alerted so the same opening
+doesn't play a sound, send an email or fire a webhook on every check.
+Decisions are dict lookups. The table is copied to SQLite every so often
+and at shutdown, so cooldowns still hold after a restart.
+"""
+import logging
+import sqlite3
+import time
+
+logger = logging.getLogger('webreg.cooldown')
+
+# Seconds per channel, 0 turns the cooldown off
+DEFAULT_TTLS = {
+    'sound': 3600,
+    'email': 3600,
+    'webhook': 3600
+}
+SNAPSHOT_INTERVAL = 60
+
+def init_cooldown_table(conn):
+    """Create the cooldown snapshot table if it doesn't exist"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS cooldowns (
+            course_id INTEGER NOT NULL,
+            channel TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (course_id, channel)
+        )
+    ''')
+
+class CooldownCache:
+    """In-memory (course, channel) -> expiry map with periodic SQLite snapshots"""
+
+    def __init__(self, db_path, ttls=None):
+        self.db_path = db_path
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self._expires = {}
+        self._loaded = False
+        self._dirty = False
+        self._snapshot_at = 0
+
+    def load(self):
+        """Restore cooldowns that haven't run out yet"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            init_cooldown_table(conn)
+            rows = conn.execute(
+                'SELECT course_id, channel, expires_at FROM cooldowns WHERE expires_at > ?', (time.time(),)
+            ).fetchall()
+            conn.commit()
+        finally:
+            conn.close()
+        self._expires = {(course_id, channel): expires_at for course_id, channel, expires_at in rows}
+        self._loaded = True
+        self._snapshot_at = time.monotonic()
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            try:
+                self.load()
+            except sqlite3.Error as e:
+                logger.warning("Could not restore cooldowns: %s", e)
+                self._loaded = True
+
+    def cooling(self, course_id, channel, now=None):
+        """True while this course's channel is still cooling down"""
+        self._ensure_loaded()
+        key = (course_id, channel)
+        expires_at = self._expires.get(key)
+        if expires_at is None:
+            return False
+        if expires_at > (now or time.time()):
+            return True
+        del self._expires[key]
+        self._dirty = True
+        return False
+
+    def start(self, course_id, channel, now=None):
+        """Begin a cooldown for this course's channel"""
+        self._ensure_loaded()
+        ttl = self.ttls.get(channel, 0)
+        if ttl > 0:
+            self._expires[(course_id, channel)] = (now or time.time()) + ttl
+            self._dirty = True
+
+    def try_start(self, course_id, channel, now=None):
+        """Start a cooldown unless one is running, returns True if the alert may go out"""
+        if self.cooling(course_id, channel, now):
+            return False
+        self.start(course_id, channel, now)
+        return True
+
+    def snapshot(self):
+        """Write the live cooldowns to SQLite (no-op if nothing changed)"""
+        if not self._loaded or not self._dirty:
+            return
+        now = time.time()
+        self._expires = {key: expires_at for key, expires_at in self._expires.items() if expires_at > now}
+        conn = sqlite3.connect(self.db_path)
+        try:
+            init_cooldown_table(conn)
+            with conn:
+                conn.execute('DELETE FROM cooldowns')
+                conn.executemany(
+                    'INSERT INTO cooldowns (course_id, channel, expires_at) VALUES (?, ?, ?)',
+                    [(course_id, channel, expires_at) for (course_id, channel), expires_at in self._expires.items()]
+                )
+        finally:
+            conn.close()
+        self._dirty = False
+        self._snapshot_at = time.monotonic()
+
+    def maybe_snapshot(self, interval=SNAPSHOT_INTERVAL):
+        """Snapshot if the last one is older than `interval` seconds"""
+        if self._dirty and time.monotonic() - self._snapshot_at >= interval:
+            try:
+                self.snapshot()
+            except sqlite3.Error as e:
+                logger.warning("Could not save cooldowns: %s", e)
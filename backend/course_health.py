@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+WebReg Monitor - Per-course circuit breakers
+
+A course that keeps coming back empty (typo, cancelled, parse failure)
+would otherwise cost a full search every cycle. After a few failures in
+a row its breaker opens. From then on the course is only probed on an
+exponential backoff, and one good result closes the breaker again.
+
+The table is the source of truth. The monitor reloads it every cycle,
+so a reset from the API takes effect on the next cycle. Healthy courses
+have no row at all.
+"""
+import logging
+import sqlite3
+import time
+
+logger = logging.getLogger('webreg.health')
+
+FAILURE_THRESHOLD = 3  # failures in a row before the breaker opens
+BASE_BACKOFF = 600  # seconds until the first probe
+MAX_BACKOFF = 6 * 3600
+
+def init_health_table(conn):
+    """Create the course health table if it doesn't exist"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS course_health (
+            course_id INTEGER PRIMARY KEY,
+            state TEXT NOT NULL,
+            failures INTEGER NOT NULL,
+            last_error TEXT,
+            last_failure_at REAL,
+            next_probe_at REAL
+        )
+    ''')
+
+def backoff(failures, threshold=FAILURE_THRESHOLD, base=BASE_BACKOFF, maximum=MAX_BACKOFF):
+    """Seconds until the next probe: base, then doubling per failed probe"""
+    return min(maximum, base * 2 ** max(0, failures - threshold))
+
+def describe(row, now=None):
+    """API view of a course_health row"""
+    course_id, state, failures, last_error, last_failure_at, next_probe_at = row
+    health = {
+        'state': state,
+        'failures': failures,
+        'last_error': last_error,
+        'last_failure_at': last_failure_at
+    }
+    if state == 'open':
+        health['next_probe_at'] = next_probe_at
+        health['next_probe_in'] = max(0, round(next_probe_at - (now or time.time())))
+    return health
+
+class CourseBreakers:
+    """Failure counts and open breakers, kept in step with the course_health table"""
+
+    def __init__(self, db_path, threshold=FAILURE_THRESHOLD, base_backoff=BASE_BACKOFF, max_backoff=MAX_BACKOFF):
+        self.db_path = db_path
+        self.threshold = threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._rows = {}
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_path)
+        init_health_table(conn)
+        return conn
+
+    def load(self):
+        """Re-read the table (start of every cycle)"""
+        conn = self.connect()
+        try:
+            rows = conn.execute(
+                'SELECT course_id, state, failures, last_error, last_failure_at, next_probe_at FROM course_health'
+            ).fetchall()
+        finally:
+            conn.close()
+        self._rows = {row[0]: row for row in rows}
+
+    def _write(self, sql, params):
+        # The in-memory state still holds for this cycle if the write fails
+        try:
+            conn = self.connect()
+            try:
+                with conn:
+                    conn.execute(sql, params)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning("Could not save course health: %s", e)
+
+    def is_open(self, course_id):
+        row = self._rows.get(course_id)
+        return row is not None and row[1] == 'open'
+
+    def should_check(self, course_id, now=None):
+        """False while the course's breaker is open and its next probe isn't due"""
+        row = self._rows.get(course_id)
+        if row is None or row[1] != 'open':
+            return True
+        return (now or time.time()) >= row[5]
+
+    def record_success(self, course_id):
+        """A good result closes the breaker and clears the count"""
+        if course_id not in self._rows:
+            return
+        was_open = self.is_open(course_id)
+        del self._rows[course_id]
+        self._write('DELETE FROM course_health WHERE course_id=?', (course_id,))
+        if was_open:
+            logger.info("Course recovered, breaker closed", extra={'course_id': course_id})
+
+    def record_failure(self, course_id, reason, now=None):
+        """Count a failed check, opening (or keeping open) the breaker past the threshold"""
+        now = now or time.time()
+        row = self._rows.get(course_id)
+        failures = (row[2] if row else 0) + 1
+        state = 'open' if failures >= self.threshold else 'closed'
+        next_probe_at = None
+        if state == 'open':
+            next_probe_at = now + backoff(failures, self.threshold, self.base_backoff, self.max_backoff)
+        row = (course_id, state, failures, reason, now, next_probe_at)
+        self._rows[course_id] = row
+
+        self._write('''
+            INSERT OR REPLACE INTO course_health
+                (course_id, state, failures, last_error, last_failure_at, next_probe_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', row)
+
+        if state == 'open':
+            logger.warning(
+                "Course keeps failing, backing off",
+                extra={'course_id': course_id, 'failures': failures, 'reason': reason,
+                       'next_probe_in': round(next_probe_at - now)}
+            )
+        return describe(row, now)
+
+    def status(self, now=None):
+        """Open breakers and failing courses for the status file"""
+        return {str(course_id): describe(row, now) for course_id, row in self._rows.items()}
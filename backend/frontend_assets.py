@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+WebReg Monitor - Serving the dashboard from the API process
+
+Loads frontend/ once (again after an edit when running in debug mode). Each stylesheet and script gets a
+content-hashed name (app.3f2a9c1d.js), and index.html is rewritten to
+point at those names and to call the API on its own origin. The hashed
+files can then be cached for a year, because a changed file gets a new
+name. index.html itself is revalidated on every load by ETag. Every asset
+is compressed once up front. JSON responses are compressed per request.
+Brotli is used when the `brotli` package is installed, gzip otherwise.
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger('webreg.frontend')
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend')
+HASHED_EXTENSIONS = ('.css', '.js')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/html', 'text/css', 'text/javascript', 'application/javascript', 'text/csv', 'text/plain')
+MIN_COMPRESS_BYTES = 512
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # per-request; assets are compressed once at the highest quality
+
+def encodings():
+    return ('br', 'gzip') if brotli else ('gzip',)
+
+def compress(body, encoding, best=False):
+    if encoding == 'br':
+        return brotli.compress(body, quality=11 if best else BROTLI_QUALITY)
+    return gzip.compress(body, 9 if best else GZIP_LEVEL, mtime=0)
+
+def pick_encoding(accept_encoding):
+    """The best encoding we have that the client accepts (None for identity)"""
+    accepted = set()
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.partition(';')
+        try:
+            quality = float(params.strip()[2:]) if params.strip().startswith('q=') else 1
+        except ValueError:
+            quality = 1
+        if quality > 0:
+            accepted.add(name.strip().lower())
+    for encoding in encodings():
+        if encoding in accepted or '*' in accepted:
+            return encoding
+    return None
+
+class Asset:
+    """One file, ready to send in every encoding"""
+
+    def __init__(self, body, mimetype, cache_control):
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.etag = hashlib.sha256(body).hexdigest()[:16]
+        self.bodies = {None: body}
+        if body and len(body) >= MIN_COMPRESS_BYTES:
+            for encoding in encodings():
+                self.bodies[encoding] = compress(body, encoding, best=True)
+
+class FrontendAssets:
+    """The dashboard's files keyed by the path they're served under"""
+
+    def __init__(self, directory=FRONTEND_DIR, api_url='/api'):
+        self.directory = os.path.abspath(directory)
+        self.api_url = api_url
+        self.assets = {}
+        self.loaded_mtime = None
+
+    def load(self):
+        """Read, hash and compress everything in the frontend directory"""
+        self.loaded_mtime = self.mtime()
+        assets = {}
+        hashed_names = {}
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if name == 'index.html' or not os.path.isfile(path):
+                continue
+            with open(path, 'rb') as f:
+                body = f.read()
+            mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+            if name.endswith(HASHED_EXTENSIONS):
+                stem, ext = os.path.splitext(name)
+                hashed = f'{stem}.{hashlib.sha256(body).hexdigest()[:8]}{ext}'
+                hashed_names[name] = hashed
+                assets[hashed] = Asset(body, mimetype, IMMUTABLE)
+            # The plain name still works, it just isn't cached for long
+            assets[name] = Asset(body, mimetype, REVALIDATE)
+
+        with open(os.path.join(self.directory, 'index.html'), 'r', encoding='utf-8') as f:
+            html = f.read()
+        for name, hashed in hashed_names.items():
+            html = re.sub(rf'(src|href)="{re.escape(name)}"', rf'\1="{hashed}"', html)
+        html = re.sub(
+            r'(<meta name="api-url" content=")[^"]*(")', rf'\g<1>{self.api_url}\g<2>', html
+        )
+        assets['index.html'] = Asset(html.encode('utf-8'), 'text/html', REVALIDATE)
+        self.assets = assets
+
+        logger.info(
+            "Frontend loaded",
+            extra={'files': len(self.assets), 'encodings': ','.join(encodings())}
+        )
+        return self
+
+    def mtime(self):
+        """Newest modification time in the frontend directory"""
+        return max(os.path.getmtime(os.path.join(self.directory, name)) for name in os.listdir(self.directory))
+
+    def stale(self):
+        """True once a file changed since load() (checked in debug mode only)"""
+        return self.mtime() != self.loaded_mtime
+
+    def get(self, path):
+        return self.assets.get(path or 'index.html')
+
+def compress_response(response, accept_encoding):
+    """Compress a finished Flask response in place when it's worth it"""
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or 'Content-Encoding' in response.headers
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or response.mimetype not in COMPRESSIBLE_TYPES
+    ):
+        return response
+
+    body = response.get_data()
+    response.vary.add('Accept-Encoding')
+    encoding = pick_encoding(accept_encoding)
+    if encoding is None or len(body) < MIN_COMPRESS_BYTES:
+        return response
+
+    response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+WebReg Monitor - Seat availability heatmaps
+
+Folds new rows from the checks table into per-course hour-of-week
+aggregates so the API can answer "when does this course open up?"
+without reading the raw history.
+"""
+import logging
+import sqlite3
+import threading
+
+logger = logging.getLogger('webreg.heatmap')
+
+BATCH_SIZE = 50000
+REFRESH_INTERVAL = 60  # seconds between background folds
+
+DAY_NAMES = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat']
+
+# Hour of the week (0 = Sunday midnight) in local time, computed by SQLite
+HOUR_OF_WEEK_SQL = (
+    "(CAST(strftime('%w', checked_at, 'localtime') AS INTEGER) * 24 + "
+    "CAST(strftime('%H', checked_at, 'localtime') AS INTEGER))"
+)
+
+def init_heatmap_tables(conn):
+    """Create the aggregate tables if they don't exist"""
+    c = conn.cursor()
+
+    # One row per course per hour of the week
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS heatmap_cells (
+            course_id INTEGER NOT NULL,
+            hour_of_week INTEGER NOT NULL,
+            samples INTEGER DEFAULT 0,
+            open_samples INTEGER DEFAULT 0,
+            seat_sum INTEGER DEFAULT 0,
+            close_count INTEGER DEFAULT 0,
+            close_seconds REAL DEFAULT 0,
+            PRIMARY KEY (course_id, hour_of_week)
+        )
+    ''')
+
+    # Open episodes that haven't closed yet, carried between batches
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS heatmap_open (
+            course_id INTEGER PRIMARY KEY,
+            is_open INTEGER NOT NULL,
+            opened_at TIMESTAMP,
+            opened_hour INTEGER
+        )
+    ''')
+
+    # How far into the checks table we've folded
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS heatmap_progress (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_check_id INTEGER NOT NULL
+        )
+    ''')
+    c.execute('INSERT OR IGNORE INTO heatmap_progress (id, last_check_id) VALUES (1, 0)')
+    conn.commit()
+
+def fold_batch(conn, batch_size=BATCH_SIZE):
+    """Fold the next batch of checks into the aggregates, returns rows folded"""
+    c = conn.cursor()
+
+    c.execute('SELECT last_check_id FROM heatmap_progress WHERE id=1')
+    last_id = c.fetchone()[0]
+
+    c.execute(
+        'SELECT MAX(id) FROM (SELECT id FROM checks WHERE id > ? ORDER BY id LIMIT ?)',
+        (last_id, batch_size)
+    )
+    end_id = c.fetchone()[0]
+    if end_id is None:
+        return 0
+
+    with conn:
+        # Samples, open samples and seat totals in a single set-based pass
+        c.execute(f'''
+            INSERT INTO heatmap_cells (course_id, hour_of_week, samples, open_samples, seat_sum)
+            SELECT course_id, {HOUR_OF_WEEK_SQL}, COUNT(*),
+                   SUM(available_seats > 0), SUM(COALESCE(available_seats, 0))
+            FROM checks
+            WHERE id > ? AND id <= ? AND course_id IS NOT NULL
+            GROUP BY course_id, {HOUR_OF_WEEK_SQL}
+            ON CONFLICT (course_id, hour_of_week) DO UPDATE SET
+                samples = samples + excluded.samples,
+                open_samples = open_samples + excluded.open_samples,
+                seat_sum = seat_sum + excluded.seat_sum
+        ''', (last_id, end_id))
+
+        # Time-to-close only needs the rows where a course flips open/closed
+        c.execute(f'''
+            SELECT course_id, is_open, checked_at, hour_of_week FROM (
+                SELECT course_id, checked_at,
+                       available_seats > 0 AS is_open,
+                       LAG(available_seats > 0) OVER (
+                           PARTITION BY course_id ORDER BY id
+                       ) AS was_open,
+                       {HOUR_OF_WEEK_SQL} AS hour_of_week
+                FROM checks
+                WHERE id > ? AND id <= ? AND course_id IS NOT NULL
+            )
+            WHERE was_open IS NULL OR was_open != is_open
+        ''', (last_id, end_id))
+        transitions = c.fetchall()
+
+        if transitions:
+            course_ids = list({row[0] for row in transitions})
+            placeholders = ','.join('?' * len(course_ids))
+            c.execute(
+                f'SELECT course_id, is_open, opened_at, opened_hour FROM heatmap_open '
+                f'WHERE course_id IN ({placeholders})',
+                course_ids
+            )
+            state = {row[0]: row[1:] for row in c.fetchall()}
+
+            closes = []
+            for course_id, is_open, checked_at, hour in transitions:
+                was_open, opened_at, opened_hour = state.get(course_id, (0, None, None))
+                if is_open == was_open:
+                    continue
+                if is_open:
+                    state[course_id] = (1, checked_at, hour)
+                else:
+                    if opened_at is not None:
+                        closes.append((opened_at, checked_at, course_id, opened_hour))
+                    state[course_id] = (0, None, None)
+
+            if closes:
+                c.executemany('''
+                    INSERT INTO heatmap_cells (course_id, hour_of_week, close_count, close_seconds)
+                    VALUES (?3, ?4, 1, (julianday(?2) - julianday(?1)) * 86400)
+                    ON CONFLICT (course_id, hour_of_week) DO UPDATE SET
+                        close_count = close_count + 1,
+                        close_seconds = close_seconds + excluded.close_seconds
+                ''', closes)
+
+            c.executemany(
+                'INSERT OR REPLACE INTO heatmap_open (course_id, is_open, opened_at, opened_hour) '
+                'VALUES (?, ?, ?, ?)',
+                [(course_id,) + values for course_id, values in state.items()]
+            )
+
+        c.execute('UPDATE heatmap_progress SET last_check_id=? WHERE id=1', (end_id,))
+
+    return end_id - last_id
+
+def refresh_heatmaps(db_path, batch_size=BATCH_SIZE):
+    """Fold every pending check, returns the number of check ids covered"""
+    conn = sqlite3.connect(db_path)
+    try:
+        init_heatmap_tables(conn)
+        total = 0
+        while True:
+            folded = fold_batch(conn, batch_size)
+            if not folded:
+                return total
+            total += folded
+    finally:
+        conn.close()
+
+def get_heatmap(db_path, course_id):
+    """Read the precomputed heatmap for one course (tables come from init_heatmap_tables)"""
+    conn = sqlite3.connect(db_path)
+    try:
+        c = conn.cursor()
+        c.execute('''
+            SELECT hour_of_week, samples, open_samples, seat_sum, close_count, close_seconds
+            FROM heatmap_cells
+            WHERE course_id=?
+            ORDER BY hour_of_week
+        ''', (course_id,))
+        rows = c.fetchall()
+    finally:
+        conn.close()
+
+    cells = []
+    for hour_of_week, samples, open_samples, seat_sum, close_count, close_seconds in rows:
+        cells.append({
+            'hour_of_week': hour_of_week,
+            'day': DAY_NAMES[hour_of_week // 24],
+            'hour': hour_of_week % 24,
+            'samples': samples,
+            'open_probability': open_samples / samples if samples else None,
+            'mean_seats': seat_sum / samples if samples else None,
+            'closes': close_count,
+            'mean_time_to_close': close_seconds / close_count if close_count else None
+        })
+
+    best = sorted(
+        (cell for cell in cells if cell['open_probability']),
+        key=lambda cell: cell['open_probability'],
+        reverse=True
+    )[:5]
+
+    return {
+        'course_id': course_id,
+        'cells': cells,
+        'best_hours': [
+            {'day': cell['day'], 'hour': cell['hour'], 'open_probability': cell['open_probability']}
+            for cell in best
+        ]
+    }
+
+def start_heatmap_job(db_path, interval=REFRESH_INTERVAL):
+    """Keep the heatmaps up to date from a background thread"""
+    stop_event = threading.Event()
+
+    def run():
+        while not stop_event.is_set():
+            try:
+                refresh_heatmaps(db_path)
+            except Exception as e:
+                logger.warning("Heatmap refresh failed: %s", e)
+            stop_event.wait(interval)
+
+    thread = threading.Thread(target=run, name='heatmap-refresh', daemon=True)
+    thread.start()
+    return stop_event
@@ -4,28 +4,74 @@
 WebReg Monitor - Working version with web control
 Uses database for courses, writes status for web interface
 """
+import time
+
+# Cold start is measured from here to the first successful check
+PROCESS_STARTED = time.perf_counter()
+
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from webreg_bot import WebRegBot
-import time
 from datetime import datetime
 import json
+import logging
 import sqlite3
 
+import catalog
+from checkpoint import MAX_AGE, Checkpoint
+from monitor_logging import BACKUP_COUNT, MAX_BYTES, course_logger, setup_logging, shutdown_logging
+import latency
+from cooldown import DEFAULT_TTLS, CooldownCache
+from course_health import BASE_BACKOFF, FAILURE_THRESHOLD, CourseBreakers
+from notifications import DIGEST_MAX_HOLD, EmailDigest, WebhookQueue
+from profiler import CycleProfiler
+import rate_limiter
+from rate_limiter import RateLimiter
+from replay import PageRecorder
+from standby import VALIDATE_INTERVAL, StandbyBrowser
+
+logger = logging.getLogger('webreg.monitor')
+
 DB_PATH = 'webreg.db'
 STATUS_FILE = 'monitor_status.json'
 CONFIG_FILE = 'monitor_config.json'
+CHECK_REQUEST_TTL = 300  # seconds before an unanswered "check now" is dropped
+STANDBY_TIMEOUTS = 2  # timed-out checks in a row before switching to the standby browser
+
+# Email alerts waiting to go out as per-recipient digests
+email_digest = EmailDigest()
+
+# Webhook deliveries and their retry queue
+webhooks = WebhookQueue(DB_PATH)
+
+# Open/closed state per course id, used to time openings
+seat_state = {}
 
-def update_status(status, message=''):
+# When each course may next play a sound / send an email / fire its webhook
+cooldowns = CooldownCache(DB_PATH)
+
+# Per-course circuit breakers, so a few broken courses don't cost full searches every cycle
+breakers = CourseBreakers(DB_PATH)
+
+# Iteration, seat state and schedule, saved so a restart picks up where this run left off
+checkpoint = Checkpoint()
+
+# Courses already written to the catalog by this process
+catalogued = set()
+
+# Samples the next few cycles when the API asks for a profile
+profiler = CycleProfiler()
+
+def update_status(status, message='', **extra):
     """Update status for web interface"""
     with open(STATUS_FILE, 'w') as f:
         json.dump({
             'running': status == 'running',
             'status': status,
             'message': message,
-            'last_update': datetime.now().isoformat()
+            'last_update': datetime.now().isoformat(),
+            **extra
         }, f)
 
 def get_config():
@@ -47,14 +93,16 @@ def get_active_courses():
     """Get active courses from database"""
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
-    c.execute('SELECT id, subject, course_num, email FROM courses WHERE active=1')
+    c.execute('SELECT id, subject, course_num, email, webhook_url, sections FROM courses WHERE active=1')
     courses = []
     for row in c.fetchall():
         courses.append({
             'id': row[0],
             'subject': row[1],
             'course_num': row[2],
-            'email': row[3]
+            'email': row[3],
+            'webhook_url': row[4],
+            'sections': row[5]
         })
     conn.close()
     return courses
@@ -81,113 +129,403 @@ def log_notification(course_id, available_seats, total_seats):
     conn.commit()
     conn.close()
 
-def was_sound_played_recently(course_id, minutes=60):
-    """Check if we played sound recently"""
+def last_closed_check(course_id):
+    """When the course was last seen with no seats (epoch seconds, None if never)"""
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
+    c.execute(
+        "SELECT CAST(strftime('%s', MAX(checked_at)) AS REAL) FROM checks WHERE course_id=? AND available_seats=0",
+        (course_id,)
+    )
+    row = c.fetchone()
+    conn.close()
+    return row[0] if row else None
+
+def track_opening(course_id, result, now):
+    """Update the open/closed state for a course, returns its current opening (or None)"""
+    state = seat_state.get(course_id)
+    if state is None:
+        state = seat_state[course_id] = {
+            'open': False,
+            'last_closed_at': last_closed_check(course_id),
+            'opening': None
+        }
     
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS sound_played (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            course_id INTEGER,
-            played_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
+    if not result.get('has_availability'):
+        state.update(open=False, last_closed_at=now, opening=None)
+        return None
     
-    c.execute(
-        '''SELECT COUNT(*) FROM sound_played 
-           WHERE course_id=? AND played_at > datetime('now', '-' || ? || ' minutes')''',
-        (course_id, minutes)
+    if not state['open']:
+        state['open'] = True
+        state['opening'] = {
+            'course_id': course_id,
+            'prev_closed_at': state['last_closed_at'],
+            'detected_at': now,
+            'dispatched': {},
+            'delivered': []
+        }
+    return state['opening']
+
+def record_alert_latency(opening, channel, dispatched_at, delivered_at):
+    """Store how long it took from the seat opening to this alert arriving"""
+    try:
+        est = latency.record_alert(DB_PATH, opening, channel, dispatched_at, delivered_at)
+        logger.info(
+            "Alert delivered",
+            extra={'course_id': opening['course_id'], 'channel': channel, 'est_latency': round(est, 1)}
+        )
+    except sqlite3.Error as e:
+        logger.warning("Could not record alert latency: %s", e)
+
+def record_email_sent(course, result, dispatched_at):
+    """Log a notification and start the email cooldown once its email has actually gone out"""
+    # A digest that fails to send leaves no cooldown, so the next check queues the alert again
+    cooldowns.start(course['id'], 'email')
+    log_notification(
+        course['id'],
+        result['total_available'],
+        sum(s['total'] for s in result['sections'])
     )
-    count = c.fetchone()[0]
+    
+    # First email for this opening counts toward open-to-alert latency
+    opening = seat_state.get(course['id'], {}).get('opening')
+    if opening and 'email' not in opening['delivered']:
+        opening['dispatched'].setdefault('email', dispatched_at)
+        opening['delivered'].append('email')
+        record_alert_latency(opening, 'email', opening['dispatched']['email'], time.time())
+
+def record_webhook_delivered(meta, delivered_at):
+    """Webhook queue hook for the first delivery of an opening"""
+    record_alert_latency(meta['opening'], 'webhook', meta['dispatched_at'], delivered_at)
+
+def failure_reason(bot):
+    """Why the last search came back empty"""
+    last_search = bot.last_search
+    if last_search.get('timeout'):
+        return 'timeout'
+    if last_search.get('error_page'):
+        return 'error_page'
+    if last_search.get('no_results'):
+        return 'no_results'
+    if 'load_seconds' in last_search:
+        return 'no_sections'
+    return 'search_failed'
+
+def play_sound(subject, course_num):
+    """Chime and announce the course on macOS (terminal bell if that fails)"""
+    try:
+        import subprocess
+        import platform
+        if platform.system() == "Darwin":
+            subprocess.run(["afplay", "/System/Library/Sounds/Glass.aiff"], check=False)
+            subprocess.run(["say", f"{subject} {course_num} has seats!"], check=False)
+    except:
+        print("\a" * 3)
+
+def add_to_catalog(subject, course_num, result, log):
+    """Remember a course the first time a search for it comes back with results"""
+    key = (subject.upper(), course_num.upper(), tuple(result.get('groups', {})))
+    if key in catalogued:
+        return
+    try:
+        catalog.record_search(subject, course_num, result, DB_PATH)
+        catalogued.add(key)
+    except sqlite3.Error as e:
+        log.warning("Could not update catalog: %s", e)
+
+def process_course(bot, course):
+    """Check one course, log it and send alerts, returns the parsed result"""
+    subject = course['subject']
+    course_num = course['course_num']
+    course_id = course['id']
+    log = course_logger(logger, subject, course_num, course_id=course_id)
+    
+    log.debug("Checking")
+    
+    # Only the watched sections decide whether this is an opening
+    result = bot.search_course(subject, course_num, course.get('sections'))
+    
+    if result:
+        now = time.time()
+        opening = track_opening(course_id, result, now)
+        log_check(course_id, result['total_available'])
+        add_to_catalog(subject, course_num, result, log)
+        breakers.record_success(course_id)
+        
+        if result.get('has_availability'):
+            total = result['total_available']
+            log.info("Seats available", extra={'available': total})
+            
+            # Play sound once per cooldown (an hour by default)
+            if cooldowns.try_start(course_id, 'sound', now):
+                log.info("Playing sound")
+                play_sound(subject, course_num)
+            else:
+                log.debug("Sound skipped (played recently)")
+            
+            # Webhooks go out right away, failures are retried from the queue
+            if course.get('webhook_url') and cooldowns.try_start(course_id, 'webhook', now):
+                # Only the first webhook of an opening is timed
+                meta = None
+                if 'webhook' not in opening['dispatched']:
+                    opening['dispatched']['webhook'] = now
+                    meta = {'opening': opening, 'dispatched_at': now}
+                try:
+                    webhooks.send(course, result, meta)
+                except Exception as e:
+                    log.error("Webhook failed: %s", e)
+            
+            # Email, batched with anything else that opens this cycle
+            if not cooldowns.cooling(course_id, 'email', now):
+                email_digest.add(course, result, on_sent=record_email_sent)
+            else:
+                log.debug("Email skipped (sent recently)")
+        else:
+            log.info("No seats available")
+    elif bot.last_search.get('timeout'):
+        log.warning("Could not get results (timed out)")
+    else:
+        log.warning("Could not get results")
+    
+    return result
+
+def get_pending_check_requests():
+    """Get "check now" requests from the website, oldest first"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    # Nobody is waiting on requests this old any more
+    c.execute('''
+        UPDATE check_requests SET status='expired', completed_at=CURRENT_TIMESTAMP
+        WHERE status='pending' AND requested_at < datetime('now', ?)
+    ''', (f'-{CHECK_REQUEST_TTL} seconds',))
+    
+    c.execute('''
+        SELECT r.id, c.id, c.subject, c.course_num, c.email, c.webhook_url, c.sections
+        FROM check_requests r
+        JOIN courses c ON r.course_id = c.id
+        WHERE r.status='pending'
+        ORDER BY r.id
+    ''')
+    pending = []
+    for row in c.fetchall():
+        pending.append({
+            'request_id': row[0],
+            'course': {
+                'id': row[1],
+                'subject': row[2],
+                'course_num': row[3],
+                'email': row[4],
+                'webhook_url': row[5],
+                'sections': row[6]
+            }
+        })
+    conn.commit()
     conn.close()
-    return count > 0
+    return pending
 
-def log_sound_played(course_id):
-    """Log that we played sound"""
+def finish_check_request(request_id, status, result):
+    """Store the outcome of a "check now" request for the API"""
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
-    c.execute('INSERT INTO sound_played (course_id) VALUES (?)', (course_id,))
+    c.execute(
+        '''UPDATE check_requests SET status=?, result=?, completed_at=CURRENT_TIMESTAMP
+           WHERE id=?''',
+        (status, json.dumps(result) if result else None, request_id)
+    )
     conn.commit()
     conn.close()
 
-def send_email_notification(course, result):
-    """Send email notification"""
+def run_check_requests(bot):
+    """Run any "check now" requests ahead of the regular schedule"""
     try:
-        import smtplib
-        from email.mime.text import MIMEText
-        from email.mime.multipart import MIMEMultipart
-        
-        with open('email_config.json', 'r') as f:
-            config = json.load(f)
-        
-        to_email = course['email']
-        subject = f"🔔 {course['subject']} {course['course_num']} - Seats Available!"
-        
-        sections_text = ""
-        for section in result['sections'][:10]:
-            if section['available'] > 0:
-                sections_text += f"<li>{section['available']}/{section['total']} seats</li>\n"
-        
-        body = f"""
-        <html>
-        <body>
-            <h2>WebReg Alert!</h2>
-            <p><strong>{course['subject']} {course['course_num']}</strong> has seats available!</p>
-            <ul>{sections_text}</ul>
-            <p><strong>Total: {result['total_available']} seats</strong></p>
-            <p>
-                <a href="https://act.ucsd.edu/webreg2/start" 
-                   style="background-color: #667eea; color: white; padding: 15px 30px; 
-                          text-decoration: none; border-radius: 10px; display: inline-block;">
-                    Enroll Now →
-                </a>
-            </p>
-            <p style="color: gray; font-size: 12px; margin-top: 20px;">
-                Checked at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-            </p>
-        </body>
-        </html>
-        """
-        
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = config['sender_email']
-        msg['To'] = to_email
-        msg.attach(MIMEText(body, 'html'))
-        
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-            server.login(config['sender_email'], config['sender_password'])
-            server.send_message(msg)
-        
-        print(f"✅ Email sent to {to_email}")
-        return True
+        pending = get_pending_check_requests()
+    except sqlite3.Error as e:
+        logger.warning("Could not read check requests: %s", e)
+        return 0
+    
+    for pending_request in pending:
+        course = pending_request['course']
+        logger.info(
+            "Priority check requested",
+            extra={'course': f"{course['subject']} {course['course_num']}", 'request_id': pending_request['request_id']}
+        )
+        try:
+            result = process_course(bot, course)
+        except Exception as e:
+            logger.exception("Priority check failed: %s", e, extra={'request_id': pending_request['request_id']})
+            result = None
         
-    except FileNotFoundError:
-        print("⚠️  No email_config.json - skipping email")
-        return False
+        if result:
+            status = 'done'
+        elif bot.last_search.get('timeout'):
+            status = 'timeout'
+        else:
+            status = 'failed'
+        finish_check_request(pending_request['request_id'], status, result)
+    
+    # Someone is waiting on these, don't hold their alerts
+    if pending:
+        email_digest.flush()
+    
+    return len(pending)
+
+def recycle_browser(bot, config):
+    """Recycle Chrome between checks when it passes the configured limits"""
+    try:
+        recycled = bot.maybe_recycle(
+            max_rss_mb=config.get('browser_max_rss_mb', 1500),
+            tab_max_checks=config.get('browser_tab_max_checks', 50),
+            driver_max_checks=config.get('browser_max_checks', 500)
+        )
+        if recycled:
+            logger.info("Browser recycled", extra={'kind': recycled, **bot.memory_status()})
+    except Exception as e:
+        logger.warning("Browser recycle failed: %s", e)
+
+def rate_limits(config):
+    """(min_rate, max_rate) in requests per second from the config"""
+    return (
+        config.get('min_requests_per_minute', rate_limiter.MIN_RATE * 60) / 60,
+        config.get('max_requests_per_minute', rate_limiter.MAX_RATE * 60) / 60
+    )
+
+def make_rate_limiter(config):
+    """Shared WebReg request budget, bounds come from the config"""
+    min_rate, max_rate = rate_limits(config)
+    return RateLimiter(DB_PATH, min_rate=min_rate, max_rate=max_rate)
+
+def limiter_status(bot):
+    try:
+        return bot.limiter.status()
+    except sqlite3.Error:
+        return None
+
+def process_webhook_retries():
+    """Retry webhook deliveries whose backoff has passed"""
+    try:
+        webhooks.process_retries()
     except Exception as e:
-        print(f"❌ Email failed: {e}")
+        logger.warning("Webhook retries failed: %s", e)
+
+def save_checkpoint(iteration, consecutive_failures, cycle):
+    """Write the monitor's state so a restart continues instead of starting over"""
+    try:
+        # An alert that went out must stay suppressed if we crash right after it
+        cooldowns.snapshot()
+        checkpoint.save({
+            'iteration': iteration,
+            'consecutive_failures': consecutive_failures,
+            'cycle': cycle,
+            'seat_state': seat_state,
+            'pending_emails': email_digest.snapshot()
+        })
+    except (OSError, sqlite3.Error) as e:
+        logger.warning("Could not save checkpoint: %s", e)
+
+def restore_checkpoint(max_age):
+    """Load the last checkpoint into the globals, returns its state (None if there isn't one)"""
+    state = checkpoint.load(max_age)
+    if state is None:
+        return None
+    
+    # JSON turned the course ids into strings
+    for course_id, course_state in state.get('seat_state', {}).items():
+        seat_state.setdefault(int(course_id), course_state)
+    
+    # Alerts that were still waiting in the digest when we went down
+    for items in state.get('pending_emails', {}).values():
+        for course, result in items:
+            email_digest.add(course, result, on_sent=record_email_sent)
+    
+    cycle = state.get('cycle') or {}
+    logger.info(
+        "Resuming from checkpoint",
+        extra={'iteration': state.get('iteration', 0), 'checked_this_cycle': len(cycle.get('done') or []),
+               'open_courses': sum(1 for s in seat_state.values() if s.get('open'))}
+    )
+    return state
+
+def start_keepalive(bot, config):
+    """Keep the session warm between checks and warn before it expires"""
+    bot.start_keepalive(
+        interval=config.get('keepalive_interval', 600),
+        on_expiry_warning=lambda time_left: update_status(
+            'running', f'Session expires in ~{max(0, int(time_left)) // 60} min - log in again soon'
+        )
+    )
+
+def browser_broken(bot, reason, timeouts_in_row):
+    """True if a failed check looks like the browser's fault (wedged or logged out)
+    rather than WebReg's or the course's"""
+    if reason in ('no_results', 'no_sections', 'error_page'):
         return False
+    # One slow answer is usually WebReg, and the limiter is already backing off
+    if reason == 'timeout':
+        return timeouts_in_row >= STANDBY_TIMEOUTS
+    return not bot.probe_session()
+
+def fail_over(bot, standby, config):
+    """Swap the standby browser in for `bot`, returns it (None if it isn't ready)"""
+    new_bot = standby.take(retire=bot)
+    if new_bot is None:
+        return None
+    bot.stop_keepalive()
+    new_bot.limiter = bot.limiter
+    new_bot.check_deadline = bot.check_deadline
+    new_bot.check_timeouts = bot.check_timeouts
+    new_bot.recorder = bot.recorder
+    start_keepalive(new_bot, config)
+    logger.warning("Switched to the standby browser", extra={'failovers': standby.failovers})
+    return new_bot
+
+def wait_for_next_cycle(bot, seconds):
+    """Sleep until the next cycle, serving "check now" requests meanwhile.
+    Returns True if the user asked the monitor to stop."""
+    deadline = time.time() + seconds
+    
+    # Sleep in small chunks to check for stop signal
+    while time.time() < deadline:
+        if check_stop_signal():
+            logger.info("Stop signal received")
+            return True
+        run_check_requests(bot)
+        process_webhook_retries()
+        cooldowns.maybe_snapshot()
+        time.sleep(min(1, max(0, deadline - time.time())))
+    
+    return False
 
 def main():
     print("\n" + "="*60)
     print("WEBREG MONITOR - Web Controlled Version")
     print("="*60)
-    print("Control this from: http://localhost:8000")
+    print("Control this from: http://localhost:5001/")
     print("="*60 + "\n")
     
     config = get_config()
     check_interval = config.get('interval', 3600)
     
+    setup_logging(
+        level=config.get('log_level', 'INFO'),
+        max_bytes=config.get('log_max_bytes', MAX_BYTES),
+        backup_count=config.get('log_backups', BACKUP_COUNT),
+        section_sample_rate=config.get('log_section_sample', 1)
+    )
+    
     print(f"Check interval: {check_interval} seconds ({check_interval//60} minutes)")
     print(f"Press Ctrl+C to stop\n")
     
     update_status('starting', 'Logging in...')
     
+    # Selenium is only needed from here on, keep it off the import path
+    from webreg_bot import CHECK_DEADLINE, WebRegBot
+    imported_at = time.perf_counter()
+    
     # Try logging in with retries
     max_login_attempts = 5
     bot = None
+    startup = {}
     
     for attempt in range(max_login_attempts):
         try:
@@ -196,176 +534,309 @@ def main():
             print("="*60)
             
             if bot:
-                print("Closing previous browser...")
+                logger.info("Closing previous browser")
                 bot.close()
                 time.sleep(2)
             
-            bot = WebRegBot(headless=False)
+            bot = WebRegBot(headless=False, limiter=make_rate_limiter(config))
+            bot.check_deadline = config.get('check_deadline', CHECK_DEADLINE)
             bot.login_manual(use_cookies=True)
             
             # Test if login worked
             courses = get_active_courses()
             if courses:
-                print("\n🔍 Testing login with a quick search...")
-                test_result = bot.search_course(courses[0]['subject'], courses[0]['course_num'])
+                # Test with a course that's known to work, not one that's been failing
+                try:
+                    breakers.load()
+                except sqlite3.Error as e:
+                    logger.warning("Could not load course health: %s", e)
+                test_course = next((c for c in courses if not breakers.is_open(c['id'])), courses[0])
+                logger.info("Testing login with a quick search")
+                test_result = bot.search_course(test_course['subject'], test_course['course_num'])
                 
-                if test_result:
-                    print("\n✅ Login successful and verified!")
+                # "No results" still means WebReg let us search
+                if test_result or failure_reason(bot) in ('no_results', 'no_sections'):
+                    logger.info("Login successful and verified")
+                    startup = {
+                        'startup_seconds': round(imported_at - PROCESS_STARTED, 2),
+                        'driver_start_seconds': round(bot.driver_start_seconds, 2),
+                        'cold_start_to_first_check': round(time.perf_counter() - PROCESS_STARTED, 2)
+                    }
+                    logger.info("Startup timing", extra=startup)
                     break
                 else:
-                    print("\n⚠️  Login appeared to work but search failed")
+                    logger.warning("Login appeared to work but search failed")
                     if attempt < max_login_attempts - 1:
-                        print(f"Retrying... (attempt {attempt + 2}/{max_login_attempts})")
+                        logger.info("Retrying login", extra={'attempt': attempt + 2, 'max_attempts': max_login_attempts})
                         time.sleep(3)
                         continue
             else:
-                print("\n✅ Login successful! (No courses to test yet)")
+                logger.info("Login successful (no courses to test yet)")
                 break
                     
         except Exception as e:
-            print(f"\n❌ Login attempt {attempt + 1} failed: {e}")
+            logger.error("Login attempt %d failed: %s", attempt + 1, e)
             if attempt < max_login_attempts - 1:
-                print(f"Retrying... (attempt {attempt + 2}/{max_login_attempts})")
+                logger.info("Retrying login", extra={'attempt': attempt + 2, 'max_attempts': max_login_attempts})
                 time.sleep(3)
                 continue
             else:
-                print("\n❌ All login attempts failed!")
+                logger.error("All login attempts failed")
                 update_status('error', 'Login failed')
                 if bot:
                     bot.close()
                 return
     
     if not bot:
-        print("\n❌ Could not initialize bot")
+        logger.error("Could not initialize bot")
         update_status('error', 'Failed to start')
         return
     
-    print("\n✅ Ready to monitor! Starting checks...\n")
-    update_status('running', 'Monitor active')
+    logger.info("Ready to monitor, starting checks")
+    update_status('running', 'Monitor active', startup=startup)
+    
+    # Archive results pages for offline parser replay (see replay.py)
+    if config.get('record_pages'):
+        bot.recorder = PageRecorder(config.get('record_dir', 'recordings'))
+    
+    webhooks.on_delivered = record_webhook_delivered
+    
+    start_keepalive(bot, config)
+    
+    # A second logged-in browser to switch to when this one breaks
+    standby = None
+    if config.get('standby'):
+        standby = StandbyBrowser(
+            lambda: WebRegBot(headless=config.get('standby_headless', True), limiter=make_rate_limiter(config)),
+            validate_interval=config.get('standby_validate_interval', VALIDATE_INTERVAL)
+        )
+        standby.start()
     
     try:
         iteration = 0
         consecutive_failures = 0
         max_consecutive_failures = 3
+        timeouts_in_row = 0
+        
+        stop_requested = False
+        
+        # Pick up the schedule of the run before this one
+        resume_cycle = None
+        restored = restore_checkpoint(config.get('checkpoint_max_age', MAX_AGE))
+        if restored:
+            iteration = restored.get('iteration', 0)
+            consecutive_failures = restored.get('consecutive_failures', 0)
+            cycle = restored.get('cycle') or {}
+            if cycle.get('done') is not None:
+                if {course['id'] for course in get_active_courses()} - set(cycle['done']):
+                    # Died mid-cycle: finish that cycle with the courses it hadn't reached
+                    resume_cycle = cycle
+                else:
+                    # Died after the last course, before the cycle was marked done
+                    cycle['next_cycle_at'] = cycle.get('started_at', 0) + config.get('interval', 3600)
+            if resume_cycle is None and cycle.get('next_cycle_at'):
+                remaining = cycle['next_cycle_at'] - time.time()
+                if remaining > 0:
+                    logger.info("Waiting for the next scheduled cycle", extra={'seconds': round(remaining)})
+                    stop_requested = wait_for_next_cycle(bot, remaining)
         
-        while True:
+        while not stop_requested:
             # Check for stop signal
             if check_stop_signal():
-                print("\n⏹️  Stop signal received from website")
+                logger.info("Stop signal received from website")
                 break
             
             # Reload config in case interval changed
             config = get_config()
             check_interval = config.get('interval', 3600)
+            email_digest.max_hold = config.get('digest_max_hold', DIGEST_MAX_HOLD)
+            if rate_limits(config) != (bot.limiter.min_rate, bot.limiter.max_rate):
+                bot.limiter = make_rate_limiter(config)
+            bot.check_deadline = config.get('check_deadline', CHECK_DEADLINE)
+            for channel in ('sound', 'email', 'webhook'):
+                cooldowns.ttls[channel] = config.get(f'{channel}_cooldown', DEFAULT_TTLS[channel])
+            breakers.threshold = config.get('breaker_failures', FAILURE_THRESHOLD)
+            breakers.base_backoff = config.get('breaker_backoff', BASE_BACKOFF)
             
-            iteration += 1
+            # Open a profiling window if one was requested from the dashboard
+            profiler.poll()
+            
+            if resume_cycle is None:
+                iteration += 1
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
-            print("\n" + "="*60)
-            print(f"Check #{iteration} - {timestamp}")
-            print("="*60)
+            logger.info("Starting cycle", extra={'iteration': iteration, 'time': timestamp})
+            
+            # Breakers may have been reset from the dashboard since the last cycle
+            try:
+                breakers.load()
+            except sqlite3.Error as e:
+                logger.warning("Could not load course health: %s", e)
             
-            update_status('running', f'Check #{iteration}')
+            update_status(
+                'running', f'Check #{iteration}',
+                memory=bot.memory_status(), startup=startup, rate_limit=limiter_status(bot),
+                check_timeouts=bot.check_timeouts, profiling=profiler.status(),
+                course_health=breakers.status(), standby=standby.status() if standby else None
+            )
             
             courses = get_active_courses()
             
+            cycle = {'iteration': iteration, 'started_at': time.time(), 'done': []}
+            if resume_cycle:
+                cycle.update(started_at=resume_cycle.get('started_at', cycle['started_at']), done=resume_cycle['done'])
+                courses = [course for course in courses if course['id'] not in set(cycle['done'])]
+                logger.info("Finishing the interrupted cycle", extra={'already_checked': len(cycle['done'])})
+            resume_cycle = None
+            
+            # Courses with an open breaker sit out until their next probe is due
+            now = time.time()
+            backing_off = [course for course in courses if not breakers.should_check(course['id'], now)]
+            if backing_off:
+                logger.info("Skipping failing courses", extra={'courses': len(backing_off)})
+                courses = [course for course in courses if breakers.should_check(course['id'], now)]
+            
             if not courses:
-                print("No active courses. Add some at http://localhost:8000")
-                print(f"⏰ Waiting {check_interval} seconds...")
-                time.sleep(check_interval)
+                logger.info("No active courses, waiting", extra={'interval': check_interval})
+                profiler.cycle_done()
+                save_checkpoint(iteration, consecutive_failures, {'iteration': iteration, 'next_cycle_at': time.time() + check_interval})
+                stop_requested = wait_for_next_cycle(bot, check_interval)
                 continue
             
-            print(f"Monitoring {len(courses)} course(s)")
+            logger.info("Checking courses", extra={'courses': len(courses)})
+            cycle_started = time.monotonic()
+            timeouts_before = bot.check_timeouts
             
             at_least_one_success = False
+            # WebReg answered the search, so the session is fine even if the course isn't
+            session_alive = False
+            # Failures that might be the session's fault, charged to the course only if the session held up
+            unexplained_failures = []
             
             for course in courses:
                 # Check stop signal during course checks too
                 if check_stop_signal():
-                    print("\n⏹️  Stop signal received")
+                    logger.info("Stop signal received")
+                    stop_requested = True
                     break
                 
                 subject = course['subject']
                 course_num = course['course_num']
-                course_id = course['id']
                 
-                try:
-                    print(f"\n[{subject} {course_num}] Checking...")
-                    
-                    result = bot.search_course(subject, course_num)
-                    
-                    if result:
-                        at_least_one_success = True
-                        consecutive_failures = 0
+                # "Check now" requests jump the queue
+                run_check_requests(bot)
+                
+                # A broken browser is swapped for the standby and (unless it timed out) the course checked again
+                for attempt in range(2):
+                    reason = None
+                    try:
+                        if process_course(bot, course):
+                            at_least_one_success = True
+                            consecutive_failures = 0
+                        else:
+                            reason = failure_reason(bot)
+                            if reason in ('no_results', 'no_sections'):
+                                session_alive = True
+                                consecutive_failures = 0
+                                breakers.record_failure(course['id'], reason)
+                                reason = None
                         
-                        log_check(course_id, result['total_available'])
+                        # Don't let early alerts wait for the whole cycle
+                        email_digest.flush_due()
+                        process_webhook_retries()
+                        cooldowns.maybe_snapshot()
                         
-                        if result.get('has_availability'):
-                            total = result['total_available']
-                            print(f"[{subject} {course_num}] ✅ {total} SEATS AVAILABLE!")
-                            
-                            # Play sound once per hour
-                            if not was_sound_played_recently(course_id, minutes=60):
-                                print(f"[{subject} {course_num}] 🔊 Playing sound...")
-                                try:
-                                    import subprocess
-                                    import platform
-                                    if platform.system() == "Darwin":
-                                        subprocess.run(["afplay", "/System/Library/Sounds/Glass.aiff"], check=False)
-                                        subprocess.run(["say", f"{subject} {course_num} has seats!"], check=False)
-                                except:
-                                    print("\a" * 3)
-                                
-                                log_sound_played(course_id)
-                            else:
-                                print(f"[{subject} {course_num}] 🔇 Sound skipped (played recently)")
-                            
-                            # Send email always
-                            if send_email_notification(course, result):
-                                log_notification(
-                                    course_id,
-                                    result['total_available'],
-                                    sum(s['total'] for s in result['sections'])
-                                )
-                        else:
-                            print(f"[{subject} {course_num}] No seats available")
-                    else:
-                        print(f"[{subject} {course_num}] ⚠️  Could not get results")
-                    
-                    time.sleep(3)
+                        # Swap in a fresh tab/browser once Chrome has grown too big
+                        recycle_browser(bot, config)
+                        
+                    except Exception as e:
+                        logger.exception("Check failed: %s", e, extra={'course': f'{subject} {course_num}'})
+                        reason = f'error: {type(e).__name__}'
                     
-                except Exception as e:
-                    print(f"[{subject} {course_num}] ❌ Error: {e}")
+                    timeouts_in_row = timeouts_in_row + 1 if reason == 'timeout' else 0
+                    if reason is None:
+                        break
+                    new_bot = attempt == 0 and standby and browser_broken(bot, reason, timeouts_in_row) and fail_over(bot, standby, config)
+                    if new_bot:
+                        bot = new_bot
+                        timeouts_in_row = 0
+                    if not new_bot or reason == 'timeout':
+                        # After timeouts WebReg is likely slow too, the new browser starts with the next course
+                        unexplained_failures.append((course['id'], reason))
+                        break
+                
+                cycle['done'].append(course['id'])
+                save_checkpoint(iteration, consecutive_failures, cycle)
+            
+            if at_least_one_success:
+                for course_id, reason in unexplained_failures:
+                    breakers.record_failure(course_id, reason)
+            
+            # One digest per recipient for everything that opened this cycle
+            email_digest.flush()
+            
+            if stop_requested:
+                break
             
             # Check if we had too many consecutive failures
-            if not at_least_one_success and courses:
+            if not at_least_one_success and not session_alive:
                 consecutive_failures += 1
-                print(f"\n⚠️  No successful checks (failure {consecutive_failures}/{max_consecutive_failures})")
+                logger.warning(
+                    "No successful checks",
+                    extra={'failures': consecutive_failures, 'max_failures': max_consecutive_failures}
+                )
                 
-                if consecutive_failures >= max_consecutive_failures:
-                    print("\n❌ Too many failures - session probably expired")
-                    print("Restarting...\n")
+                new_bot = None
+                if consecutive_failures >= max_consecutive_failures and standby:
+                    new_bot = fail_over(bot, standby, config)
+                if new_bot:
+                    bot = new_bot
+                    consecutive_failures = 0
+                    timeouts_in_row = 0
+                elif consecutive_failures >= max_consecutive_failures:
+                    logger.error("Too many failures - session probably expired, restarting")
                     update_status('restarting', 'Session expired, restarting...')
+                    # The new session should check right away, with a clean failure count
+                    save_checkpoint(iteration, 0, {'iteration': iteration, 'next_cycle_at': time.time()})
+                    if standby:
+                        standby.stop()
                     bot.close()
                     time.sleep(2)
                     main()  # Restart
                     return
             
-            print(f"\n⏰ Waiting {check_interval} seconds ({check_interval//60} minutes)...")
-            
-            # Sleep in small chunks to check for stop signal
-            for _ in range(check_interval // 5):
-                if check_stop_signal():
-                    print("\n⏹️  Stop signal received")
-                    break
-                time.sleep(5)
+            logger.info(
+                "Cycle done, waiting",
+                extra={
+                    'iteration': iteration,
+                    'seconds': round(time.monotonic() - cycle_started, 1),
+                    'timeouts': bot.check_timeouts - timeouts_before,
+                    'interval': check_interval
+                }
+            )
+            profiler.cycle_done()
+            save_checkpoint(iteration, consecutive_failures, {'iteration': iteration, 'next_cycle_at': time.time() + check_interval})
+            stop_requested = wait_for_next_cycle(bot, check_interval)
             
     except KeyboardInterrupt:
-        print("\n\n✋ Stopped by user")
+        logger.info("Stopped by user")
     finally:
+        # Whatever alerts are still buffered go out now
+        email_digest.flush()
+        profiler.stop()
+        if standby:
+            standby.stop()
+        try:
+            cooldowns.snapshot()
+        except sqlite3.Error as e:
+            logger.warning("Could not save cooldowns: %s", e)
+        
         # DON'T close browser - keep it open for next run
-        print("👋 Monitor stopped - browser stays open")
+        logger.info("Monitor stopped - browser stays open")
         update_status('stopped', 'Monitor stopped')
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        shutdown_logging()
\ No newline at end of file
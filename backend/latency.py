@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+WebReg Monitor - Open-to-alert latency tracking
+
+For every opening the monitor detects we know the last time the course
+was seen closed and the time it was seen open, so the seat opened
+somewhere in between. The estimated latency is measured from the middle
+of that window to the moment the alert was delivered. Every alert is
+stored, and histogram counters are kept per course and overall
+(course_id 0) so the API can report them without scanning.
+"""
+import bisect
+import sqlite3
+from datetime import datetime
+
+# Histogram bucket upper bounds in seconds, the last bucket is open-ended
+BUCKETS = [1, 2, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 7200, 14400, 28800, 86400]
+OVERALL = 0
+
+def init_latency_tables(conn):
+    """Create the latency tables if they don't exist"""
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS alert_latency (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course_id INTEGER,
+            channel TEXT,
+            prev_closed_at REAL,
+            detected_at REAL,
+            dispatched_at REAL,
+            delivered_at REAL,
+            est_latency REAL
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS latency_histogram (
+            course_id INTEGER NOT NULL,
+            channel TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            count INTEGER DEFAULT 0,
+            PRIMARY KEY (course_id, channel, bucket)
+        )
+    ''')
+    conn.commit()
+
+def estimate_latency(prev_closed_at, detected_at, delivered_at):
+    """Seconds from the estimated opening time to delivery"""
+    if prev_closed_at is not None and prev_closed_at < detected_at:
+        opened_at = (prev_closed_at + detected_at) / 2
+    else:
+        opened_at = detected_at
+    return max(0.0, delivered_at - opened_at)
+
+def bucket_for(seconds):
+    """Index of the histogram bucket a latency falls in"""
+    return bisect.bisect_left(BUCKETS, seconds)
+
+def bucket_label(index):
+    if index >= len(BUCKETS):
+        return f'>{BUCKETS[-1]}s'
+    return f'<={BUCKETS[index]}s'
+
+def record_alert(db_path, opening, channel, dispatched_at, delivered_at):
+    """Store one delivered alert for an opening and bump the histograms
+    (tables come from init_latency_tables, run by api.init_db)"""
+    est = estimate_latency(opening.get('prev_closed_at'), opening['detected_at'], delivered_at)
+    bucket = bucket_for(est)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.execute('''
+                INSERT INTO alert_latency
+                    (course_id, channel, prev_closed_at, detected_at, dispatched_at, delivered_at, est_latency)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                opening['course_id'], channel, opening.get('prev_closed_at'),
+                opening['detected_at'], dispatched_at, delivered_at, est
+            ))
+            conn.executemany('''
+                INSERT INTO latency_histogram (course_id, channel, bucket, count)
+                VALUES (?, ?, ?, 1)
+                ON CONFLICT (course_id, channel, bucket) DO UPDATE SET count = count + 1
+            ''', [
+                (course_id, ch, bucket)
+                for course_id in (opening['course_id'], OVERALL)
+                for ch in (channel, 'all')
+            ])
+    finally:
+        conn.close()
+    return est
+
+def summarize(counts):
+    """Turn {bucket: count} into a histogram with estimated percentiles"""
+    total = sum(counts.values())
+    histogram = [
+        {'bucket': bucket_label(index), 'count': counts.get(index, 0)}
+        for index in range(len(BUCKETS) + 1)
+    ]
+
+    percentiles = {}
+    for p in (50, 90, 99):
+        if not total:
+            percentiles[f'p{p}'] = None
+            continue
+        target = total * p / 100
+        running = 0
+        for index in range(len(BUCKETS) + 1):
+            running += counts.get(index, 0)
+            if running >= target:
+                # Upper bound of the bucket the percentile falls in
+                percentiles[f'p{p}'] = BUCKETS[index] if index < len(BUCKETS) else None
+                break
+
+    return {'count': total, 'histogram': histogram, **percentiles}
+
+def get_latency_report(db_path, course_id=OVERALL, recent=20):
+    """Histograms per channel plus the most recent alerts (a read, no DDL)"""
+    conn = sqlite3.connect(db_path)
+    try:
+        c = conn.cursor()
+        c.execute(
+            'SELECT channel, bucket, count FROM latency_histogram WHERE course_id=?',
+            (course_id,)
+        )
+        by_channel = {}
+        for channel, bucket, count in c.fetchall():
+            by_channel.setdefault(channel, {})[bucket] = count
+
+        query = '''
+            SELECT course_id, channel, prev_closed_at, detected_at, dispatched_at, delivered_at, est_latency
+            FROM alert_latency
+        '''
+        params = ()
+        if course_id != OVERALL:
+            query += ' WHERE course_id=?'
+            params = (course_id,)
+        c.execute(query + ' ORDER BY id DESC LIMIT ?', params + (recent,))
+        rows = c.fetchall()
+    finally:
+        conn.close()
+
+    def iso(ts):
+        return datetime.fromtimestamp(ts).isoformat() if ts is not None else None
+
+    return {
+        'course_id': course_id if course_id != OVERALL else None,
+        'channels': {channel: summarize(counts) for channel, counts in by_channel.items()},
+        'recent': [
+            {
+                'course_id': row[0],
+                'channel': row[1],
+                'prev_closed_at': iso(row[2]),
+                'detected_at': iso(row[3]),
+                'dispatched_at': iso(row[4]),
+                'delivered_at': iso(row[5]),
+                'est_latency': row[6]
+            }
+            for row in rows
+        ]
+    }
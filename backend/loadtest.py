@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WebReg Monitor - Synthetic data generator and API load test
+
+Fills a database with made-up courses, checks and notifications, then
+hammers the endpoints of api.py from several threads and reports latency
+percentiles per endpoint together with the query plans SQLite picks for
+the main queries. Gives a repeatable baseline for schema and query work.
+
+Besides the reads, the runner adds courses (one at a time and in bulk),
+toggles them and searches the catalog, so the numbers include writers
+holding the database lock. Those writes land in the database under test;
+pass --read-only to leave it untouched, e.g. against a live webreg.db.
+
+Usage:
+    python3 loadtest.py generate --db loadtest.db --courses 10000 --checks 50000000 --notifications 100000
+    python3 loadtest.py run --db loadtest.db --concurrency 8 --duration 30
+    python3 loadtest.py run --url http://localhost:5001 --db webreg.db --read-only
+"""
+import argparse
+import itertools
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import api
+
+SUBJECTS = ['CSE', 'MATH', 'PHYS', 'CHEM', 'BILD', 'ECON', 'COGS', 'DSC', 'ECE', 'MAE', 'POLI', 'PSYC']
+BATCH_SIZE = 50000
+
+BULK_SIZE = 10
+
+# The statements behind the heaviest endpoints, for EXPLAIN QUERY PLAN.
+# The course list comes from api.py itself so the plans follow the real query.
+PLAN_QUERIES = {
+    'get_courses': api.courses_query(),
+    'get_courses_since': api.courses_query(0),
+    'stats_checks': ('SELECT COUNT(*) FROM checks', ()),
+    'stats_recent': ('''
+        SELECT c.subject, c.course_num, n.available_seats, n.sent_at
+        FROM notifications n
+        JOIN courses c ON n.course_id = c.id
+        ORDER BY n.sent_at DESC
+        LIMIT 5
+    ''', ()),
+    'history': ('''
+        SELECT available_seats, checked_at FROM checks
+        WHERE course_id=? ORDER BY checked_at DESC LIMIT 50
+    ''', (1,))
+}
+
+def timestamps(count, days):
+    """`count` evenly spaced UTC timestamps over the last `days` days, oldest first"""
+    end = time.time()
+    step = days * 86400 / max(1, count)
+    start = end - days * 86400
+    for i in range(count):
+        yield time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(start + i * step))
+
+def generate(db_path, courses=10000, checks=1000000, notifications=100000, days=30, seed=1):
+    """Fill db_path with synthetic data (on top of whatever is there)"""
+    random.seed(seed)
+    api.DB_PATH = db_path
+    api.init_db()
+
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA synchronous=OFF')
+    c = conn.cursor()
+
+    # The sync triggers would double the work of every insert, init_db puts them back
+    for name in api.sync_triggers():
+        c.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+    started = time.perf_counter()
+    # AUTOINCREMENT never reuses an id, so everything above the high-water mark is ours
+    c.execute("SELECT MAX(COALESCE((SELECT MAX(id) FROM courses), 0), COALESCE((SELECT seq FROM sqlite_sequence WHERE name='courses'), 0))")
+    last_id = c.fetchone()[0]
+    c.executemany(
+        'INSERT OR IGNORE INTO courses (subject, course_num, email, active, created_at) VALUES (?, ?, ?, ?, ?)',
+        (
+            (
+                random.choice(SUBJECTS),
+                str(random.randint(1, 199)) + random.choice(['', '', 'A', 'B', 'L']),
+                f'student{last_id + 1 + i}@ucsd.edu',
+                0 if random.random() < 0.1 else 1,
+                created_at
+            )
+            for i, created_at in enumerate(timestamps(courses, days))
+        )
+    )
+    conn.commit()
+    c.execute('SELECT id FROM courses WHERE id > ? ORDER BY id', (last_id,))
+    course_ids = [row[0] for row in c.fetchall()]
+    print(f"{len(course_ids)} courses in {time.perf_counter() - started:.1f}s")
+    if not course_ids:
+        # Every generated course collided with an existing one, nothing to hang history on
+        checks = notifications = 0
+
+    def seats():
+        return random.randint(1, 5) if random.random() < 0.1 else 0
+
+    # Checks go round-robin over the courses like the monitor's cycles
+    started = time.perf_counter()
+    rows = (
+        (course_ids[i % len(course_ids)], seats(), checked_at)
+        for i, checked_at in enumerate(timestamps(checks, days))
+    )
+    inserted = 0
+    while True:
+        batch = [row for _, row in zip(range(BATCH_SIZE), rows)]
+        if not batch:
+            break
+        c.executemany('INSERT INTO checks (course_id, available_seats, checked_at) VALUES (?, ?, ?)', batch)
+        conn.commit()
+        inserted += len(batch)
+        if inserted % (BATCH_SIZE * 20) == 0:
+            print(f"  {inserted}/{checks} checks ({inserted / (time.perf_counter() - started):.0f}/s)")
+    print(f"{checks} checks in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    c.executemany(
+        'INSERT INTO notifications (course_id, available_seats, total_seats, sent_at) VALUES (?, ?, ?, ?)',
+        (
+            (random.choice(course_ids), random.randint(1, 5), random.choice([30, 100, 250]), sent_at)
+            for sent_at in timestamps(notifications, days)
+        )
+    )
+    conn.commit()
+
+    # Make every client resync the list it has
+    c.execute('UPDATE sync_state SET version = version + 1 WHERE id = 1')
+    c.execute('UPDATE courses SET version = (SELECT version FROM sync_state WHERE id = 1) WHERE id > ?', (last_id,))
+    conn.commit()
+    conn.close()
+    print(f"{notifications} notifications in {time.perf_counter() - started:.1f}s")
+
+    api.init_db()
+    conn = sqlite3.connect(db_path)
+    conn.execute('ANALYZE')
+    conn.close()
+
+def endpoints(db_path, read_only=False):
+    """(name, method, request) for every endpoint the runner drives, where
+    request() returns the (path, JSON body) of the next call"""
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    c.execute('SELECT id FROM courses ORDER BY RANDOM() LIMIT 50')
+    course_ids = [row[0] for row in c.fetchall()] or [1]
+    c.execute('SELECT version FROM sync_state WHERE id = 1')
+    version = c.fetchone()[0]
+    conn.close()
+
+    def get(path):
+        return lambda: (path, None)
+
+    def course_path(template):
+        return lambda: (template.format(random.choice(course_ids)), None)
+
+    # Fresh addresses on every call so adds go through instead of hitting the unique index
+    run_id = int(time.time())
+    serial = itertools.count()
+
+    def new_course():
+        return {
+            'subject': random.choice(SUBJECTS),
+            'course_num': str(random.randint(1, 199)),
+            'email': f'loadtest{run_id}-{next(serial)}@ucsd.edu',
+            'force': True
+        }
+
+    targets = [
+        ('courses', 'GET', get('/api/courses')),
+        ('courses_since', 'GET', get(f'/api/courses?since={max(1, version - 10)}')),
+        ('stats', 'GET', get('/api/stats')),
+        ('history', 'GET', course_path('/api/history/{}')),
+        ('heatmap', 'GET', course_path('/api/courses/{}/heatmap')),
+        ('latency', 'GET', get('/api/latency')),
+        ('course_latency', 'GET', course_path('/api/courses/{}/latency')),
+        ('monitor_status', 'GET', get('/api/monitor/status')),
+        ('export_json', 'GET', get('/api/courses/export?format=json')),
+        ('catalog_search', 'GET', lambda: (f'/api/catalog?q={random.choice(SUBJECTS)}+1', None))
+    ]
+    if not read_only:
+        targets += [
+            ('add_course', 'POST', lambda: ('/api/courses', new_course())),
+            ('bulk_add', 'POST', lambda: ('/api/courses/bulk?force=1', [new_course() for _ in range(BULK_SIZE)])),
+            ('toggle', 'POST', course_path('/api/courses/{}/toggle'))
+        ]
+    return targets
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def start_server(db_path):
+    """Serve api.app on a free local port from a background thread, returns its base URL"""
+    from werkzeug.serving import make_server
+
+    api.DB_PATH = db_path
+    api.ensure_db()
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, api.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='loadtest-api', daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}'
+
+def run(base_url, db_path, concurrency=8, duration=30, read_only=False):
+    """Drive every endpoint from `concurrency` threads for `duration` seconds"""
+    import requests
+
+    targets = endpoints(db_path, read_only)
+    timings = {name: [] for name, _, _ in targets}
+    errors = {name: 0 for name, _, _ in targets}
+    lock = threading.Lock()
+    local = threading.local()
+    deadline = time.monotonic() + duration
+
+    def worker(worker_id):
+        local.session = requests.Session()
+        turn = worker_id
+        while time.monotonic() < deadline:
+            # Every worker cycles through all endpoints, offset so they don't line up
+            name, method, make_request = targets[turn % len(targets)]
+            turn += 1
+            path, body = make_request()
+            started = time.perf_counter()
+            try:
+                ok = local.session.request(method, base_url + path, json=body, timeout=60).ok
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                timings[name].append(elapsed)
+                if not ok:
+                    errors[name] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    wall = time.perf_counter() - started
+
+    report = {'concurrency': concurrency, 'seconds': round(wall, 1), 'endpoints': {}}
+    total = 0
+    print(f"\n{'endpoint':<16}{'requests':>9}{'errors':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, _, _ in targets:
+        values = sorted(timings[name])
+        total += len(values)
+        stats = {
+            'requests': len(values),
+            'errors': errors[name],
+            **{f'p{p}_ms': round(percentile(values, p) * 1000, 1) if values else None for p in (50, 90, 99)},
+            'max_ms': round(values[-1] * 1000, 1) if values else None
+        }
+        report['endpoints'][name] = stats
+        print(
+            f"{name:<16}{stats['requests']:>9}{stats['errors']:>8}"
+            + ''.join(f"{stats[key] if stats[key] is not None else '-':>10}" for key in ('p50_ms', 'p90_ms', 'p99_ms', 'max_ms'))
+        )
+    report['requests_per_second'] = round(total / wall, 1) if wall else None
+    print(f"\n{total} requests in {wall:.1f}s ({report['requests_per_second']} req/s)")
+    return report
+
+def query_plans(db_path):
+    """EXPLAIN QUERY PLAN for the main API queries"""
+    conn = sqlite3.connect(db_path)
+    plans = {}
+    try:
+        for name, (sql, params) in PLAN_QUERIES.items():
+            rows = conn.execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+            plans[name] = [row[-1] for row in rows]
+    finally:
+        conn.close()
+
+    print("\nQuery plans:")
+    for name, steps in plans.items():
+        print(f"  {name}")
+        for step in steps:
+            print(f"    {step}")
+    return plans
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate synthetic data and load test the API')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    gen = commands.add_parser('generate', help='fill a database with synthetic data')
+    gen.add_argument('--db', default='loadtest.db')
+    gen.add_argument('--courses', type=int, default=10000)
+    gen.add_argument('--checks', type=int, default=1000000)
+    gen.add_argument('--notifications', type=int, default=100000)
+    gen.add_argument('--days', type=int, default=30, help='spread the history over this many days')
+    gen.add_argument('--seed', type=int, default=1)
+
+    bench = commands.add_parser('run', help='load test the API and print query plans')
+    bench.add_argument('--db', default='loadtest.db')
+    bench.add_argument('--url', help='API to test (default: serve api.py in-process against --db)')
+    bench.add_argument('--concurrency', type=int, default=8)
+    bench.add_argument('--duration', type=int, default=30, help='seconds')
+    bench.add_argument('--json', help='also write the report to this file')
+    bench.add_argument('--read-only', action='store_true', help="skip the endpoints that write to the database")
+
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        generate(args.db, args.courses, args.checks, args.notifications, args.days, args.seed)
+    else:
+        base_url = args.url or start_server(args.db)
+        report = run(base_url, args.db, args.concurrency, args.duration, args.read_only)
+        report['query_plans'] = query_plans(args.db)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(report, f, indent=2)
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+WebReg Monitor - Logging setup
+
+Log calls on the check path only put the record on a queue. A listener
+thread formats it and writes it to a size-rotated file (plus the
+console), so a busy monitor never waits on disk I/O.
+"""
+import logging
+import logging.handlers
+import queue
+import sys
+
+LOG_FILE = 'monitor.log'
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 5
+
+# Attributes every LogRecord has - anything else came in through `extra`
+_STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+
+class KeyValueFormatter(logging.Formatter):
+    """Formats records as text followed by key=value context fields"""
+
+    def formatMessage(self, record):
+        line = super().formatMessage(record)
+        fields = []
+        for key, value in record.__dict__.items():
+            if key in _STANDARD_ATTRS or key.startswith('_') or key == 'sample':
+                continue
+            value = str(value)
+            if ' ' in value or '=' in value:
+                value = '"' + value.replace('"', '\\"') + '"'
+            fields.append(f'{key}={value}')
+        if fields:
+            line += ' | ' + ' '.join(fields)
+        return line
+
+class SampleFilter(logging.Filter):
+    """Lets through 1 in `rate` records that were logged with extra={'sample': True}"""
+
+    def __init__(self, rate=1):
+        super().__init__()
+        self.rate = max(1, int(rate))
+        self.count = 0
+
+    def filter(self, record):
+        if not getattr(record, 'sample', False) or self.rate == 1:
+            return True
+        self.count += 1
+        return self.count % self.rate == 1
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that leaves formatting to the listener thread"""
+
+    def prepare(self, record):
+        # Same process on both ends, so the record can go through untouched
+        return record
+
+class CourseLogger(logging.LoggerAdapter):
+    """Adds per-course context fields to every record"""
+
+    def process(self, msg, kwargs):
+        kwargs['extra'] = {**self.extra, **kwargs.get('extra', {})}
+        return msg, kwargs
+
+def course_logger(logger, subject, course_num, **fields):
+    """Logger that tags each line with the course being checked"""
+    return CourseLogger(logger, {'course': f'{subject} {course_num}', **fields})
+
+def setup_logging(log_file=LOG_FILE, level='INFO', max_bytes=MAX_BYTES,
+                  backup_count=BACKUP_COUNT, section_sample_rate=1, console_level=None):
+    """Send the 'webreg' loggers through a queue to a rotating file and the console"""
+    global _listener
+
+    logger = logging.getLogger('webreg')
+    if _listener is not None:
+        # Already set up (the monitor restarts itself in-process)
+        logger.setLevel(level)
+        return logger
+
+    formatter = KeyValueFormatter('%(asctime)s %(levelname)-7s %(name)s: %(message)s')
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+    )
+    file_handler.setFormatter(formatter)
+
+    # Only chatty on the console when someone is watching it
+    if console_level is None:
+        console_level = level if sys.stderr.isatty() else 'WARNING'
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(console_level)
+    console_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(SampleFilter(section_sample_rate))
+
+    logger.handlers = [queue_handler]
+    logger.setLevel(level)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    _listener.start()
+    return logger
+
+def shutdown_logging():
+    """Flush everything still in the queue"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
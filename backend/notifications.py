@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+"""
+WebReg Monitor - Alert delivery
+
+Emails are buffered for the check cycle and coalesced into one digest
+per recipient, so several courses opening at once cost one email (and
+one SMTP login per flush) instead of one each.
+
+Webhooks go out immediately as a JSON POST over a pooled HTTP session.
+Every delivery is queued in SQLite first, so failed ones are retried
+with exponential backoff even across restarts.
+
+Run `python3 notifications.py --receiver 8787` for a local receiver
+that prints whatever it's sent, and `--test URL` to POST a sample alert.
+"""
+import argparse
+import json
+import logging
+import sqlite3
+import time
+from datetime import datetime
+
+logger = logging.getLogger('webreg.notify')
+
+EMAIL_CONFIG_FILE = 'email_config.json'
+DIGEST_MAX_HOLD = 120  # seconds an alert may wait for others before it's sent anyway
+MAX_SECTIONS_LISTED = 10
+
+def load_email_config():
+    """Read sender credentials, None if email isn't set up"""
+    try:
+        with open(EMAIL_CONFIG_FILE, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def course_name(course):
+    return f"{course['subject']} {course['course_num']}"
+
+def build_digest_message(sender, to_email, items):
+    """One email listing every opened course in `items` [(course, result), ...]"""
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+
+    if len(items) == 1:
+        subject = f"🔔 {course_name(items[0][0])} - Seats Available!"
+    else:
+        subject = f"🔔 {len(items)} courses have seats available!"
+
+    courses_html = ""
+    for course, result in items:
+        sections_text = ""
+        open_sections = [s for s in result.get('watched_sections', result['sections']) if s['available'] > 0]
+        for section in open_sections[:MAX_SECTIONS_LISTED]:
+            # Name the course too when the search matched several and none was picked out
+            group = section.get('group') if len(result.get('groups', {})) > 1 and 'group' not in result else None
+            label = ' '.join(filter(None, (group, section.get('id'), section.get('type'))))
+            label = f"{label}: " if label else ""
+            sections_text += f"<li>{label}{section['available']}/{section['total']} seats</li>\n"
+
+        courses_html += f"""
+            <p><strong>{course_name(course)}</strong> has seats available!</p>
+            <ul>{sections_text}</ul>
+            <p><strong>Total: {result['total_available']} seats</strong></p>
+        """
+
+    body = f"""
+    <html>
+    <body>
+        <h2>WebReg Alert!</h2>
+        {courses_html}
+        <p>
+            <a href="https://act.ucsd.edu/webreg2/start"
+               style="background-color: #667eea; color: white; padding: 15px 30px;
+                      text-decoration: none; border-radius: 10px; display: inline-block;">
+                Enroll Now →
+            </a>
+        </p>
+        <p style="color: gray; font-size: 12px; margin-top: 20px;">
+            Checked at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        </p>
+    </body>
+    </html>
+    """
+
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = sender
+    msg['To'] = to_email
+    msg.attach(MIMEText(body, 'html'))
+    return msg
+
+class EmailDigest:
+    """Buffers email alerts and sends one digest per recipient"""
+
+    def __init__(self, max_hold=DIGEST_MAX_HOLD):
+        self.max_hold = max_hold
+        self.pending = {}  # email -> {'since': ts, 'items': {course_id: (course, result, on_sent)}}
+
+    def add(self, course, result, on_sent=None):
+        """Queue an alert. A newer result for the same course replaces the old one.
+        on_sent(course, result, dispatched_at) is called once the email has gone out,
+        dispatched_at being when it was handed to SMTP."""
+        group = self.pending.setdefault(course['email'], {'since': time.monotonic(), 'items': {}})
+        group['items'][course['id']] = (course, result, on_sent)
+
+    def snapshot(self):
+        """Pending alerts as {email: [[course, result], ...]} for the monitor's checkpoint"""
+        return {
+            email: [[course, result] for course, result, _ in group['items'].values()]
+            for email, group in self.pending.items()
+        }
+
+    def due(self):
+        """Recipients whose oldest alert has waited max_hold seconds"""
+        now = time.monotonic()
+        return [email for email, group in self.pending.items() if now - group['since'] >= self.max_hold]
+
+    def flush_due(self):
+        """Send only the digests that can't wait any longer"""
+        due = self.due()
+        return self.flush(due) if due else 0
+
+    def flush(self, recipients=None):
+        """Send digests (all of them by default) over one SMTP session, returns emails sent"""
+        if recipients is None:
+            recipients = list(self.pending)
+        groups = [(email, self.pending.pop(email)) for email in recipients if email in self.pending]
+        if not groups:
+            return 0
+
+        config = load_email_config()
+        if config is None:
+            logger.warning("No email_config.json - skipping email")
+            return 0
+
+        import smtplib
+
+        sent = 0
+        try:
+            with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
+                server.login(config['sender_email'], config['sender_password'])
+
+                for email, group in groups:
+                    items = list(group['items'].values())
+                    try:
+                        msg = build_digest_message(
+                            config['sender_email'], email,
+                            [(course, result) for course, result, _ in items]
+                        )
+                        dispatched_at = time.time()
+                        server.send_message(msg)
+                    except Exception as e:
+                        logger.error("Email failed: %s", e, extra={'to': email})
+                        continue
+
+                    sent += 1
+                    logger.info("Email sent", extra={'to': email, 'courses': len(items)})
+                    for course, result, on_sent in items:
+                        if on_sent:
+                            on_sent(course, result, dispatched_at)
+        except Exception as e:
+            logger.error("Email failed: %s", e)
+
+        return sent
+
+WEBHOOK_TIMEOUT = (2, 5)  # connect, read seconds
+WEBHOOK_MAX_ATTEMPTS = 8
+WEBHOOK_BACKOFF_BASE = 5  # seconds, doubled after each failed attempt
+WEBHOOK_BACKOFF_MAX = 3600
+
+def build_webhook_payload(course, result):
+    """JSON body sent to a course's webhook"""
+    return {
+        'event': 'seats_available',
+        'course': course_name(course),
+        'course_id': course['id'],
+        'subject': course['subject'],
+        'course_num': course['course_num'],
+        'seats': result['total_available'],
+        'sections': result.get('watched_sections', result['sections']),
+        'checked_at': result.get('timestamp') or datetime.now().isoformat(),
+        'enroll_url': 'https://act.ucsd.edu/webreg2/start'
+    }
+
+def webhook_backoff(attempts):
+    """Seconds to wait before retry number `attempts`"""
+    return min(WEBHOOK_BACKOFF_BASE * 2 ** max(0, attempts - 1), WEBHOOK_BACKOFF_MAX)
+
+class WebhookQueue:
+    """Delivers webhook alerts and retries failed ones from a SQLite queue"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._session = None
+        self._tables_ready = False
+        
+        # Called as on_delivered(meta, delivered_at) for deliveries queued with meta
+        self.on_delivered = None
+
+    @property
+    def session(self):
+        # One pooled session, so repeat deliveries reuse the connection
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            self._session = requests.Session()
+            self._session.headers['User-Agent'] = 'CourseSniper-Webhook/1.0'
+            adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10)
+            self._session.mount('http://', adapter)
+            self._session.mount('https://', adapter)
+        return self._session
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_path)
+        if not self._tables_ready:
+            init_webhook_tables(conn)
+            self._tables_ready = True
+        return conn
+
+    def post(self, url, payload):
+        """One delivery attempt, returns (ok, status_code, latency_ms, error)"""
+        start = time.perf_counter()
+        try:
+            response = self.session.post(url, json=payload, timeout=WEBHOOK_TIMEOUT)
+            latency_ms = (time.perf_counter() - start) * 1000
+            if 200 <= response.status_code < 300:
+                return True, response.status_code, latency_ms, None
+            return False, response.status_code, latency_ms, f'HTTP {response.status_code}'
+        except Exception as e:
+            latency_ms = (time.perf_counter() - start) * 1000
+            return False, None, latency_ms, str(e)
+
+    def send(self, course, result, meta=None):
+        """Queue an alert for the course's webhook and try to deliver it now.
+        `meta` is kept with the queued delivery and handed to on_delivered."""
+        payload = build_webhook_payload(course, result)
+
+        conn = self.connect()
+        c = conn.cursor()
+        c.execute(
+            'INSERT INTO webhook_queue (course_id, url, payload, alert_meta) VALUES (?, ?, ?, ?)',
+            (course['id'], course['webhook_url'], json.dumps(payload), json.dumps(meta) if meta else None)
+        )
+        queue_id = c.lastrowid
+        conn.commit()
+
+        try:
+            return self.attempt(conn, queue_id, course['webhook_url'], payload, 0, meta)
+        finally:
+            conn.close()
+
+    def attempt(self, conn, queue_id, url, payload, attempts, meta=None):
+        """Try one queued delivery and record how it went"""
+        ok, status_code, latency_ms, error = self.post(url, payload)
+        attempts += 1
+
+        c = conn.cursor()
+        c.execute(
+            'INSERT INTO webhook_attempts (queue_id, latency_ms, status_code, error) VALUES (?, ?, ?, ?)',
+            (queue_id, latency_ms, status_code, error)
+        )
+
+        if ok:
+            c.execute(
+                "UPDATE webhook_queue SET status='delivered', attempts=?, delivered_at=CURRENT_TIMESTAMP, last_error=NULL WHERE id=?",
+                (attempts, queue_id)
+            )
+            logger.info("Webhook delivered", extra={'url': url, 'latency_ms': round(latency_ms), 'attempt': attempts})
+        elif attempts >= WEBHOOK_MAX_ATTEMPTS:
+            c.execute(
+                "UPDATE webhook_queue SET status='failed', attempts=?, last_error=? WHERE id=?",
+                (attempts, error, queue_id)
+            )
+            logger.error("Webhook gave up: %s", error, extra={'url': url, 'attempt': attempts})
+        else:
+            c.execute(
+                "UPDATE webhook_queue SET attempts=?, last_error=?, next_attempt_at=datetime('now', ?) WHERE id=?",
+                (attempts, error, f'+{webhook_backoff(attempts)} seconds', queue_id)
+            )
+            logger.warning("Webhook failed, will retry: %s", error, extra={'url': url, 'attempt': attempts})
+
+        conn.commit()
+
+        # After the commit, the hook may write to the same database
+        if ok and meta and self.on_delivered:
+            try:
+                self.on_delivered(meta, time.time())
+            except Exception as e:
+                logger.warning("Webhook delivery hook failed: %s", e)
+        return ok
+
+    def process_retries(self, limit=20):
+        """Retry queued deliveries whose backoff has passed, returns how many were tried"""
+        conn = self.connect()
+        try:
+            c = conn.cursor()
+            c.execute('''
+                SELECT id, url, payload, attempts, alert_meta FROM webhook_queue
+                WHERE status='pending' AND next_attempt_at <= CURRENT_TIMESTAMP
+                ORDER BY next_attempt_at
+                LIMIT ?
+            ''', (limit,))
+            due = c.fetchall()
+
+            for queue_id, url, payload, attempts, meta in due:
+                self.attempt(conn, queue_id, url, json.loads(payload), attempts, json.loads(meta) if meta else None)
+            return len(due)
+        finally:
+            conn.close()
+
+def init_webhook_tables(conn):
+    """Create the webhook queue tables if they don't exist"""
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS webhook_queue (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course_id INTEGER,
+            url TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT DEFAULT 'pending',
+            attempts INTEGER DEFAULT 0,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            delivered_at TIMESTAMP,
+            alert_meta TEXT
+        )
+    ''')
+    c.execute('PRAGMA table_info(webhook_queue)')
+    if 'alert_meta' not in {row[1] for row in c.fetchall()}:
+        c.execute('ALTER TABLE webhook_queue ADD COLUMN alert_meta TEXT')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_webhook_queue_due
+        ON webhook_queue (status, next_attempt_at)
+    ''')
+
+    # Latency of every delivery attempt
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS webhook_attempts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            queue_id INTEGER,
+            attempted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            latency_ms REAL,
+            status_code INTEGER,
+            error TEXT,
+            FOREIGN KEY (queue_id) REFERENCES webhook_queue(id)
+        )
+    ''')
+    conn.commit()
+
+def run_receiver(port):
+    """Tiny local webhook receiver that prints every payload"""
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            try:
+                print(json.dumps(json.loads(body), indent=2))
+            except ValueError:
+                print(body.decode('utf-8', 'replace'))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    print(f"Webhook receiver listening on http://localhost:{port}/")
+    HTTPServer(('127.0.0.1', port), Handler).serve_forever()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Webhook test tools')
+    parser.add_argument('--receiver', type=int, metavar='PORT', help='run a local receiver')
+    parser.add_argument('--test', metavar='URL', help='send a sample alert to URL')
+    parser.add_argument('--db', default='webreg.db')
+    args = parser.parse_args()
+
+    if args.receiver:
+        run_receiver(args.receiver)
+    elif args.test:
+        course = {'id': 0, 'subject': 'CSE', 'course_num': '100', 'email': '', 'webhook_url': args.test}
+        result = {'total_available': 3, 'sections': [{'available': 3, 'total': 100, 'full': False}]}
+        ok = WebhookQueue(args.db).send(course, result)
+        print("Delivered" if ok else "Failed - queued for retry")
+    else:
+        parser.print_help()
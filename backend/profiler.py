@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+WebReg Monitor - On-demand sampling profiler
+
+The API drops a request file asking for the next N monitor cycles to be
+profiled. While a window is open, a background thread samples the
+monitor's main thread stack every few milliseconds. When the window
+closes it writes a collapsed-stack file (one "frame;frame;frame count"
+line per stack, readable by flamegraph.pl or speedscope.app) and a
+top-functions summary to profiles/. With no request pending the only
+cost is one os.path.exists per cycle.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+logger = logging.getLogger('webreg.profiler')
+
+PROFILE_REQUEST_FILE = 'profile_request.json'
+PROFILE_DIR = 'profiles'
+DEFAULT_INTERVAL = 0.01  # seconds between samples
+MAX_CYCLES = 20
+TOP_FUNCTIONS = 30
+
+def request_profile(cycles=1, interval=DEFAULT_INTERVAL, request_file=PROFILE_REQUEST_FILE):
+    """Ask the running monitor to profile its next `cycles` cycles"""
+    tmp_file = request_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump({'cycles': cycles, 'interval': interval, 'requested_at': datetime.now().isoformat()}, f)
+    os.replace(tmp_file, request_file)
+
+def take_request(request_file=PROFILE_REQUEST_FILE):
+    """Pop a pending profile request, None if there isn't one"""
+    if not os.path.exists(request_file):
+        return None
+    try:
+        with open(request_file, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    try:
+        os.remove(request_file)
+    except OSError:
+        pass
+    return data
+
+def list_profiles(out_dir=PROFILE_DIR):
+    """Profile output files, newest first"""
+    if not os.path.isdir(out_dir):
+        return []
+    files = []
+    for name in os.listdir(out_dir):
+        path = os.path.join(out_dir, name)
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            files.append({
+                'name': name,
+                'size': stat.st_size,
+                'created_at': datetime.fromtimestamp(stat.st_mtime).isoformat()
+            })
+    return sorted(files, key=lambda f: f['created_at'], reverse=True)
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    """Samples one thread's Python stack on a timer"""
+
+    def __init__(self, interval=DEFAULT_INTERVAL, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.main_thread().ident
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.seconds = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        stack = []
+        while frame is not None:
+            stack.append(frame_label(frame.f_code))
+            frame = frame.f_back
+        self.stacks[tuple(reversed(stack))] += 1
+        self.samples += 1
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self.run, name='webreg-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.seconds = time.perf_counter() - self.started_at
+
+    def collapsed(self):
+        """Stacks in flamegraph.pl's collapsed format"""
+        return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, top=TOP_FUNCTIONS):
+        """Top functions by own samples and by samples anywhere on the stack"""
+        own = Counter()
+        total = Counter()
+        files = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            files[stack[-1].rsplit('(', 1)[-1].split(':')[0]] += count
+            for label in set(stack):
+                total[label] += count
+
+        def table(title, counter, column='function'):
+            lines = [title, f"{'samples':>8} {'%':>6}  {column}"]
+            for label, count in counter.most_common(top):
+                lines.append(f"{count:>8} {100 * count / max(1, self.samples):>5.1f}%  {label}")
+            return lines
+
+        lines = [
+            f"{self.samples} samples over {self.seconds:.1f}s (every {self.interval * 1000:.0f} ms)",
+            "Own time is where the thread was when sampled - a call into C (sleep,",
+            "sqlite3, sockets) shows up as own time of the Python function making it.",
+            ""
+        ]
+        lines += table("Own time by function", own) + [""]
+        lines += table("Total time by function (anywhere on the stack)", total) + [""]
+        lines += table("Own time by file", files, 'file')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, out_dir=PROFILE_DIR):
+        """Write the collapsed stacks and the summary, returns their paths"""
+        os.makedirs(out_dir, exist_ok=True)
+        base = os.path.join(out_dir, datetime.now().strftime('profile-%Y%m%d-%H%M%S'))
+        paths = [base + '.collapsed', base + '-top.txt']
+        with open(paths[0], 'w') as f:
+            f.write(self.collapsed())
+        with open(paths[1], 'w') as f:
+            f.write(self.summary())
+        return paths
+
+class CycleProfiler:
+    """Profiles the next N monitor cycles whenever the API asks for it"""
+
+    def __init__(self, request_file=PROFILE_REQUEST_FILE, out_dir=PROFILE_DIR):
+        self.request_file = request_file
+        self.out_dir = out_dir
+        self.profiler = None
+        self.cycles_left = 0
+
+    def poll(self):
+        """Start a profiling window if one was requested (call at the start of a cycle)"""
+        if self.profiler is not None:
+            return
+        request = take_request(self.request_file)
+        if request is None:
+            return
+        self.cycles_left = max(1, min(int(request.get('cycles', 1)), MAX_CYCLES))
+        self.profiler = SamplingProfiler(float(request.get('interval', DEFAULT_INTERVAL)))
+        self.profiler.start()
+        logger.info("Profiling started", extra={'cycles': self.cycles_left})
+
+    def cycle_done(self):
+        """Count a finished cycle, closing the window after the last one"""
+        if self.profiler is None:
+            return
+        self.cycles_left -= 1
+        if self.cycles_left <= 0:
+            self.stop()
+
+    def stop(self):
+        """Close the window early (shutdown) and write what was sampled"""
+        if self.profiler is None:
+            return
+        profiler, self.profiler = self.profiler, None
+        profiler.stop()
+        try:
+            paths = profiler.write(self.out_dir)
+            logger.info("Profile written", extra={'samples': profiler.samples, 'files': ','.join(paths)})
+        except OSError as e:
+            logger.warning("Could not write profile: %s", e)
+
+    def status(self):
+        return {'cycles_left': self.cycles_left} if self.profiler else None
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+WebReg Monitor - Shared rate limiter for WebReg traffic
+
+A token bucket kept in SQLite, so every process that talks to WebReg
+(the monitor, "check now", a second bot) draws from the same budget.
+Each update runs under BEGIN IMMEDIATE, which serialises processes on
+the database lock. The refill rate adapts (AIMD): it is halved when
+WebReg serves an error page or answers slowly, and creeps back up by a
+fixed step after every healthy request.
+"""
+import logging
+import random
+import sqlite3
+import time
+
+logger = logging.getLogger('webreg.ratelimit')
+
+DB_PATH = 'webreg.db'
+
+# Requests per second
+DEFAULT_RATE = 1 / 3
+MIN_RATE = 1 / 60
+MAX_RATE = 1 / 2
+INCREASE_STEP = 0.01
+DECREASE_FACTOR = 0.5
+
+BURST = 2
+JITTER = 0.2
+SLOW_SECONDS = 8
+
+def init_rate_limit_table(conn):
+    """Create the bucket table if it doesn't exist"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS rate_limits (
+            name TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            rate REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    ''')
+
+class RateLimiter:
+    """Cross-process token bucket with adaptive rate"""
+
+    def __init__(self, db_path=DB_PATH, name='webreg', rate=DEFAULT_RATE, min_rate=MIN_RATE,
+                 max_rate=MAX_RATE, burst=BURST, jitter=JITTER, slow_seconds=SLOW_SECONDS):
+        self.db_path = db_path
+        self.name = name
+        self.initial_rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.jitter = jitter
+        self.slow_seconds = slow_seconds
+
+        conn = self.connect()
+        try:
+            init_rate_limit_table(conn)
+        finally:
+            conn.close()
+
+    def connect(self):
+        # Autocommit mode so BEGIN IMMEDIATE is ours to issue
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def _update(self, change):
+        """Run change(tokens, rate, now) -> (tokens, rate, result) under the write lock"""
+        conn = self.connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            now = time.time()
+            row = conn.execute(
+                'SELECT tokens, rate, updated_at FROM rate_limits WHERE name=?', (self.name,)
+            ).fetchone()
+            if row is None:
+                tokens, rate = float(self.burst), self.initial_rate
+            else:
+                tokens, rate, updated_at = row
+                rate = min(self.max_rate, max(self.min_rate, rate))
+                tokens = min(self.burst, tokens + max(0, now - updated_at) * rate)
+
+            tokens, rate, result = change(tokens, rate, now)
+            conn.execute('''
+                INSERT INTO rate_limits (name, tokens, rate, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (name) DO UPDATE SET tokens=excluded.tokens, rate=excluded.rate,
+                                                 updated_at=excluded.updated_at
+            ''', (self.name, tokens, rate, now))
+            conn.execute('COMMIT')
+            return result
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def try_acquire(self, cost=1):
+        """Take `cost` tokens if they're there. Returns 0 on success, else seconds to wait."""
+        def take(tokens, rate, now):
+            if tokens >= cost:
+                return tokens - cost, rate, 0
+            return tokens, rate, (cost - tokens) / rate
+
+        return self._update(take)
+
+    def acquire(self, cost=1, timeout=None):
+        """Block until `cost` tokens are available, returns the seconds waited.
+        Raises TimeoutError if that would take longer than `timeout`."""
+        started = time.monotonic()
+        while True:
+            wait = self.try_acquire(cost)
+            waited = time.monotonic() - started
+            if wait == 0:
+                if waited > 1:
+                    logger.debug("Rate limited", extra={'waited': round(waited, 1)})
+                return waited
+
+            # Jitter keeps several processes from waking up in lockstep
+            wait *= 1 + random.uniform(0, self.jitter)
+            if timeout is not None and waited + wait > timeout:
+                raise TimeoutError(f'rate limit wait of {wait:.1f}s exceeds {timeout}s')
+            time.sleep(wait)
+
+    def report(self, ok=True, seconds=None):
+        """Feed back how a request went: back off on errors or slow answers, recover otherwise"""
+        healthy = ok and (seconds is None or seconds < self.slow_seconds)
+
+        def adjust(tokens, rate, now):
+            if healthy:
+                return tokens, min(self.max_rate, rate + INCREASE_STEP), rate
+            # Empty the bucket too, so the very next request already waits
+            return min(tokens, 0), max(self.min_rate, rate * DECREASE_FACTOR), rate
+
+        old_rate = self._update(adjust)
+        if not healthy:
+            logger.warning(
+                "WebReg looks unhappy, backing off",
+                extra={'ok': ok, 'seconds': round(seconds, 1) if seconds is not None else None,
+                       'interval': round(1 / max(self.min_rate, old_rate * DECREASE_FACTOR), 1)}
+            )
+
+    def status(self):
+        """Current rate and tokens for the status file"""
+        def peek(tokens, rate, now):
+            return tokens, rate, {'requests_per_minute': round(rate * 60, 2), 'tokens': round(tokens, 2)}
+
+        return self._update(peek)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WebReg Monitor - Record/replay harness for results pages
+
+The monitor can archive every results page it sees together with what
+the live parser made of it. Replaying that corpus through the offline
+parser checks that parser changes still give the same answers and
+measures how fast parsing is, without touching WebReg.
+
+Usage:
+    python3 replay.py [corpus_dir] [--repeat N]
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import time
+from datetime import datetime
+
+from seat_parser import parse_results_html
+
+CORPUS_DIR = 'recordings'
+MAX_PAGES = 500
+
+# Keys that must match between the recorded and replayed result
+COMPARED_KEYS = ('sections', 'total_sections', 'total_available', 'has_availability')
+
+class PageRecorder:
+    """Archives results pages with the result the live parser produced"""
+
+    def __init__(self, corpus_dir=CORPUS_DIR, max_pages=MAX_PAGES):
+        self.corpus_dir = corpus_dir
+        self.max_pages = max_pages
+        os.makedirs(corpus_dir, exist_ok=True)
+
+    def record(self, subject, course_num, page_source, result, targets=None):
+        """Save one page and its expected result, returns the page path"""
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', f'{subject}_{course_num}').strip('_')
+        base = os.path.join(self.corpus_dir, f'{stamp}_{slug}')
+
+        with open(base + '.html', 'w', encoding='utf-8') as f:
+            f.write(page_source)
+        with open(base + '.json', 'w') as f:
+            json.dump({
+                'subject': subject,
+                'course_num': course_num,
+                'recorded_at': datetime.now().isoformat(),
+                'targets': targets,
+                'expected': result
+            }, f, indent=2)
+
+        self.prune()
+        return base + '.html'
+
+    def prune(self):
+        """Drop the oldest recordings past max_pages"""
+        pages = sorted(glob.glob(os.path.join(self.corpus_dir, '*.html')))
+        for page in pages[:max(0, len(pages) - self.max_pages)]:
+            for path in (page, page[:-len('.html')] + '.json'):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+def load_corpus(corpus_dir=CORPUS_DIR):
+    """Load (name, html, expected, targets, course) for every recorded page"""
+    corpus = []
+    for page in sorted(glob.glob(os.path.join(corpus_dir, '*.html'))):
+        meta_file = page[:-len('.html')] + '.json'
+        if not os.path.exists(meta_file):
+            continue
+        with open(page, 'r', encoding='utf-8') as f:
+            html = f.read()
+        with open(meta_file, 'r') as f:
+            meta = json.load(f)
+        course = ' '.join(filter(None, (meta.get('subject'), meta.get('course_num')))) or None
+        corpus.append((os.path.basename(page), html, meta.get('expected'), meta.get('targets'), course))
+    return corpus
+
+def compare(expected, actual):
+    """List the differences between a recorded and a replayed result"""
+    if expected is None or actual is None:
+        if expected is None and actual is None:
+            return []
+        return [f'expected {expected and "a result"}, got {actual and "a result"}']
+
+    # Pages recorded before sections had ids/types only know the seat counts
+    actual = dict(actual)
+    if expected.get('sections') and actual.get('sections'):
+        keys = set().union(*expected['sections'])
+        actual['sections'] = [
+            {key: value for key, value in section.items() if key in keys}
+            for section in actual['sections']
+        ]
+
+    return [
+        f'{key}: expected {expected.get(key)!r}, got {actual.get(key)!r}'
+        for key in COMPARED_KEYS
+        if expected.get(key) != actual.get(key)
+    ]
+
+def replay(corpus_dir=CORPUS_DIR, repeat=1):
+    """Parse every recorded page, check it and time it"""
+    corpus = load_corpus(corpus_dir)
+    if not corpus:
+        print(f"No recorded pages in {corpus_dir}/")
+        return {'pages': 0, 'failures': 0, 'pages_per_second': 0}
+
+    failures = 0
+    for name, html, expected, targets, course in corpus:
+        problems = compare(expected, parse_results_html(html, targets, course))
+        if problems:
+            failures += 1
+            print(f"[FAIL] {name}")
+            for problem in problems:
+                print(f"    {problem}")
+
+    # Throughput over the whole corpus, parsing only
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, html, _, targets, course in corpus:
+            parse_results_html(html, targets, course)
+    elapsed = time.perf_counter() - start
+
+    parsed = len(corpus) * repeat
+    pages_per_second = parsed / elapsed if elapsed else float('inf')
+
+    print(f"\n{len(corpus) - failures}/{len(corpus)} pages match their recorded result")
+    print(f"Parsed {parsed} pages in {elapsed:.3f}s ({pages_per_second:.1f} pages/s)")
+
+    return {
+        'pages': len(corpus),
+        'failures': failures,
+        'pages_per_second': pages_per_second
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay recorded WebReg results pages')
+    parser.add_argument('corpus_dir', nargs='?', default=CORPUS_DIR)
+    parser.add_argument('--repeat', type=int, default=1, help='parse the corpus this many times for timing')
+    args = parser.parse_args()
+
+    summary = replay(args.corpus_dir, args.repeat)
+    raise SystemExit(1 if summary['failures'] else 0)
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+WebReg Monitor - Seat parsing helpers
+
+Shared by the live Selenium parser in webreg_bot.py and the offline HTML
+parser used to replay recorded pages.
+"""
+from datetime import datetime
+
+from catalog import parse_course
+
+AVAIL_COLUMN = 'AVAIL_SEAT'
+TOTAL_COLUMN = 'SCTN_CPCTY_QTY'  # Section Capacity Quantity
+SECTION_COLUMN = 'SECT_CODE'  # e.g. A01
+TYPE_COLUMN = 'FK_CDI_INSTR_TYPE'  # e.g. LE, DI, LA
+
+def parse_targets(value):
+    """Turn 'A01, b02 LA' or a list into ['A01', 'B02', 'LA'] (None means every section)"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = value.replace(',', ' ').split()
+    targets = []
+    for token in value:
+        token = str(token).strip().upper()
+        if token and token not in targets:
+            targets.append(token)
+    return targets or None
+
+def is_type_target(target):
+    """Section types are letters only (LE, DI), section ids have digits (A01)"""
+    return target.isalpha()
+
+def can_stop_early(targets):
+    """Only a list of section ids tells us when we've seen everything we need"""
+    return bool(targets) and not any(is_type_target(t) for t in targets)
+
+def matches_target(section, targets):
+    return section.get('id') in targets or section.get('type') in targets
+
+def group_label(text):
+    """Collapse a group header's text ('CSE  100\n Advanced Data Structures') to one line"""
+    return ' '.join(text.split())
+
+def make_section(avail_text, total_text, section_id='', section_type='', group=''):
+    """Turn the cell texts into a section dict (None if not a real section)"""
+    avail_text = avail_text.strip()
+    total_text = total_text.strip()
+
+    available = int(avail_text) if avail_text.isdigit() else 0
+    total = int(total_text) if total_text.isdigit() else 0
+
+    if total <= 0:
+        return None
+
+    section = {
+        'available': available,
+        'total': total,
+        'full': available == 0
+    }
+    if section_id.strip():
+        section['id'] = section_id.strip().upper()
+    if section_type.strip():
+        section['type'] = section_type.strip().upper()
+    if group_label(group):
+        section['group'] = group_label(group)
+    return section
+
+def summarize(sections, targets=None):
+    """Seat counts for one set of sections. With targets, only the watched sections count."""
+    watched = sections
+    if targets:
+        watched = [s for s in sections if matches_target(s, targets)]
+
+    summary = {
+        'sections': sections,
+        'main_section': sections[0],  # usually the main lecture
+        'total_sections': len(sections),
+        'total_available': sum(s['available'] for s in watched),
+        'has_availability': any(s['available'] > 0 for s in watched)  # ANY watched section, not just main
+    }
+    if targets:
+        summary['watched_sections'] = watched
+        summary['missing_targets'] = [
+            t for t in targets if not any(matches_target(s, [t]) for s in sections)
+        ]
+    return summary
+
+def group_sections(sections):
+    """Sections per result group label, in page order (one group per course the search matched)"""
+    groups = {}
+    for section in sections:
+        if 'group' in section:
+            groups.setdefault(section['group'], []).append(section)
+    return groups
+
+def course_code(course):
+    """'CSE 100' from 'cse100' or ('CSE', '100'), None if it doesn't look like a course"""
+    parsed = parse_course(course if isinstance(course, str) else ' '.join(course)) if course else None
+    return ' '.join(parsed[:2]) if parsed else None
+
+def in_course(label, code):
+    """True if a group label belongs to the course `code` (an unlabelled row might, too)"""
+    return not label or code is None or course_code(label) == code
+
+def course_group(groups, course):
+    """The label of the group for `course` ('CSE 100' or (subject, course_num)), None if no group is"""
+    code = course_code(course)
+    if code is None:
+        return None
+    return next((label for label in groups if course_code(label) == code), None)
+
+def build_result(sections, targets=None, course=None):
+    """Summarise parsed sections into the result dict the monitor uses.
+    With targets, availability only counts the watched sections. When the
+    search matched several courses, `groups` holds each one keyed by its
+    group label, and the top-level counts come from the group for `course`
+    alone. If no group can be matched to it, they cover every section."""
+    if not sections:
+        return None
+
+    grouped = group_sections(sections)
+    label = course_group(grouped, course)
+
+    result = {
+        'timestamp': datetime.now().isoformat(),
+        **summarize(grouped[label] if label else sections, targets)
+    }
+    if grouped:
+        result['groups'] = {name: summarize(group, targets) for name, group in grouped.items()}
+    if label:
+        result['group'] = label
+    if targets:
+        result['targets'] = targets
+    return result
+
+def parse_results_html(html, targets=None, course=None):
+    """Parse a saved results page without a browser, same output as parse_results_from_table"""
+    import lxml.html
+
+    def cell_text(row, column):
+        cells = row.xpath(f'./td[contains(@aria-describedby, "{column}")]')
+        return cells[0].text_content() if cells else ''
+
+    def group_of(row):
+        # The group header row above this one, looking out through nested tables
+        while row is not None:
+            for previous in row.itersiblings(preceding=True):
+                if 'jqgroup' in (previous.get('class') or '').split():
+                    return previous.text_content()
+            row = next(row.iterancestors('tr'), None)
+        return ''
+
+    tree = lxml.html.fromstring(html)
+    avail_cells = tree.xpath(f'//td[contains(@aria-describedby, "{AVAIL_COLUMN}")]')
+
+    if not avail_cells:
+        return None
+
+    # Stop reading rows once every targeted section id has turned up in the searched course
+    remaining = set(targets) if can_stop_early(targets) else None
+    code = course_code(course)
+    sections = []
+    for avail_cell in avail_cells:
+        row = avail_cell.getparent()
+        section = make_section(
+            avail_cell.text_content(), cell_text(row, TOTAL_COLUMN),
+            cell_text(row, SECTION_COLUMN), cell_text(row, TYPE_COLUMN), group_of(row)
+        )
+        if section:
+            sections.append(section)
+            if remaining is not None and in_course(section.get('group'), code):
+                remaining.discard(section.get('id'))
+                if not remaining:
+                    break
+
+    return build_result(sections, targets, course)
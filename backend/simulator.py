@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WebReg Monitor - Seat-opening simulator
+
+Runs the real monitor loop (hybrid_monitor.main) against a stand-in
+WebReg under a virtual clock, so a simulated day goes by in seconds.
+Seat openings come from a generated or saved event stream. The stand-in
+bot answers every search with the seats open at that virtual moment and
+notes which openings it saw. Each policy (interval, browsers, search
+time) runs in its own process and scratch directory with a fresh
+database. Results are reported per policy:
+
+    catch rate       share of openings seen by at least one check
+    detection delay  seconds from the seat opening to the check that saw it
+    request cost     WebReg searches per simulated hour, and per caught opening
+
+`browsers` models several browsers splitting the course list. The loop
+itself drives one bot, so a search simply takes search_seconds / browsers
+of virtual time.
+
+Usage:
+    python3 simulator.py --courses 20 --days 1
+    python3 simulator.py --courses 20 --days 2 --save-events events.json
+    python3 simulator.py --events events.json --policy fast:interval=300 --policy two:interval=300,browsers=2
+"""
+import argparse
+import bisect
+import contextlib
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import types
+
+from seat_parser import build_result, make_section, parse_targets
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+SUBJECTS = ['CSE', 'MATH', 'PHYS', 'CHEM', 'BILD', 'ECON', 'COGS', 'DSC']
+
+SEARCH_SECONDS = 12  # a typical search, typing to parsed results
+OPENINGS_PER_DAY = 3  # per course
+MEAN_OPEN_MINUTES = 10  # how long a freed seat stays free
+
+DEFAULT_POLICIES = [
+    {'name': 'hourly', 'interval': 3600},
+    {'name': '30min', 'interval': 1800},
+    {'name': '10min', 'interval': 600},
+    {'name': '5min', 'interval': 300},
+    {'name': '5min-2browsers', 'interval': 300, 'browsers': 2}
+]
+
+def generate_events(courses=20, days=1, openings_per_day=OPENINGS_PER_DAY,
+                    mean_open_minutes=MEAN_OPEN_MINUTES, seed=1):
+    """A random event stream: per course, openings arrive as a Poisson process"""
+    rng = random.Random(seed)
+    duration = days * 86400
+    stream = []
+    for i in range(courses):
+        events = []
+        t = 0
+        while True:
+            t += rng.expovariate(openings_per_day / 86400)
+            if t >= duration:
+                break
+            closes = t + rng.expovariate(1 / (mean_open_minutes * 60))
+            events.append([round(t), round(min(closes, duration)) + 1, rng.randint(1, 3)])
+            t = closes
+        stream.append({'subject': SUBJECTS[i % len(SUBJECTS)], 'course_num': str(100 + i), 'events': events})
+    return {'duration': duration, 'courses': stream}
+
+class VirtualClock:
+    """Stands in for the time module. sleep() moves the clock instead of waiting."""
+
+    def __init__(self, end, on_end):
+        self.start = time.time()
+        self.elapsed = 0.0
+        self.end = end
+        self.on_end = on_end
+        self.ended = False
+
+    def time(self):
+        return self.start + self.elapsed
+
+    def monotonic(self):
+        return self.elapsed
+
+    perf_counter = monotonic
+
+    def sleep(self, seconds):
+        self.elapsed += max(0, seconds)
+        if not self.ended and self.elapsed >= self.end:
+            self.ended = True
+            self.on_end()
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+class SimulatedWebReg:
+    """Which seats are open when, and which openings a search has seen"""
+
+    def __init__(self, stream):
+        self.courses = {}
+        for course in stream['courses']:
+            events = sorted(course['events'])
+            self.courses[(course['subject'], course['course_num'])] = {
+                'opens': [event[0] for event in events],
+                'events': events,
+                'detected': [None] * len(events)
+            }
+
+    def seats(self, subject, course_num, at):
+        """Open seats at virtual second `at`, marking the opening as seen"""
+        course = self.courses.get((subject, course_num))
+        if course is None:
+            return 0
+        index = bisect.bisect_right(course['opens'], at) - 1
+        if index < 0:
+            return 0
+        opened, closed, seats = course['events'][index]
+        if at >= closed:
+            return 0
+        if course['detected'][index] is None:
+            course['detected'][index] = at
+        return seats
+
+    def delays(self):
+        """Detection delay per opening (None where it was missed)"""
+        return [
+            None if detected is None else detected - event[0]
+            for course in self.courses.values()
+            for event, detected in zip(course['events'], course['detected'])
+        ]
+
+class SimulatedBot:
+    """The parts of WebRegBot the monitor loop uses, answering from SimulatedWebReg"""
+
+    def __init__(self, world, clock, search_seconds, headless=False, limiter=None):
+        self.world = world
+        self.clock = clock
+        self.search_seconds = search_seconds
+        self.limiter = limiter
+        self.check_deadline = 60
+        self.check_timeouts = 0
+        self.driver_start_seconds = 0
+        self.last_search = {}
+        self.recorder = None
+        self.searches = 0
+
+    def search_course(self, subject, course_num, sections=None, deadline=None):
+        self.last_search = {}
+        self.clock.sleep(self.search_seconds)
+        self.searches += 1
+        self.last_search['load_seconds'] = self.search_seconds
+        seats = self.world.seats(subject, course_num, self.clock.monotonic())
+        section = make_section(str(seats), '30', 'A00', 'LE', f'{subject} {course_num}')
+        return build_result([section], parse_targets(sections), f'{subject} {course_num}')
+
+    def login_manual(self, use_cookies=True):
+        return True
+
+    def start_keepalive(self, interval=600, on_expiry_warning=None):
+        pass
+
+    def memory_status(self):
+        return {}
+
+    def maybe_recycle(self, **limits):
+        return None
+
+    def close(self):
+        pass
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))]
+
+def run_policy(policy, stream, keep=False):
+    """Run the monitor loop for one policy over the whole stream, returns its report"""
+    workdir = tempfile.mkdtemp(prefix='webreg-sim-')
+    os.chdir(workdir)
+    sys.path.insert(0, BACKEND_DIR)
+
+    import api
+    api.DB_PATH = 'webreg.db'
+    api.init_db()
+    conn = sqlite3.connect('webreg.db')
+    with conn:
+        conn.executemany(
+            'INSERT INTO courses (subject, course_num, email) VALUES (?, ?, ?)',
+            [(c['subject'], c['course_num'], 'sim@example.com') for c in stream['courses']]
+        )
+    conn.close()
+
+    config = {
+        'interval': policy['interval'],
+        'log_level': 'WARNING',
+        **policy.get('config', {})
+    }
+    with open('monitor_config.json', 'w') as f:
+        json.dump(config, f)
+
+    world = SimulatedWebReg(stream)
+
+    def stop():
+        with open('monitor_stop.signal', 'w') as f:
+            f.write('stop')
+
+    clock = VirtualClock(stream['duration'], stop)
+    search_seconds = policy.get('search_seconds', SEARCH_SECONDS) / policy.get('browsers', 1)
+    bots = []
+
+    def make_bot(headless=False, limiter=None):
+        bot = SimulatedBot(world, clock, search_seconds, headless, limiter)
+        bots.append(bot)
+        return bot
+
+    # The loop imports WebRegBot lazily, hand it the stand-in instead
+    sys.modules['webreg_bot'] = types.SimpleNamespace(CHECK_DEADLINE=60, WebRegBot=make_bot)
+
+    import cooldown
+    import course_health
+    import hybrid_monitor
+    import notifications
+    for module in (hybrid_monitor, cooldown, course_health, notifications):
+        module.time = clock
+    hybrid_monitor.play_sound = lambda subject, course_num: None
+
+    started = time.perf_counter()
+    with open('simulator_console.log', 'w') as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        hybrid_monitor.main()
+        hybrid_monitor.shutdown_logging()
+
+    os.chdir(BACKEND_DIR)
+    if not keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    delays = world.delays()
+    caught = sorted(d for d in delays if d is not None)
+    searches = sum(bot.searches for bot in bots)
+    hours = clock.elapsed / 3600
+    return {
+        'policy': policy['name'],
+        'openings': len(delays),
+        'caught': len(caught),
+        'catch_rate': round(len(caught) / len(delays), 3) if delays else None,
+        'mean_delay': round(sum(caught) / len(caught), 1) if caught else None,
+        'p50_delay': percentile(caught, 50),
+        'p90_delay': percentile(caught, 90),
+        'searches': searches,
+        'searches_per_hour': round(searches / hours, 1) if hours else None,
+        'searches_per_catch': round(searches / len(caught), 1) if caught else None,
+        'simulated_hours': round(hours, 1),
+        'wall_seconds': round(time.perf_counter() - started, 1),
+        'workdir': workdir if keep else None
+    }
+
+def parse_policy(text):
+    """'fast:interval=300,browsers=2' -> {'name': 'fast', 'interval': 300, 'browsers': 2}"""
+    name, _, settings = text.partition(':')
+    policy = {'name': name, 'interval': 3600}
+    for setting in filter(None, settings.split(',')):
+        key, _, value = setting.partition('=')
+        value = float(value)
+        if key in ('interval', 'browsers', 'search_seconds'):
+            policy[key] = value
+        else:
+            # Anything else goes into monitor_config.json, e.g. check_deadline=30
+            policy.setdefault('config', {})[key] = value
+    return policy
+
+def print_report(reports):
+    columns = [
+        ('policy', 'policy', '<16'), ('catch_rate', 'caught', '>8'), ('mean_delay', 'mean s', '>9'),
+        ('p50_delay', 'p50 s', '>8'), ('p90_delay', 'p90 s', '>8'),
+        ('searches_per_hour', 'req/h', '>8'), ('searches_per_catch', 'req/catch', '>10')
+    ]
+    print(''.join(f"{title:{fmt}}" for _, title, fmt in columns))
+    for report in reports:
+        values = dict(report, catch_rate=f"{report['catch_rate']:.0%}" if report['catch_rate'] is not None else '-')
+        print(''.join(f"{'-' if values[key] is None else values[key]:{fmt}}" for key, _, fmt in columns))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare monitor policies on simulated seat openings')
+    parser.add_argument('--events', help='replay this event file instead of generating one')
+    parser.add_argument('--save-events', help='write the event stream used to this file')
+    parser.add_argument('--courses', type=int, default=20)
+    parser.add_argument('--days', type=float, default=1)
+    parser.add_argument('--openings-per-day', type=float, default=OPENINGS_PER_DAY)
+    parser.add_argument('--mean-open-minutes', type=float, default=MEAN_OPEN_MINUTES)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--policy', action='append', type=parse_policy,
+                        help='name:interval=600,browsers=2,search_seconds=12 (repeatable)')
+    parser.add_argument('--json', help='also write the report to this file')
+    parser.add_argument('--keep', action='store_true', help="keep each policy's scratch directory (logs, database)")
+
+    args = parser.parse_args()
+
+    if args.events:
+        with open(args.events, 'r') as f:
+            stream = json.load(f)
+    else:
+        stream = generate_events(args.courses, args.days, args.openings_per_day, args.mean_open_minutes, args.seed)
+    if args.save_events:
+        with open(args.save_events, 'w') as f:
+            json.dump(stream, f)
+
+    policies = args.policy or DEFAULT_POLICIES
+    print(f"{sum(len(c['events']) for c in stream['courses'])} openings across {len(stream['courses'])} courses "
+          f"over {stream['duration'] / 3600:.0f} simulated hours, {len(policies)} policies\n")
+
+    # One process per policy: the monitor keeps its state in module globals
+    with multiprocessing.get_context('spawn').Pool(min(len(policies), os.cpu_count() or 1)) as pool:
+        reports = pool.starmap(run_policy, [(policy, stream, args.keep) for policy in policies])
+
+    print_report(reports)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+WebReg Monitor - Hot-standby browser
+
+A second WebRegBot that is logged in from the saved cookies and checked
+again every few minutes by a background thread. When the monitor's
+browser breaks, take() hands over the standby at once. The thread then
+builds a fresh standby while the monitor keeps checking. Without this
+the monitor tears the browser down and walks through a full login, and
+no checks run in the meantime.
+
+The standby shares the session cookies of the main browser. It covers a
+crashed, wedged or logged-out browser, but not an expired SSO session.
+That still needs a manual login.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger('webreg.standby')
+
+VALIDATE_INTERVAL = 300  # seconds between checks that the standby is still logged in
+RETRY_INTERVAL = 60  # seconds before trying again after a failed build
+MAX_VALIDATION_AGE = 600  # a standby not validated this recently isn't handed out
+
+class StandbyBrowser:
+    """Keeps one logged-in WebRegBot ready to replace the main one"""
+
+    def __init__(self, make_bot, cookie_file='cookies.json', validate_interval=VALIDATE_INTERVAL):
+        self.make_bot = make_bot
+        self.cookie_file = cookie_file
+        self.validate_interval = validate_interval
+        self.bot = None
+        self.validated_at = None
+        self.state = 'stopped'
+        self.failovers = 0
+        self.last_error = None
+        self._retired = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start building and validating the standby in the background"""
+        if self._thread is not None:
+            return
+        self.state = 'starting'
+        self._thread = threading.Thread(target=self.run, name='webreg-standby', daemon=True)
+        self._thread.start()
+
+    def run(self):
+        while not self._stop.is_set():
+            self.close_retired()
+            try:
+                ok = self.build() if self.bot is None else self.validate()
+            except Exception as e:
+                logger.warning("Standby browser failed: %s", e)
+                self.last_error = str(e)
+                ok = False
+                self.discard()
+            self._wake.wait(self.validate_interval if ok else RETRY_INTERVAL)
+            self._wake.clear()
+
+    def build(self):
+        """Open a browser and log it in from the saved cookies"""
+        self.state = 'starting'
+        bot = self.make_bot()
+        started = time.monotonic()
+        if not bot.login_from_cookies(self.cookie_file):
+            bot.close()
+            self.state = 'failed'
+            self.last_error = 'could not log in from saved cookies'
+            logger.warning("Standby browser could not log in, retrying later")
+            return False
+        with self._lock:
+            self.bot = bot
+            self.validated_at = time.monotonic()
+            self.state = 'ready'
+        logger.info("Standby browser ready", extra={'seconds': round(time.monotonic() - started, 1)})
+        return True
+
+    def validate(self):
+        """Make sure the standby is still logged in, rebuilding it if not"""
+        bot = self.bot
+        if bot is None:
+            return False
+        # Same pass as the keepalive: touch the session without spending check budget.
+        # The main browser already warns about expiry, so this one doesn't.
+        alive = bot.keepalive_once(self.cookie_file, warn_before=0)
+        with self._lock:
+            if self.bot is not bot:
+                # Handed over while we were checking it
+                return True
+            if alive is None:
+                # Skipped (no request budget right now), keep the last verdict
+                return True
+            if alive:
+                self.validated_at = time.monotonic()
+                self.state = 'ready'
+                return True
+        logger.warning("Standby browser logged out, rebuilding")
+        self.discard()
+        return self.build()
+
+    def discard(self):
+        with self._lock:
+            bot, self.bot = self.bot, None
+            self.validated_at = None
+        if bot is not None:
+            try:
+                bot.close()
+            except Exception:
+                pass
+
+    def take(self, retire=None):
+        """Hand over the standby if it's ready (None otherwise). `retire` is the
+        broken main browser, closed in the background so the caller doesn't wait."""
+        with self._lock:
+            bot = self.bot
+            fresh = self.validated_at is not None and time.monotonic() - self.validated_at < MAX_VALIDATION_AGE
+            if bot is None or not fresh:
+                return None
+            self.bot = None
+            self.validated_at = None
+            self.state = 'starting'
+            self.failovers += 1
+            if retire is not None:
+                self._retired.append(retire)
+        # Build the next standby right away
+        self._wake.set()
+        return bot
+
+    def close_retired(self):
+        while self._retired:
+            bot = self._retired.pop()
+            try:
+                bot.close()
+            except Exception as e:
+                logger.debug("Could not close retired browser: %s", e)
+
+    def stop(self):
+        """Stop the thread and close the standby browser"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+        self.discard()
+        self.close_retired()
+        self.state = 'stopped'
+
+    def status(self):
+        """Standby state for the status file"""
+        status = {'state': self.state, 'failovers': self.failovers}
+        if self.validated_at is not None:
+            status['validated_seconds_ago'] = round(time.monotonic() - self.validated_at)
+        if self.last_error and self.state != 'ready':
+            status['last_error'] = self.last_error
+        return status
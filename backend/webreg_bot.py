@@ -4,16 +4,236 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.keys import Keys
+from selenium.common.exceptions import TimeoutException, WebDriverException
 import time
 import json
+import logging
 from datetime import datetime
+import os
 import platform
 import subprocess
+import threading
+
+from monitor_logging import course_logger, setup_logging
+from rate_limiter import RateLimiter
+from seat_parser import (
+    AVAIL_COLUMN, SECTION_COLUMN, TOTAL_COLUMN, TYPE_COLUMN,
+    build_result, can_stop_early, course_code, make_section, parse_targets
+)
+
+logger = logging.getLogger('webreg.bot')
+
+WEBREG_START_URL = "https://act.ucsd.edu/webreg2/start"
+SESSION_FILE = 'session.json'
+SESSION_LIFETIME = 24 * 60 * 60  # WebReg sessions die after about a day
+HEALTH_CACHE_SECONDS = 30
+HEALTH_PROBE_TIMEOUT = 10  # seconds a browser gets to answer probe_session()
+
+# Opens every collapsed group in the results in one call, leaving open ones
+# alone (a click would close them). jqGrid groups go through the grid's own
+# API first. Course headers that load their sections on click and are still
+# closed after that get clicked.
+EXPAND_GROUPS_SCRIPT = """
+    var grid = $('#search-div-b-table');
+    var done = {groups: 0, headers: 0, icons: 0, rows: 0, open: 0};
+    
+    grid.find('tr.jqgroup').each(function() {
+        if ($(this).find('.ui-icon-circlesmall-plus').length) {
+            grid.jqGrid('groupingToggle', this.id);
+            done.groups++;
+        } else if ($(this).find('.ui-icon-circlesmall-minus').length) {
+            done.open++;
+        }
+    });
+    
+    $('[id="search-group-header-id"]').each(function() {
+        var group = $(this).closest('tr.jqgroup');
+        var collapsed = group.length
+            ? group.find('.ui-icon-circlesmall-plus').length > 0
+            : $(this).find('.ui-icon-circlesmall-minus').length === 0 && $(this).attr('aria-expanded') !== 'true';
+        if (collapsed) {
+            this.scrollIntoView(true);
+            this.click();
+            done.headers++;
+        }
+    });
+    
+    if (!done.groups && !done.headers && !done.open) {
+        $('.ui-icon-circlesmall-plus').each(function() { this.click(); done.icons++; });
+    }
+    
+    if (!done.groups && !done.headers && !done.open && !done.icons && !grid.find('td[aria-describedby*="' + arguments[0] + '"]').length) {
+        var row = grid.find('.jqgrow').get(0);
+        if (row) { row.click(); done.rows++; }
+    }
+    return done;
+"""
+
+# True on WebReg's error pages and error dialogs. Only the error page's own URL,
+# title, headings and visible message boxes are read, never the whole body
+# (the footer's "contact us" would match every page).
+ERROR_PAGE_SCRIPT = """
+    var pattern = /\\berror\\b|problem|unavailable|try again later/i;
+    if (/error/i.test(window.location.pathname) || pattern.test(document.title)) return true;
+    var boxes = document.querySelectorAll(
+        'h1, h2, .ui-dialog-content, .ui-state-error, .alert-danger, .error-message, [role="alert"]'
+    );
+    for (var i = 0; i < boxes.length; i++) {
+        if (boxes[i].offsetParent !== null && pattern.test(boxes[i].textContent)) return true;
+    }
+    return false;
+"""
+
+SECTIONS_WAIT = 15  # seconds to wait for expanded sections to show up
+
+def section_rows_settled():
+    """Wait condition: section rows are there and stopped changing since the last poll"""
+    seen = {'count': -1}
+    
+    def settled(driver):
+        count = driver.execute_script(
+            "return document.querySelectorAll('td[aria-describedby*=\"' + arguments[0] + '\"]').length;",
+            AVAIL_COLUMN
+        )
+        stable = count > 0 and count == seen['count']
+        seen['count'] = count
+        return stable
+    
+    return settled
+
+# Reads every section row in one round trip: [avail, total, id, type, group] per row.
+# Given a list of section ids it stops as soon as all of them have been read
+# in the searched course's group (or in rows outside any group).
+SECTION_ROWS_SCRIPT = """
+    var targets = arguments[0];
+    var columns = {avail: arguments[1], total: arguments[2], id: arguments[3], type: arguments[4]};
+    var course = arguments[5];
+    var remaining = {}, left = 0;
+    (targets || []).forEach(function(t) { if (!remaining[t]) { remaining[t] = true; left++; } });
+    
+    function text(row, column) {
+        var cell = row.querySelector('td[aria-describedby*="' + column + '"]');
+        return cell ? cell.textContent : '';
+    }
+    
+    // The group header row above this row, looking out through nested tables
+    function groupOf(row) {
+        for (var r = row; r; r = r.parentNode && r.parentNode.closest('tr')) {
+            for (var p = r.previousElementSibling; p; p = p.previousElementSibling) {
+                if (p.classList.contains('jqgroup')) return p.textContent;
+            }
+        }
+        return '';
+    }
+    
+    var rows = [];
+    var cells = document.querySelectorAll('td[aria-describedby*="' + columns.avail + '"]');
+    for (var i = 0; i < cells.length; i++) {
+        var row = cells[i].parentNode;
+        var total = text(row, columns.total);
+        var id = text(row, columns.id).trim().toUpperCase();
+        var group = groupOf(row);
+        rows.push([cells[i].textContent, total, id, text(row, columns.type), group]);
+        var label = group.replace(/\s+/g, ' ').trim().toUpperCase();
+        var ours = !label || !course || label === course || label.indexOf(course + ' ') === 0;
+        if (left && ours && parseInt(total, 10) > 0 && remaining[id]) {
+            delete remaining[id];
+            if (--left === 0) break;
+        }
+    }
+    return rows;
+"""
+
+CHECK_DEADLINE = 60  # seconds one course check may take in total
+IMPLICIT_WAIT = 10
+PAGE_LOAD_TIMEOUT = 300
+SCRIPT_TIMEOUT = 30
+RESET_TIMEOUT = 20  # seconds to get back to the search page after an aborted check
+
+CHROMEDRIVER_CACHE_FILE = 'chromedriver_cache.json'
+CHROMEDRIVER_CACHE_MAX_AGE = 7 * 24 * 60 * 60
+
+def resolve_chromedriver(refresh=False):
+    """Path to chromedriver, from the local cache when it's still good.
+    Returns None to let Selenium's own manager find one (offline mode)."""
+    explicit = os.environ.get('CHROMEDRIVER_PATH')
+    if explicit:
+        return explicit
+    
+    offline = os.environ.get('WEBREG_OFFLINE') == '1'
+    
+    if not refresh:
+        try:
+            with open(CHROMEDRIVER_CACHE_FILE, 'r') as f:
+                cached = json.load(f)
+            path = cached['path']
+            fresh = time.time() - cached['resolved_at'] < CHROMEDRIVER_CACHE_MAX_AGE
+            if os.path.isfile(path) and os.access(path, os.X_OK) and (fresh or offline):
+                return path
+        except (OSError, ValueError, KeyError):
+            pass
+    
+    if offline:
+        # Selenium Manager works from its own on-disk cache without the network
+        return None
+    
+    # Only import (and possibly hit the network) when the cache can't answer
+    from webdriver_manager.chrome import ChromeDriverManager
+    
+    path = ChromeDriverManager().install()
+    try:
+        with open(CHROMEDRIVER_CACHE_FILE, 'w') as f:
+            json.dump({'path': path, 'resolved_at': time.time()}, f)
+    except OSError:
+        pass
+    return path
+
+class CheckTimeout(Exception):
+    """A course check ran past its deadline"""
+
+def forget_chromedriver():
+    """Drop the cached chromedriver path (e.g. after a Chrome update)"""
+    try:
+        os.remove(CHROMEDRIVER_CACHE_FILE)
+    except OSError:
+        pass
 
 class WebRegBot:
-    def __init__(self, headless=False):
+    def __init__(self, headless=False, limiter=None):
+        self.headless = headless
+        
+        # Every page load against WebReg goes through the shared limiter
+        self.limiter = limiter or RateLimiter()
+        self.last_search = {}
+        
+        # Each check gets a hard time budget, waits inside it are capped to what's left
+        self.check_deadline = CHECK_DEADLINE
+        self.check_timeouts = 0
+        self._deadline = None
+        self._driver_bound = None
+        self.home_url = None
+        
+        self.start_driver()
+        
+        # Only one thing drives the browser at a time (checks vs keepalive)
+        self._driver_lock = threading.RLock()
+        self._health = None  # (checked_at, verdict)
+        self._keepalive_stop = None
+        self.session_started_at = None
+        
+        # Set to a replay.PageRecorder to archive every results page
+        self.recorder = None
+        
+        # Chrome grows with every search, these decide when to recycle it
+        self.checks_served = 0
+        self.checks_since_tab = 0
+        self.checks_since_driver = 0
+        self.tab_recycles = 0
+        self.driver_recycles = 0
+    
+    def start_driver(self):
+        """Launch Chrome with our options"""
         options = webdriver.ChromeOptions()
         
         # Anti-detection options
@@ -33,13 +253,20 @@ class WebRegBot:
         # Set a realistic user agent
         options.add_argument('user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
         
-        if headless:
+        if self.headless:
             options.add_argument('--headless')
         
-        self.driver = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()),
-            options=options
-        )
+        started = time.perf_counter()
+        driver_path = resolve_chromedriver()
+        try:
+            self.driver = webdriver.Chrome(service=Service(driver_path), options=options)
+        except WebDriverException as e:
+            if driver_path is None or os.environ.get('CHROMEDRIVER_PATH'):
+                raise
+            # Chrome probably updated past the cached driver - resolve again once
+            logger.warning("Cached chromedriver failed, resolving again: %s", e)
+            forget_chromedriver()
+            self.driver = webdriver.Chrome(service=Service(resolve_chromedriver(refresh=True)), options=options)
         
         # Additional anti-detection via JavaScript
         self.driver.execute_cdp_cmd('Network.setUserAgentOverride', {
@@ -47,15 +274,18 @@ class WebRegBot:
         })
         self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         
-        self.driver.implicitly_wait(10)
+        self.driver.implicitly_wait(IMPLICIT_WAIT)
         self.wait = WebDriverWait(self.driver, 30)
+        self.driver_started_at = time.time()
+        self.driver_start_seconds = time.perf_counter() - started
+        logger.info("Browser started", extra={'seconds': round(self.driver_start_seconds, 2)})
     
     def load_cookies(self, cookie_file='cookies.json'):
         try:
             with open(cookie_file, 'r') as f:
                 cookies = json.load(f)
             
-            self.driver.get("https://act.ucsd.edu/webreg2/start")
+            self.open_start_page()
             time.sleep(3)
             
             for cookie in cookies:
@@ -74,10 +304,151 @@ class WebRegBot:
     
     def save_cookies(self, cookie_file='cookies.json'):
         cookies = self.driver.get_cookies()
-        with open(cookie_file, 'w') as f:
+        tmp_file = cookie_file + '.tmp'
+        with open(tmp_file, 'w') as f:
             json.dump(cookies, f, indent=4)
+        os.replace(tmp_file, cookie_file)
         print(f"[OK] Cookies saved")
     
+    def mark_session_started(self):
+        """Remember when the current WebReg session was created by a real login"""
+        self.session_started_at = time.time()
+        try:
+            with open(SESSION_FILE, 'w') as f:
+                json.dump({'started_at': self.session_started_at}, f)
+        except:
+            pass
+    
+    def load_session_started(self):
+        """Restore the session start time saved by a previous login"""
+        try:
+            with open(SESSION_FILE, 'r') as f:
+                self.session_started_at = json.load(f)['started_at']
+        except:
+            self.session_started_at = time.time()
+    
+    def session_time_left(self):
+        """Seconds until the session is expected to expire (None if unknown)"""
+        if self.session_started_at is None:
+            return None
+        return self.session_started_at + SESSION_LIFETIME - time.time()
+    
+    def open_page(self, url):
+        """Load a WebReg page once the rate limiter allows it.
+        Within a check both the wait and the load are capped to the time left."""
+        if self._deadline is None:
+            self.limiter.acquire()
+        else:
+            try:
+                self.limiter.acquire(timeout=self.time_left())
+            except TimeoutError as e:
+                raise CheckTimeout(str(e))
+            self.bound_driver()
+        self.driver.get(url)
+    
+    def open_start_page(self):
+        self.open_page(WEBREG_START_URL)
+    
+    def page_has_error(self):
+        """Check if WebReg served one of its error pages"""
+        try:
+            return bool(self.driver.execute_script(ERROR_PAGE_SCRIPT))
+        except:
+            return False
+    
+    def find_now(self, by, value):
+        """find_elements without waiting on the implicit wait"""
+        self.driver.implicitly_wait(0)
+        try:
+            return self.driver.find_elements(by, value)
+        finally:
+            self.driver.implicitly_wait(IMPLICIT_WAIT)
+    
+    def time_left(self):
+        """Seconds left before the current check's deadline (inf outside a check)"""
+        if self._deadline is None:
+            return float('inf')
+        return max(0.0, self._deadline - time.monotonic())
+    
+    def bound_driver(self):
+        """Cap page loads and scripts (and so clicks that navigate) to the time left for this check"""
+        if self._deadline is None:
+            return
+        left = self.time_left()
+        if left <= 0:
+            raise CheckTimeout('deadline reached')
+        # Only tighten when it matters, each call is a WebDriver round trip
+        if self._driver_bound is None or self._driver_bound - left > 1:
+            self.driver.set_page_load_timeout(left)
+            self.driver.set_script_timeout(left)
+            self._driver_bound = left
+    
+    def unbound_driver(self):
+        """Back to the normal page load and script timeouts after a check"""
+        if self._driver_bound is None:
+            return
+        self._driver_bound = None
+        try:
+            self.driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+            self.driver.set_script_timeout(SCRIPT_TIMEOUT)
+        except Exception as e:
+            logger.debug("Could not restore driver timeouts: %s", e)
+    
+    def pause(self, seconds):
+        """time.sleep that never runs past the check deadline"""
+        left = self.time_left()
+        time.sleep(min(seconds, left))
+        if seconds >= left:
+            raise CheckTimeout(f'deadline reached while waiting {seconds}s')
+        self.bound_driver()
+    
+    def wait_until(self, condition, timeout):
+        """WebDriverWait capped to the time left for this check"""
+        self.bound_driver()
+        left = self.time_left()
+        try:
+            return WebDriverWait(self.driver, min(timeout, left)).until(condition)
+        except TimeoutException:
+            if timeout >= left:
+                raise CheckTimeout('deadline reached while waiting for the page')
+            raise
+    
+    def find_in_time(self, by, value, many=False):
+        """find_element(s) whose implicit wait can't outlast the check deadline"""
+        self.bound_driver()
+        left = self.time_left()
+        self.driver.implicitly_wait(min(IMPLICIT_WAIT, left))
+        try:
+            if many:
+                return self.driver.find_elements(by, value)
+            return self.driver.find_element(by, value)
+        finally:
+            self.driver.implicitly_wait(IMPLICIT_WAIT)
+    
+    def reset_page(self):
+        """Put the browser back on the search page after an aborted check"""
+        self._health = None
+        try:
+            # The whole reset, rate limit wait included, gets one RESET_TIMEOUT budget
+            self._deadline = time.monotonic() + RESET_TIMEOUT
+            try:
+                self.bound_driver()
+                self.driver.execute_script('window.stop();')
+                self.open_page(self.home_url or WEBREG_START_URL)
+            finally:
+                self._deadline = None
+                self.unbound_driver()
+        except CheckTimeout as e:
+            # No request budget to reload in time, the next check starts from wherever the tab is
+            logger.warning("Skipped reset after timeout: %s", e)
+        except Exception as e:
+            # The tab itself is wedged, a new one shares the session cookies
+            logger.warning("Reset after timeout failed, opening a fresh tab: %s", e)
+            try:
+                self.recycle_tab()
+            except Exception as e:
+                logger.error("Could not recover the browser: %s", e)
+    
     def is_logged_in(self):
         """Check if we're on the main WebReg page"""
         try:
@@ -88,16 +459,110 @@ class WebRegBot:
                 return True
             
             # Check if we can see the search box (also means logged in)
-            try:
-                self.driver.find_element(By.ID, 'search-div-t-t1-i1')
+            if self.find_now(By.ID, 'search-div-t-t1-i1'):
                 return True
-            except:
-                pass
             
             return False
         except:
             return False
     
+    def probe_session(self, timeout=HEALTH_PROBE_TIMEOUT):
+        """Fresh logged-in check that never waits more than `timeout` seconds.
+        A browser that doesn't answer in time counts as logged out."""
+        verdict = []
+        # A wedged browser can hold a WebDriver call indefinitely, so only the thread waits on it
+        probe = threading.Thread(target=lambda: verdict.append(self.is_logged_in()), name='webreg-probe', daemon=True)
+        probe.start()
+        probe.join(timeout)
+        alive = bool(verdict and verdict[0])
+        if not verdict:
+            logger.warning("Browser did not answer the health probe", extra={'timeout': timeout})
+        self.set_health(alive)
+        return alive
+    
+    def set_health(self, verdict):
+        """Record a fresh session health verdict"""
+        self._health = (time.monotonic(), verdict)
+    
+    def check_session_health(self, max_age=HEALTH_CACHE_SECONDS):
+        """Cheap logged-in check, reuses a recent verdict instead of probing"""
+        if self._health is not None:
+            checked_at, verdict = self._health
+            if verdict and time.monotonic() - checked_at < max_age:
+                return True
+        
+        verdict = self.is_logged_in()
+        self.set_health(verdict)
+        return verdict
+    
+    def touch_session(self):
+        """Make a background request so WebReg sees activity, returns True if still logged in"""
+        self.driver.set_script_timeout(15)
+        try:
+            status, final_url = self.driver.execute_async_script("""
+                var done = arguments[arguments.length - 1];
+                fetch(window.location.href, {credentials: 'same-origin', cache: 'no-store'})
+                    .then(function(r) { done([r.status, r.url]); })
+                    .catch(function() { done([0, '']); });
+            """)
+        finally:
+            # The checks run their own scripts and expect the normal timeout
+            self.driver.set_script_timeout(SCRIPT_TIMEOUT)
+        
+        if status != 200 or any(x in final_url for x in ['sso.ucsd.edu', 'login.ucsd.edu', 'SAML2']):
+            return False
+        return self.is_logged_in()
+    
+    def keepalive_once(self, cookie_file='cookies.json', on_expiry_warning=None, warn_before=3600):
+        """One keepalive pass: touch the session, renew cookies, warn near expiry"""
+        # Never make a check wait on the keepalive
+        if not self._driver_lock.acquire(blocking=False):
+            return None
+        try:
+            # Nor spend request budget the checks need
+            if self.limiter.try_acquire():
+                return None
+            alive = self.touch_session()
+            self.set_health(alive)
+            if alive:
+                self.save_cookies(cookie_file)
+        except Exception as e:
+            logger.warning("Keepalive failed: %s", e)
+            alive = False
+            self.set_health(False)
+        finally:
+            self._driver_lock.release()
+        
+        time_left = self.session_time_left()
+        if time_left is not None and time_left < warn_before:
+            logger.warning(
+                "WebReg session expires soon - log in again",
+                extra={'minutes_left': max(0, int(time_left)) // 60}
+            )
+            if on_expiry_warning:
+                on_expiry_warning(time_left)
+        
+        if not alive:
+            logger.warning("Keepalive: session looks logged out")
+        return alive
+    
+    def start_keepalive(self, interval=600, cookie_file='cookies.json', on_expiry_warning=None, warn_before=3600):
+        """Touch the session every `interval` seconds from a background thread"""
+        self.stop_keepalive()
+        stop_event = threading.Event()
+        
+        def run():
+            while not stop_event.wait(interval):
+                self.keepalive_once(cookie_file, on_expiry_warning, warn_before)
+        
+        threading.Thread(target=run, name='webreg-keepalive', daemon=True).start()
+        self._keepalive_stop = stop_event
+    
+    def stop_keepalive(self):
+        if self._keepalive_stop:
+            self._keepalive_stop.set()
+            self._keepalive_stop = None
+    
     def is_on_login_page(self):
         """Check if we're stuck on the login/SSO page"""
         try:
@@ -198,9 +663,12 @@ class WebRegBot:
         print("LOGIN TO WEBREG")
         print("="*60)
         
+        self._health = None
+        
         if use_cookies and self.load_cookies():
+            self.load_session_started()
             print("[NAVIGATE] Going to WebReg...")
-            self.driver.get("https://act.ucsd.edu/webreg2/start")
+            self.open_start_page()
             time.sleep(6)  # Longer initial wait
             
             current_url = self.driver.current_url
@@ -222,6 +690,7 @@ class WebRegBot:
                 
                 input("Press Enter when you're on the Course Enrollment page...")
                 self.save_cookies()
+                self.mark_session_started()
                 
                 if self.is_logged_in():
                     print("[SUCCESS] Logged in!")
@@ -253,17 +722,14 @@ class WebRegBot:
                         return True
                     
                     # Check for error message
-                    try:
-                        body_text = self.driver.find_element(By.TAG_NAME, 'body').text.lower()
-                        if 'contact' in body_text or 'error' in body_text or 'problem' in body_text:
-                            print(f"[WARNING] Error detected on page")
-                            if attempt < max_retries - 1:
-                                print("[INFO] Refreshing page and retrying...")
-                                self.driver.get("https://act.ucsd.edu/webreg2/start")
-                                time.sleep(5)
-                                continue
-                    except:
-                        pass
+                    if self.page_has_error():
+                        print(f"[WARNING] Error detected on page")
+                        self.limiter.report(ok=False)
+                        if attempt < max_retries - 1:
+                            print("[INFO] Refreshing page and retrying...")
+                            self.open_start_page()
+                            time.sleep(5)
+                            continue
             
             # All automatic attempts failed - manual intervention
             print("\n" + "="*60)
@@ -280,6 +746,7 @@ class WebRegBot:
             input("Press Enter when you're on the Course Enrollment page...")
             
             self.save_cookies()
+            self.mark_session_started()
             
             if self.is_logged_in():
                 print("[SUCCESS] You're logged in!")
@@ -291,7 +758,7 @@ class WebRegBot:
         else:
             # No cookies - full manual login
             print("[LOGIN] No cookies found - opening login page...")
-            self.driver.get("https://act.ucsd.edu/webreg2/start")
+            self.open_start_page()
             
             print("\n" + "="*60)
             print("FIRST TIME LOGIN")
@@ -306,216 +773,253 @@ class WebRegBot:
             
             input("Press Enter when you're on the Course Enrollment page...")
             self.save_cookies()
+            self.mark_session_started()
             print("[SUCCESS] Login complete!")
             return True
     
-    def search_course(self, subject, course_num):
+    def login_from_cookies(self, cookie_file='cookies.json'):
+        """Log in with saved cookies and the automatic Go button only, never prompting.
+        Used for the standby browser. Returns True if it ended up logged in."""
+        self._health = None
+        with self._driver_lock:
+            if not self.load_cookies(cookie_file):
+                return False
+            self.load_session_started()
+            self.open_start_page()
+            time.sleep(6)
+            
+            if self.is_on_login_page():
+                logger.info("Saved cookies no longer log in")
+                self.set_health(False)
+                return False
+            
+            if not self.is_logged_in() and self.click_go_button_auto():
+                time.sleep(4)
+            
+            logged_in = self.is_logged_in()
+            self.set_health(logged_in)
+            return logged_in
+    
+    def search_course(self, subject, course_num, sections=None, deadline=None):
+        """Search for a course and parse its seats (only `sections` count if given).
+        Gives up after `deadline` seconds (default self.check_deadline) and returns None."""
+        deadline = deadline or self.check_deadline
+        started = time.monotonic()
+        self.last_search = {}
+        log = course_logger(logger, subject, course_num)
+        
+        if not self._driver_lock.acquire(timeout=deadline):
+            self.last_search['timeout'] = True
+            self.check_timeouts += 1
+            log.warning("Check timed out waiting for the browser", extra={'deadline': deadline})
+            return None
+        
+        try:
+            self._deadline = started + deadline
+            try:
+                try:
+                    self.limiter.acquire(timeout=self.time_left())
+                except TimeoutError as e:
+                    raise CheckTimeout(str(e))
+                result = self._search_course(subject, course_num, parse_targets(sections))
+            except CheckTimeout as e:
+                result = None
+                self.last_search['timeout'] = True
+                self.check_timeouts += 1
+                log.warning(
+                    "Check timed out: %s", e,
+                    extra={'deadline': deadline, 'seconds': round(time.monotonic() - started, 1)}
+                )
+            finally:
+                self._deadline = None
+                self.unbound_driver()
+            
+            # Tell the limiter how WebReg coped (a course with no results is not its fault)
+            if self.last_search.get('timeout'):
+                self.reset_page()
+                self.limiter.report(ok=False)
+            elif self.last_search.get('error_page'):
+                self.limiter.report(ok=False)
+            elif 'load_seconds' in self.last_search:
+                self.limiter.report(ok=True, seconds=self.last_search['load_seconds'])
+            
+            self.checks_served += 1
+            self.checks_since_tab += 1
+            self.checks_since_driver += 1
+        finally:
+            self._driver_lock.release()
+        
+        # A parsed result is proof the session is alive
+        if result:
+            self.set_health(True)
+        return result
+    
+    def _search_course(self, subject, course_num, targets=None):
+        log = course_logger(logger, subject, course_num)
         try:
-            if not self.is_logged_in():
-                print("[ERROR] Not logged in!")
+            if not self.check_session_health():
+                log.error("Not logged in")
                 return None
             
+            # Where to come back to if a check has to be aborted
+            self.home_url = self.driver.current_url
+            
             search_query = f"{subject} {course_num}"
-            print(f"\n[SEARCH] Searching for: {search_query}")
+            log.debug("Searching")
             
             # Click search box
-            containers = self.driver.find_elements(By.CSS_SELECTOR, '[id^="s2id_search"]')
+            containers = self.find_in_time(By.CSS_SELECTOR, '[id^="s2id_search"]', many=True)
             for c in containers:
                 if c.is_displayed():
                     c.click()
                     break
-            time.sleep(0.5)
+            self.pause(0.5)
             
             # Type
-            search_input = self.wait.until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, '.select2-input'))
+            search_input = self.wait_until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, '.select2-input')), 30
             )
             search_input.clear()
-            time.sleep(0.2)
+            self.pause(0.2)
             search_input.send_keys(search_query)
-            time.sleep(2)
+            self.pause(2)
             
             # Select
             search_input.send_keys(Keys.RETURN)
-            time.sleep(1)
+            self.pause(1)
             
             # Search
-            search_btn = self.driver.find_element(By.ID, 'search-div-t-b1')
+            search_btn = self.find_in_time(By.ID, 'search-div-t-b1')
             search_btn.click()
-            time.sleep(1)
+            clicked_at = time.perf_counter()
+            self.pause(1)
             
             # Wait for results
-            print("[WAIT] Waiting for results...")
+            log.debug("Waiting for results")
             for i in range(15):
-                time.sleep(1)
+                self.pause(1)
                 rows = self.driver.execute_script("return $('#search-div-b-table .jqgrow').length;")
                 if rows > 0:
-                    print(f"[SUCCESS] Found {rows} result(s)")
-                    time.sleep(2)
+                    self.last_search['load_seconds'] = time.perf_counter() - clicked_at
+                    log.debug("Results loaded", extra={'rows': rows})
                     break
             
             if rows == 0:
-                print("[WARNING] No results")
+                if self.page_has_error():
+                    self.last_search['error_page'] = True
+                    log.warning("WebReg returned an error page")
+                else:
+                    self.last_search['no_results'] = True
+                    log.warning("No results")
                 return None
             
-            # EXPAND - click the course header!
-            print("\n[EXPAND] Looking for course header to click...")
-            
-            expanded = False
+            # EXPAND - open every result group at once, then wait once for the sections
+            log.debug("Expanding result groups")
+            expanded = self.driver.execute_script(EXPAND_GROUPS_SCRIPT, AVAIL_COLUMN)
+            log.debug("Expand requested", extra=expanded)
             
-            # Method 1: Click the nested table with the course name
             try:
-                course_header = self.driver.find_element(By.ID, 'search-group-header-id')
-                print("[EXPAND] Found course header table")
-                
-                # Scroll into view
-                self.driver.execute_script("arguments[0].scrollIntoView(true);", course_header)
-                time.sleep(0.5)
-                
-                # Click it
-                try:
-                    course_header.click()
-                    print("[OK] Clicked course header!")
-                    expanded = True
-                except:
-                    self.driver.execute_script("arguments[0].click();", course_header)
-                    print("[OK] JS clicked course header!")
-                    expanded = True
-                
-                time.sleep(4)
-                
-            except Exception as e:
-                print(f"[TRY 1 FAILED] {e}")
-            
-            # Method 2: Click the expand icon/button
-            if not expanded:
-                try:
-                    print("[EXPAND] Looking for expand icon...")
-                    expand_icon = self.driver.find_element(By.CSS_SELECTOR, '.ui-icon-circlesmall-plus')
-                    expand_icon.click()
-                    print("[OK] Clicked expand icon!")
-                    expanded = True
-                    time.sleep(4)
-                except Exception as e:
-                    print(f"[TRY 2 FAILED] {e}")
-            
-            # Method 3: Click the row
-            if not expanded:
-                try:
-                    print("[EXPAND] Clicking first row...")
-                    rows_elements = self.driver.find_elements(By.CSS_SELECTOR, '#search-div-b-table .jqgrow')
-                    if rows_elements:
-                        self.driver.execute_script("arguments[0].click();", rows_elements[0])
-                        print("[OK] Clicked row!")
-                        expanded = True
-                        time.sleep(4)
-                except Exception as e:
-                    print(f"[TRY 3 FAILED] {e}")
-            
-            if not expanded:
-                print("[WARNING] Could not expand course!")
+                self.wait_until(section_rows_settled(), SECTIONS_WAIT)
+            except TimeoutException:
+                log.warning("Could not expand course")
             
             # Save debug
-            self.save_debug('results.html')
+            page_source = self.driver.page_source
+            self.save_debug('results.html', page_source)
             self.driver.save_screenshot('results.png')
             
             # Parse using the correct method
-            print("\n[PARSE] Parsing seat data...")
-            seats_info = self.parse_results_from_table()
+            seats_info = self.parse_results_from_table(log, targets, search_query)
+            
+            # Keep the page and what we made of it for offline replay
+            if self.recorder:
+                try:
+                    self.recorder.record(subject, course_num, page_source, seats_info, targets)
+                except Exception as e:
+                    log.warning("Could not record page: %s", e)
             
             return seats_info
-                
+        
+        except CheckTimeout:
+            raise
         except Exception as e:
-            print(f"[ERROR] Search failed: {e}")
-            import traceback
-            traceback.print_exc()
+            # A page load or script cut short by bound_driver() is the deadline's doing
+            if self.time_left() < 1:
+                raise CheckTimeout(f'deadline reached during a browser call ({type(e).__name__})')
+            log.exception("Search failed: %s", e)
             return None
     
-    def parse_results_from_table(self):
+    def parse_results_from_table(self, log=None, targets=None, course=None):
         """
-        Parse seat data from table cells with aria-describedby attributes
+        Parse seat data from table cells with aria-describedby attributes.
+        With targets, stops once the targeted section ids have been read.
+        Seats are counted for `course` ('CSE 100') when the search matched several.
         """
+        log = log or logger
         try:
-            # Find cells with available seats - "AVAIL_SEAT"
-            avail_cells = self.driver.find_elements(
-                By.CSS_SELECTOR, 
-                'td[aria-describedby*="AVAIL_SEAT"]'
+            # One script call instead of a WebDriver round trip per cell
+            rows = self.driver.execute_script(
+                SECTION_ROWS_SCRIPT,
+                targets if can_stop_early(targets) else None,
+                AVAIL_COLUMN, TOTAL_COLUMN, SECTION_COLUMN, TYPE_COLUMN, course_code(course)
             )
             
-            # Find cells with total seats - "SCTN_CPCTY_QTY" (Section Capacity Quantity)
-            total_cells = self.driver.find_elements(
-                By.CSS_SELECTOR,
-                'td[aria-describedby*="SCTN_CPCTY_QTY"]'
-            )
-            
-            print(f"[OK] Found {len(avail_cells)} available seat cells")
-            print(f"[OK] Found {len(total_cells)} total seat cells")
+            log.debug("Found seat rows", extra={'rows': len(rows)})
             
-            if len(avail_cells) == 0 or len(total_cells) == 0:
-                print("[WARNING] No seat cells found - might not be expanded?")
+            if not rows:
+                log.warning("No seat cells found - might not be expanded?")
                 return None
             
             # Extract the numbers
             sections = []
-            for i in range(min(len(avail_cells), len(total_cells))):
-                try:
-                    avail_text = avail_cells[i].text.strip()
-                    total_text = total_cells[i].text.strip()
-                    
-                    # Convert to int
-                    available = int(avail_text) if avail_text.isdigit() else 0
-                    total = int(total_text) if total_text.isdigit() else 0
+            for i, (avail_text, total_text, section_id, section_type, group) in enumerate(rows):
+                section = make_section(avail_text, total_text, section_id, section_type, group)
+                
+                if section:  # Valid section
+                    sections.append(section)
                     
-                    if total > 0:  # Valid section
-                        section = {
-                            'available': available,
-                            'total': total,
-                            'full': available == 0
-                        }
-                        sections.append(section)
-                        
-                        print(f"  Section {i+1}: {available}/{total} seats")
-                        
-                except Exception as e:
-                    print(f"  [SKIP] Section {i+1}: {e}")
-                    continue
+                    if log.isEnabledFor(logging.DEBUG):
+                        log.debug(
+                            "Section %s: %d/%d seats", section.get('id', i + 1), section['available'], section['total'],
+                            extra={'sample': True}
+                        )
             
-            if not sections:
-                print("[ERROR] No valid sections found")
+            result = build_result(sections, targets, course)
+            if not result:
+                log.error("No valid sections found")
                 return None
             
-            # The first section is usually the main lecture
-            main = sections[0]
+            main = result['main_section']
+            total_available = result['total_available']
             
-            # Check if ANY section has availability (not just main)
-            any_available = any(s['available'] > 0 for s in sections)
-            total_available = sum(s['available'] for s in sections)
+            if result.get('missing_targets'):
+                log.warning("Watched sections not found", extra={'missing': ','.join(result['missing_targets'])})
             
-            result = {
-                'timestamp': datetime.now().isoformat(),
-                'sections': sections,
-                'main_section': main,
-                'total_sections': len(sections),
-                'total_available': total_available,
-                'has_availability': any_available  # True if ANY section has seats
-            }
-            
-            print(f"\n[SUMMARY] Main section: {main['available']}/{main['total']} seats")
-            print(f"[SUMMARY] Total available: {total_available} seats across all sections")
+            log.info(
+                "Parsed seats",
+                extra={
+                    'main': f"{main['available']}/{main['total']}",
+                    'available': total_available,
+                    'sections': len(sections),
+                    'groups': len(result.get('groups', {})) or 1,
+                    **({'group': result['group']} if 'group' in result else {}),
+                    **({'watched': len(result['watched_sections'])} if targets else {})
+                }
+            )
             
             return result
             
         except Exception as e:
-            print(f"[ERROR] Parse failed: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("Parse failed: %s", e)
             return None
     
-    def save_debug(self, filename):
+    def save_debug(self, filename, page_source=None):
         try:
+            if page_source is None:
+                page_source = self.driver.page_source
             with open(filename, 'w', encoding='utf-8') as f:
-                f.write(self.driver.page_source)
-            print(f"[SAVE] Saved to {filename}")
+                f.write(page_source)
+            logger.debug("Saved page source", extra={'file': filename})
         except:
             pass
     
@@ -595,7 +1099,118 @@ class WebRegBot:
         except KeyboardInterrupt:
             print("\n\n[STOP] Stopped")
     
+    def browser_rss_mb(self):
+        """Resident memory of chromedriver plus every Chrome process under it (MB)"""
+        try:
+            import psutil
+            
+            root = psutil.Process(self.driver.service.process.pid)
+            total = 0
+            for process in [root] + root.children(recursive=True):
+                try:
+                    total += process.memory_info().rss
+                except psutil.Error:
+                    pass
+            return total / (1024 * 1024)
+        except Exception:
+            return None
+    
+    def memory_status(self):
+        """Browser memory and recycling counters for the status file"""
+        rss = self.browser_rss_mb()
+        return {
+            'browser_rss_mb': round(rss, 1) if rss is not None else None,
+            'checks_served': self.checks_served,
+            'checks_since_recycle': self.checks_since_driver,
+            'tab_recycles': self.tab_recycles,
+            'driver_recycles': self.driver_recycles,
+            'driver_age_seconds': int(time.time() - self.driver_started_at)
+        }
+    
+    def recycle_tab(self):
+        """Reopen the current page in a fresh tab and close the old one"""
+        with self._driver_lock:
+            url = self.driver.current_url
+            old_handle = self.driver.current_window_handle
+            
+            # The new tab shares the browser's cookies, so it stays logged in
+            self.driver.switch_to.new_window('tab')
+            new_handle = self.driver.current_window_handle
+            self.driver.switch_to.window(old_handle)
+            self.driver.close()
+            self.driver.switch_to.window(new_handle)
+            self.open_page(url)
+            
+            self.checks_since_tab = 0
+            self.tab_recycles += 1
+            self._health = None
+            logger.info("Recycled browser tab", extra={'tab_recycles': self.tab_recycles})
+            return self.check_session_health()
+    
+    def recycle_driver(self):
+        """Restart Chrome, carrying the logged-in session over through its cookies"""
+        with self._driver_lock:
+            url = self.driver.current_url
+            cookies = self.driver.get_cookies()
+            
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.start_driver()
+            
+            # Cookies can only be set on their own domain
+            self.open_start_page()
+            for cookie in cookies:
+                try:
+                    cookie.pop('expiry', None)
+                    self.driver.add_cookie(cookie)
+                except Exception:
+                    pass
+            self.open_page(url)
+            
+            self.checks_since_tab = 0
+            self.checks_since_driver = 0
+            self.driver_recycles += 1
+            self._health = None
+            
+            logged_in = self.check_session_health()
+            if not logged_in:
+                # Same recovery as a cookie login, minus the prompts
+                self.click_go_button_auto()
+                logged_in = self.check_session_health()
+            
+            logger.info(
+                "Recycled browser",
+                extra={'driver_recycles': self.driver_recycles, 'logged_in': logged_in}
+            )
+            return logged_in
+    
+    def maybe_recycle(self, max_rss_mb=1500, tab_max_checks=50, driver_max_checks=500):
+        """Recycle the tab or the whole browser once it has grown past the limits.
+        Returns 'tab', 'driver' or None."""
+        if driver_max_checks and self.checks_since_driver >= driver_max_checks:
+            self.recycle_driver()
+            return 'driver'
+        
+        rss = self.browser_rss_mb()
+        if max_rss_mb and rss is not None and rss > max_rss_mb:
+            # A new tab frees the renderer, only restart Chrome if that wasn't enough
+            self.recycle_tab()
+            rss = self.browser_rss_mb()
+            if rss is not None and rss > max_rss_mb:
+                self.recycle_driver()
+                return 'driver'
+            return 'tab'
+        
+        if tab_max_checks and self.checks_since_tab >= tab_max_checks:
+            self.recycle_tab()
+            return 'tab'
+        
+        return None
+    
     def close(self):
+        self.stop_keepalive()
         try:
             self.driver.quit()
             print("\n[CLOSE] Browser closed")
@@ -603,6 +1218,7 @@ class WebRegBot:
             pass
 
 if __name__ == "__main__":
+    setup_logging(level='DEBUG', console_level='INFO')
     bot = WebRegBot(headless=False)
     
     try:
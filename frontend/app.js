@@ -0,0 +1,515 @@
+// Same-origin when api.py serves this page, the separate API port otherwise
+const API_URL = document.querySelector('meta[name="api-url"]').content;
+let editingCourseId = null;
+let monitorRunning = false;
+
+// Show notification
+function showNotification(message, type = 'success') {
+    const notification = document.getElementById('notification');
+    const messageEl = document.getElementById('notificationMessage');
+    messageEl.textContent = message;
+    notification.style.background = type === 'success' ? '#4caf50' : '#f44336';
+    notification.style.color = 'white';
+    notification.classList.add('show');
+    setTimeout(() => notification.classList.remove('show'), 3000);
+}
+
+// Load stats
+async function loadStats() {
+    try {
+        const response = await fetch(`${API_URL}/stats`);
+        const stats = await response.json();
+        document.getElementById('stat-courses').textContent = stats.total_courses;
+        document.getElementById('stat-notifications').textContent = stats.total_notifications;
+        document.getElementById('stat-checks').textContent = stats.total_checks;
+    } catch (error) {
+        console.error('Error loading stats:', error);
+    }
+}
+
+// Load monitor status
+async function loadMonitorStatus() {
+    try {
+        const response = await fetch(`${API_URL}/monitor/status`);
+        const status = await response.json();
+        
+        console.log('Monitor status:', status);
+        monitorRunning = status.running;
+        
+        const statusEl = document.getElementById('monitorStatus');
+        const startBtn = document.getElementById('startBtn');
+        const stopBtn = document.getElementById('stopBtn');
+        
+        if (status.running) {
+            const memory = status.memory && status.memory.browser_rss_mb != null
+                ? ` · Chrome ${Math.round(status.memory.browser_rss_mb)} MB`
+                : '';
+            statusEl.textContent = `✅ ${status.message || 'Monitor running'}${memory}`;
+            startBtn.style.display = 'none';
+            stopBtn.style.display = 'block';
+            console.log('Showing STOP button');
+        } else {
+            statusEl.textContent = `⏹️ ${status.message || 'Monitor stopped'}`;
+            startBtn.style.display = 'block';
+            stopBtn.style.display = 'none';
+            console.log('Showing START button');
+        }
+    } catch (error) {
+        console.error('Error loading monitor status:', error);
+    }
+}
+
+// Start monitor
+async function startMonitor() {
+    const interval = document.getElementById('intervalSelect').value;
+    
+    try {
+        showNotification('Starting monitor...', 'success');
+        const response = await fetch(`${API_URL}/monitor/start`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ interval: parseInt(interval) })
+        });
+        
+        const data = await response.json();
+        
+        if (response.ok) {
+            showNotification(data.message, 'success');
+            setTimeout(loadMonitorStatus, 2000);
+        } else {
+            showNotification(data.error || 'Failed to start', 'error');
+        }
+    } catch (error) {
+        showNotification('Error starting monitor', 'error');
+    }
+}
+
+// Stop monitor
+async function stopMonitor() {
+    try {
+        showNotification('Stopping monitor...', 'success');
+        const response = await fetch(`${API_URL}/monitor/stop`, { method: 'POST' });
+        const data = await response.json();
+        
+        showNotification(data.message, 'success');
+        setTimeout(loadMonitorStatus, 2000);
+    } catch (error) {
+        showNotification('Error stopping monitor', 'error');
+    }
+}
+
+// Course list state, patched from /courses?since=<version>
+const VIRTUAL_THRESHOLD = 100;  // courses before the list is windowed
+const ROW_HEIGHT = 135;         // .virtual .course-item height + margin
+const OVERSCAN = 5;             // rows rendered above/below the screen
+const courseMap = new Map();
+const rowCache = new Map();     // id -> { course, el }
+let courseOrder = [];
+let syncVersion = 0;
+let renderedMonitorState = null;
+
+// Stored values are user input, keep them out of the markup
+function escapeHtml(value) {
+    return String(value ?? '').replace(/[&<>"']/g, ch => ({
+        '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+    })[ch]);
+}
+
+function courseRowHtml(course) {
+    return `
+            <div class="course-item ${!course.active ? 'inactive' : ''}">
+                <div class="course-info">
+                    <div class="course-name">
+                        ${escapeHtml(course.subject)} ${escapeHtml(course.course_num)}
+                        ${course.active ? 
+                            '<span class="badge badge-success">Active</span>' : 
+                            '<span class="badge badge-danger">Paused</span>'}
+                        ${course.health && course.health.state === 'open' ?
+                            `<span class="badge badge-warning" title="${course.health.failures} failed checks (${escapeHtml(course.health.last_error)}), retrying every so often">Failing</span>` : ''}
+                    </div>
+                    <div class="course-email">📧 ${escapeHtml(course.email)}</div>
+                    ${course.sections ? `<div class="course-email">🎯 Sections ${escapeHtml(course.sections)}</div>` : ''}
+                    <div class="course-stats">
+                        <div class="course-stat">
+                            🔔 ${course.notification_count} notifications
+                        </div>
+                        <div class="course-stat">
+                            ${course.last_available !== null ? 
+                                `💺 Last: ${course.last_available} seats` : 
+                                '💺 Not checked yet'}
+                        </div>
+                    </div>
+                </div>
+                <div class="course-actions">
+                    <button class="btn btn-check ${monitorRunning && course.active ? 'active' : ''}" onclick="checkNow(${course.id})">
+                        🔍 Check Now
+                    </button>
+                    <button class="btn btn-edit" onclick="openEditModal(${course.id})">
+                        ✏️ Edit
+                    </button>
+                </div>
+            </div>
+        `;
+}
+
+// Reuse the DOM row unless the course object was replaced by a sync
+function rowElement(course) {
+    const cached = rowCache.get(course.id);
+    if (cached && cached.course === course) return cached.el;
+    
+    const template = document.createElement('template');
+    template.innerHTML = courseRowHtml(course).trim();
+    const el = template.content.firstElementChild;
+    rowCache.set(course.id, { course, el });
+    return el;
+}
+
+function sortCourseOrder() {
+    courseOrder = [...courseMap.keys()].sort((a, b) => {
+        const ca = courseMap.get(a).created_at || '';
+        const cb = courseMap.get(b).created_at || '';
+        return ca === cb ? b - a : (ca < cb ? 1 : -1);
+    });
+}
+
+function renderCourses() {
+    const container = document.getElementById('coursesList');
+    
+    if (courseOrder.length === 0) {
+        rowCache.clear();
+        container.classList.remove('virtual');
+        container.style.paddingTop = container.style.paddingBottom = '';
+        container.innerHTML = `
+            <div class="empty-state">
+                <svg fill="currentColor" viewBox="0 0 20 20">
+                    <path d="M9 2a1 1 0 000 2h2a1 1 0 100-2H9z"/>
+                    <path fill-rule="evenodd" d="M4 5a2 2 0 012-2 3 3 0 003 3h2a3 3 0 003-3 2 2 0 012 2v11a2 2 0 01-2 2H6a2 2 0 01-2-2V5zm3 4a1 1 0 000 2h.01a1 1 0 100-2H7zm3 0a1 1 0 000 2h3a1 1 0 100-2h-3zm-3 4a1 1 0 100 2h.01a1 1 0 100-2H7zm3 0a1 1 0 100 2h3a1 1 0 100-2h-3z" clip-rule="evenodd"/>
+                </svg>
+                <h3>No courses yet</h3>
+                <p>Add a course above to start monitoring</p>
+            </div>
+        `;
+        return;
+    }
+    
+    if (container.querySelector('.empty-state, .loading')) {
+        container.innerHTML = '';
+    }
+    
+    // The Check Now buttons depend on the monitor state
+    if (renderedMonitorState !== monitorRunning) {
+        rowCache.clear();
+        renderedMonitorState = monitorRunning;
+    }
+    
+    let ids = courseOrder;
+    let padTop = 0;
+    let padBottom = 0;
+    const virtual = courseOrder.length > VIRTUAL_THRESHOLD;
+    container.classList.toggle('virtual', virtual);
+    
+    if (virtual) {
+        const listTop = container.getBoundingClientRect().top + window.scrollY;
+        const first = Math.max(0, Math.floor((window.scrollY - listTop) / ROW_HEIGHT) - OVERSCAN);
+        const last = Math.min(
+            courseOrder.length,
+            Math.ceil((window.scrollY + window.innerHeight - listTop) / ROW_HEIGHT) + OVERSCAN
+        );
+        ids = courseOrder.slice(first, Math.max(first, last));
+        padTop = first * ROW_HEIGHT;
+        padBottom = (courseOrder.length - first - ids.length) * ROW_HEIGHT;
+    }
+    container.style.paddingTop = padTop ? `${padTop}px` : '';
+    container.style.paddingBottom = padBottom ? `${padBottom}px` : '';
+    
+    // Walk the existing rows, only inserting or moving what changed
+    let node = container.firstElementChild;
+    for (const id of ids) {
+        const el = rowElement(courseMap.get(id));
+        if (node === el) {
+            node = node.nextElementSibling;
+        } else {
+            container.insertBefore(el, node);
+        }
+    }
+    while (node) {
+        const next = node.nextElementSibling;
+        node.remove();
+        node = next;
+    }
+}
+
+// Load courses (only what changed since the last load)
+async function loadCourses() {
+    try {
+        const response = await fetch(`${API_URL}/courses?since=${syncVersion}`);
+        const data = await response.json();
+        
+        if (data.full) {
+            courseMap.clear();
+            rowCache.clear();
+        }
+        
+        let orderChanged = data.full;
+        for (const course of data.changed) {
+            const previous = courseMap.get(course.id);
+            orderChanged = orderChanged || !previous || previous.created_at !== course.created_at;
+            courseMap.set(course.id, course);
+        }
+        for (const id of data.removed) {
+            if (courseMap.delete(id)) {
+                rowCache.delete(id);
+                orderChanged = true;
+            }
+        }
+        syncVersion = data.version;
+        
+        if (orderChanged) sortCourseOrder();
+        renderCourses();
+        
+    } catch (error) {
+        console.error('Error loading courses:', error);
+        syncVersion = 0;
+        document.getElementById('coursesList').innerHTML = `
+            <div class="empty-state">
+                <p style="color: #f44336;">Error loading courses. Make sure the API is running on port 5001!</p>
+            </div>
+        `;
+    }
+}
+
+// Only the visible window is in the DOM for long lists
+let scrollFrame = null;
+window.addEventListener('scroll', () => {
+    if (courseOrder.length <= VIRTUAL_THRESHOLD || scrollFrame) return;
+    scrollFrame = requestAnimationFrame(() => {
+        scrollFrame = null;
+        renderCourses();
+    });
+});
+window.addEventListener('resize', () => renderCourses());
+
+// Catalog autocomplete for the add form
+const catalogCache = new Map();
+let catalogTimer = null;
+
+async function searchCatalog(query) {
+    if (!catalogCache.has(query)) {
+        const response = await fetch(`${API_URL}/catalog?q=${encodeURIComponent(query)}`);
+        catalogCache.set(query, response.ok ? await response.json() : []);
+    }
+    return catalogCache.get(query);
+}
+
+function fillOptions(id, options) {
+    const list = document.getElementById(id);
+    list.replaceChildren(...options.map(([value, label]) => {
+        const option = document.createElement('option');
+        option.value = value;
+        if (label) option.label = label;
+        return option;
+    }));
+}
+
+function updateCatalogOptions() {
+    clearTimeout(catalogTimer);
+    catalogTimer = setTimeout(async () => {
+        const subject = document.getElementById('subject').value.trim().toUpperCase();
+        const courseNum = document.getElementById('courseNum').value.trim().toUpperCase();
+        if (!subject) return;
+        try {
+            const results = await searchCatalog(`${subject} ${courseNum}`.trim());
+            const subjects = [...new Set(results.map(r => r.subject))];
+            fillOptions('subjectOptions', subjects.map(s => [s, '']));
+            fillOptions('courseOptions', results
+                .filter(r => r.subject === subject)
+                .map(r => [r.course_num, r.title]));
+        } catch (error) {
+            // Autocomplete is a nicety, the add itself still validates
+        }
+    }, 150);
+}
+
+document.getElementById('subject').addEventListener('input', updateCatalogOptions);
+document.getElementById('courseNum').addEventListener('input', updateCatalogOptions);
+
+// Add course
+document.getElementById('addCourseForm').addEventListener('submit', async (e) => {
+    e.preventDefault();
+    
+    const subject = document.getElementById('subject').value.trim().toUpperCase();
+    const courseNum = document.getElementById('courseNum').value.trim();
+    const email = document.getElementById('email').value.trim();
+    const webhookUrl = document.getElementById('webhookUrl').value.trim();
+    const sections = document.getElementById('sections').value.trim();
+    
+    try {
+        const response = await fetch(`${API_URL}/courses`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ subject, course_num: courseNum, email, webhook_url: webhookUrl, sections })
+        });
+        
+        if (response.ok) {
+            showNotification('Course added successfully!');
+            document.getElementById('addCourseForm').reset();
+            loadCourses();
+            loadStats();
+        } else {
+            const error = await response.json();
+            showNotification(error.error, 'error');
+        }
+    } catch (error) {
+        showNotification('Error adding course', 'error');
+    }
+});
+
+// Edit modal functions
+function openEditModal(id) {
+    const course = courseMap.get(id);
+    editingCourseId = id;
+    document.getElementById('editSubject').value = course.subject;
+    document.getElementById('editCourseNum').value = course.course_num;
+    document.getElementById('editEmail').value = course.email;
+    document.getElementById('editWebhookUrl').value = course.webhook_url || '';
+    document.getElementById('editSections').value = course.sections || '';
+    document.getElementById('editModal').classList.add('show');
+}
+
+function closeEditModal() {
+    document.getElementById('editModal').classList.remove('show');
+    editingCourseId = null;
+}
+
+async function saveEdit() {
+    const course = courseMap.get(editingCourseId);
+    const subject = document.getElementById('editSubject').value.trim().toUpperCase();
+    const courseNum = document.getElementById('editCourseNum').value.trim();
+    const email = document.getElementById('editEmail').value.trim();
+    const webhookUrl = document.getElementById('editWebhookUrl').value.trim();
+    const sections = document.getElementById('editSections').value.trim();
+    
+    // Each change goes to its own endpoint, none of them touch the rest of the course
+    const changes = [];
+    if (sections !== (course.sections || '')) {
+        changes.push([`courses/${editingCourseId}/sections`, 'POST', { sections }]);
+    }
+    if (webhookUrl !== (course.webhook_url || '')) {
+        changes.push([`courses/${editingCourseId}/webhook`, 'POST', { webhook_url: webhookUrl }]);
+    }
+    if (subject !== course.subject || courseNum !== course.course_num || email !== course.email) {
+        changes.push([`courses/${editingCourseId}`, 'PUT', {
+            subject, course_num: courseNum, email, webhook_url: webhookUrl, sections
+        }]);
+    }
+    
+    try {
+        for (const [path, method, body] of changes) {
+            const response = await fetch(`${API_URL}/${path}`, {
+                method,
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(body)
+            });
+            if (!response.ok) {
+                const error = await response.json();
+                showNotification(error.error, 'error');
+                loadCourses();
+                return;
+            }
+        }
+        
+        showNotification(changes.length ? 'Course updated!' : 'Nothing to update');
+        closeEditModal();
+        loadCourses();
+        loadStats();
+    } catch (error) {
+        showNotification('Error updating course', 'error');
+    }
+}
+
+// Toggle course
+async function toggleCourse(id) {
+    try {
+        await fetch(`${API_URL}/courses/${id}/toggle`, { method: 'POST' });
+        loadCourses();
+        loadStats();
+    } catch (error) {
+        showNotification('Error toggling course', 'error');
+    }
+}
+
+// Delete course
+async function deleteCourse(id) {
+    if (!confirm('Are you sure you want to delete this course?')) return;
+    
+    try {
+        await fetch(`${API_URL}/courses/${id}`, { method: 'DELETE' });
+        showNotification('Course deleted');
+        loadCourses();
+        loadStats();
+    } catch (error) {
+        showNotification('Error deleting course', 'error');
+    }
+}
+
+// Delete from modal
+async function deleteFromModal() {
+    if (!confirm('Are you sure you want to delete this course?')) return;
+    
+    try {
+        await fetch(`${API_URL}/courses/${editingCourseId}`, { method: 'DELETE' });
+        showNotification('Course deleted');
+        closeEditModal();
+        loadCourses();
+        loadStats();
+    } catch (error) {
+        showNotification('Error deleting course', 'error');
+    }
+}
+
+// Check course now (runs on the monitor's browser)
+async function checkNow(id) {
+    if (!monitorRunning) {
+        showNotification('Start the monitor to check a course', 'error');
+        return;
+    }
+    
+    try {
+        showNotification('Checking course...', 'success');
+        const response = await fetch(`${API_URL}/courses/${id}/check-now`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ wait: 30 })
+        });
+        let data = await response.json();
+        
+        // Still queued behind a running check - keep polling
+        while (response.status === 202 && ['pending', 'running'].includes(data.status)) {
+            await new Promise(resolve => setTimeout(resolve, 2000));
+            data = await (await fetch(`${API_URL}/check-requests/${data.request_id}`)).json();
+        }
+        
+        if (data.status === 'done') {
+            const seats = data.result.total_available;
+            showNotification(data.message || `${seats} seats available`, 'success');
+            loadCourses();
+            loadStats();
+        } else {
+            showNotification(data.error || 'Check failed', 'error');
+        }
+    } catch (error) {
+        showNotification('Error checking course', 'error');
+    }
+}
+
+// Initial load
+loadCourses();
+loadStats();
+loadMonitorStatus();
+
+// Refresh every 10 seconds
+setInterval(() => {
+    loadCourses();
+    loadStats();
+    loadMonitorStatus();
+}, 10000);
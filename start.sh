@@ -16,7 +16,7 @@ sleep 2
 # Get the directory where this script is located
 SCRIPT_DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
 BACKEND_DIR="$SCRIPT_DIR/backend"
-FRONTEND_DIR="$SCRIPT_DIR/frontend"
+FRONTEND_DIR="$SCRIPT_DIR/frontend"  # served by api.py
 
 # Check if directories exist
 if [ ! -d "$BACKEND_DIR" ]; then
@@ -29,40 +29,31 @@ if [ ! -d "$FRONTEND_DIR" ]; then
     exit 1
 fi
 
-# Start API in background
-echo "🚀 Starting API server (port 5001)..."
+# Start API in background (it serves the web interface too)
+echo "🚀 Starting API server and web interface (port 5001)..."
 cd "$BACKEND_DIR"
 nohup python3 api.py > ../logs/api.log 2>&1 &
 API_PID=$!
 echo "   ✅ API running (PID: $API_PID)"
 sleep 2
 
-# Start Frontend in background
-echo "🚀 Starting frontend server (port 8000)..."
-cd "$FRONTEND_DIR"
-nohup python3 -m http.server 8000 > ../logs/frontend.log 2>&1 &
-FRONTEND_PID=$!
-echo "   ✅ Frontend running (PID: $FRONTEND_PID)"
-sleep 2
-
-# Open browser to the frontend
-echo "🌐 Opening browser to http://localhost:8000/index.html"
+# Open browser to the web interface
+echo "🌐 Opening browser to http://localhost:5001/"
 if [[ "$OSTYPE" == "darwin"* ]]; then
-    open "http://localhost:8000/index.html"
+    open "http://localhost:5001/"
 elif [[ "$OSTYPE" == "linux-gnu"* ]]; then
-    xdg-open "http://localhost:8000/index.html"
+    xdg-open "http://localhost:5001/"
 fi
 
 echo ""
 echo "================================================"
 echo "✅ SERVERS STARTED!"
 echo "================================================"
-echo "📊 Web Interface: http://localhost:8000/index.html"
+echo "📊 Web Interface: http://localhost:5001/"
 echo "🔧 API Endpoint: http://localhost:5001/api"
 echo ""
 echo "📝 Logs are in: $SCRIPT_DIR/logs/"
 echo "   - API: logs/api.log"
-echo "   - Frontend: logs/frontend.log"
 echo ""
 echo "================================================"
 echo "🤖 STARTING MONITOR"
@@ -91,5 +82,5 @@ echo ""
 echo "================================================"
 echo "🛑 SHUTTING DOWN"
 echo "================================================"
-kill $API_PID $FRONTEND_PID 2>/dev/null
+kill $API_PID 2>/dev/null
 echo "✅ All services stopped"
\ No newline at end of file